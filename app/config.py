@@ -1,10 +1,14 @@
 import os
-import dotenv
 from typing import Final, Dict
 from datetime import datetime
 
-# Load environment variables
-dotenv.load_dotenv()
+# Load environment variables from a .env file next to the app or in the working directory.
+# python-dotenv is only imported when there is one, which keeps it out of hosted cold starts.
+_ENV_FILES = (os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.env'), '.env')
+_env_file = next((path for path in _ENV_FILES if os.path.isfile(path)), None)
+if _env_file:
+    import dotenv
+    dotenv.load_dotenv(_env_file)
 
 # Bot Configuration
 TOKEN: Final = os.getenv('BOT_TOKEN')
@@ -13,3 +17,102 @@ BOT_USERNAME: Final = '@XenArcAI_Bot'
 # Validation
 if not TOKEN:
     raise ValueError("No BOT_TOKEN found in environment variables. Please check your .env file.")
+
+# Admin cache
+ADMIN_CACHE_TTL: Final = float(os.getenv('ADMIN_CACHE_TTL', 300))
+ADMIN_CACHE_MAX_CHATS: Final = int(os.getenv('ADMIN_CACHE_MAX_CHATS', 1024))
+
+# Roast fetching
+ROAST_API_URL: Final = os.getenv('ROAST_API_URL', 'https://evilinsult.com/generate_insult.php')
+ROAST_BUFFER_SIZE: Final = int(os.getenv('ROAST_BUFFER_SIZE', 20))
+ROAST_REFILL_CONCURRENCY: Final = int(os.getenv('ROAST_REFILL_CONCURRENCY', 4))
+ROAST_MAX_AGE: Final = float(os.getenv('ROAST_MAX_AGE', 3600))
+ROAST_TIMEOUT: Final = float(os.getenv('ROAST_TIMEOUT', 5))
+
+# Auto-delete scheduler
+DELETE_RESOLUTION: Final = float(os.getenv('DELETE_RESOLUTION', 1.0))
+
+# Update delivery (long polling unless WEBHOOK_MODE is enabled)
+WEBHOOK_MODE: Final = os.getenv('WEBHOOK_MODE', '').lower() in ('1', 'true', 'yes')
+WEBHOOK_URL: Final = os.getenv('WEBHOOK_URL') or os.getenv('RENDER_EXTERNAL_URL')
+WEBHOOK_PATH: Final = os.getenv('WEBHOOK_PATH', '/webhook')
+WEBHOOK_SECRET: Final = os.getenv('WEBHOOK_SECRET')
+
+# Cooldown countdown messages
+COUNTDOWN_COARSE_INTERVAL: Final = int(os.getenv('COUNTDOWN_COARSE_INTERVAL', 10))
+COUNTDOWN_FINE_WINDOW: Final = int(os.getenv('COUNTDOWN_FINE_WINDOW', 5))
+
+# Report fan-out to admins
+FANOUT_CONCURRENCY: Final = int(os.getenv('FANOUT_CONCURRENCY', 8))
+FANOUT_RATE: Final = float(os.getenv('FANOUT_RATE', 25))
+
+# Outbound Bot API rate limits
+RATE_LIMIT_GLOBAL: Final = float(os.getenv('RATE_LIMIT_GLOBAL', 30))
+RATE_LIMIT_GROUP_PER_MINUTE: Final = float(os.getenv('RATE_LIMIT_GROUP_PER_MINUTE', 20))
+RATE_LIMIT_PRIVATE: Final = float(os.getenv('RATE_LIMIT_PRIVATE', 1))
+RATE_LIMIT_MAX_RETRIES: Final = int(os.getenv('RATE_LIMIT_MAX_RETRIES', 3))
+
+# Durable state across restarts (disabled unless PERSISTENCE_DB is set)
+PERSISTENCE_DB: Final = os.getenv('PERSISTENCE_DB')
+PERSISTENCE_WRITE_DELAY: Final = float(os.getenv('PERSISTENCE_WRITE_DELAY', 0.05))
+
+# Report cooldown (set COOLDOWN_DB to share cooldowns between workers on one host;
+# use a file of its own, not PERSISTENCE_DB)
+REPORT_COOLDOWN: Final = float(os.getenv('REPORT_COOLDOWN', 60))
+COOLDOWN_DB: Final = os.getenv('COOLDOWN_DB')
+
+# Report aggregation: seconds reports of the same message are collected before admins are told
+# (admins can change it per chat)
+REPORT_WINDOW: Final = float(os.getenv('REPORT_WINDOW', 10))
+
+# Unreachable admins: those who blocked the bot or never started it are re-probed after
+# UNREACHABLE_RETRY_BASE seconds, doubling up to UNREACHABLE_RETRY_MAX
+UNREACHABLE_RETRY_BASE: Final = float(os.getenv('UNREACHABLE_RETRY_BASE', 600))
+UNREACHABLE_RETRY_MAX: Final = float(os.getenv('UNREACHABLE_RETRY_MAX', 86400))
+
+# Concurrent update processing (updates of one chat always run in order)
+UPDATE_CONCURRENCY: Final = int(os.getenv('UPDATE_CONCURRENCY', 32))
+
+# Event-loop watchdog (LOOP_STRICT_MS > 0 turns stalls into errors, for development)
+LOOP_LAG_INTERVAL: Final = float(os.getenv('LOOP_LAG_INTERVAL', 0.1))
+LOOP_STALL_THRESHOLD: Final = float(os.getenv('LOOP_STALL_THRESHOLD', 0.1))
+LOOP_STRICT_MS: Final = float(os.getenv('LOOP_STRICT_MS', 0))
+
+# Update recorder for replaying real traffic (disabled unless RECORD_DIR is set)
+RECORD_DIR: Final = os.getenv('RECORD_DIR')
+RECORD_MAX_BYTES: Final = int(os.getenv('RECORD_MAX_BYTES', 16 * 1024 * 1024))
+RECORD_KEEP: Final = int(os.getenv('RECORD_KEEP', 10))
+
+# Join-request approvals (queued per chat, drained in the background)
+JOIN_APPROVAL_CONCURRENCY: Final = int(os.getenv('JOIN_APPROVAL_CONCURRENCY', 4))
+JOIN_APPROVAL_RATE: Final = float(os.getenv('JOIN_APPROVAL_RATE', 20))
+
+# Welcome messages (joins are collected per chat and greeted together)
+WELCOME_WINDOW: Final = float(os.getenv('WELCOME_WINDOW', 3))
+WELCOME_MAX_MENTIONS: Final = int(os.getenv('WELCOME_MAX_MENTIONS', 10))
+WELCOME_SUMMARY_THRESHOLD: Final = int(os.getenv('WELCOME_SUMMARY_THRESHOLD', 50))
+
+# Duplicate update detection (set DEDUPE_DB to share it between workers on one host;
+# use a file of its own, not PERSISTENCE_DB)
+DEDUPE_CAPACITY: Final = int(os.getenv('DEDUPE_CAPACITY', 10000))
+DEDUPE_DB: Final = os.getenv('DEDUPE_DB')
+
+# Flood detection (FLOOD_MESSAGES=0 disables it)
+FLOOD_MESSAGES: Final = int(os.getenv('FLOOD_MESSAGES', 6))
+FLOOD_WINDOW: Final = float(os.getenv('FLOOD_WINDOW', 5))
+FLOOD_DUPLICATES: Final = int(os.getenv('FLOOD_DUPLICATES', 3))
+FLOOD_MUTE_SECONDS: Final = int(os.getenv('FLOOD_MUTE_SECONDS', 300))
+FLOOD_MAX_TRACKED: Final = int(os.getenv('FLOOD_MAX_TRACKED', 100000))
+
+# Membership index built from chat_member updates
+MEMBERSHIP_MAX_CHATS: Final = int(os.getenv('MEMBERSHIP_MAX_CHATS', 1024))
+
+# Logging: JSON lines (or LOG_FORMAT=text) written by a background thread
+LOG_FORMAT: Final = os.getenv('LOG_FORMAT', 'json')
+LOG_LEVEL: Final = os.getenv('LOG_LEVEL', 'INFO').upper()
+LOG_QUEUE_SIZE: Final = int(os.getenv('LOG_QUEUE_SIZE', 10000))
+# Share of routine per-event logs (handled updates, reactions) that are written
+LOG_SAMPLE_RATE: Final = float(os.getenv('LOG_SAMPLE_RATE', 0.01))
+
+# Bot API server, e.g. a self-hosted one (the benchmarks point it at a local fake)
+BOT_API_URL: Final = os.getenv('BOT_API_URL')
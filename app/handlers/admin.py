@@ -1,6 +1,45 @@
-from telegram import Update, ChatPermissions
+import logging
+import time
+from telegram import Bot, Update, ChatPermissions
 from telegram.ext import ContextTypes
-from app.utils.helpers import delete_message, check_is_admin
+from app.config import FLOOD_MUTE_SECONDS
+from app.utils.helpers import schedule_delete, check_is_admin
+from app.utils.admin_cache import admin_cache
+from app.utils.join_requests import join_requests
+from app.utils.flood import flood_detector
+from app.utils.membership import membership
+from app.utils.report_digest import report_digests, MAX_WINDOW
+from app.utils.reachability import reachability
+
+logger = logging.getLogger(__name__)
+
+MUTED_PERMISSIONS = ChatPermissions(
+    can_send_messages=False,
+    can_send_polls=False,
+    can_send_other_messages=False,
+    can_add_web_page_previews=False,
+    can_change_info=False,
+    can_invite_users=False,
+    can_pin_messages=False
+)
+
+UNMUTED_PERMISSIONS = ChatPermissions(
+    can_send_messages=True,
+    can_send_polls=True,
+    can_send_other_messages=True,
+    can_add_web_page_previews=True,
+    can_change_info=False,
+    can_invite_users=False,
+    can_pin_messages=False
+)
+
+async def restrict_member(bot: Bot, chat_id: int, user_id: int, permissions: ChatPermissions, seconds: int | None = None) -> None:
+    """Apply permissions to a member, for `seconds` or until changed again"""
+    until_date = None
+    if seconds is not None:
+        # Telegram treats less than 30 seconds as forever
+        until_date = int(time.time()) + max(30, seconds)
+    await bot.restrict_chat_member(chat_id=chat_id, user_id=user_id, permissions=permissions, until_date=until_date)
 
 async def mute_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Mute a user (admin only)"""
@@ -12,57 +51,37 @@ async def mute_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
     # Check if user is admin
     if not await check_is_admin(update, context):
         error_msg = await update.message.reply_text("❌ Nice try Dumbass! Only admins can use this command.")
-        context.job_queue.run_once(delete_message, 60.0, data={'chat_id': chat_id, 'message_id': error_msg.message_id})
-        context.job_queue.run_once(delete_message, 60.0, data={'chat_id': chat_id, 'message_id': update.message.message_id})
+        schedule_delete(chat_id, error_msg.message_id, update.message.message_id)
         return
     
     # Check if user replied to a message
     if not update.message.reply_to_message:
         error_msg = await update.message.reply_text("❌ Please reply to a user's message to mute them.")
-        context.job_queue.run_once(delete_message, 60.0, data={'chat_id': chat_id, 'message_id': error_msg.message_id})
-        context.job_queue.run_once(delete_message, 60.0, data={'chat_id': chat_id, 'message_id': update.message.message_id})
+        schedule_delete(chat_id, error_msg.message_id, update.message.message_id)
         return
     
     target_user = update.message.reply_to_message.from_user
     
-    # Check if target is admin (fetch admins again to check target)
+    # Check if target is admin (served from the admin cache)
     try:
-        chat_admins = await context.bot.get_chat_administrators(chat_id)
-        is_target_admin = any(admin.user.id == target_user.id for admin in chat_admins)
-        if is_target_admin:
+        if await admin_cache.is_admin(context.bot, chat_id, target_user.id):
             error_msg = await update.message.reply_text("❌ Cannot mute administrators.")
-            context.job_queue.run_once(delete_message, 60.0, data={'chat_id': chat_id, 'message_id': error_msg.message_id})
-            context.job_queue.run_once(delete_message, 60.0, data={'chat_id': chat_id, 'message_id': update.message.message_id})
+            schedule_delete(chat_id, error_msg.message_id, update.message.message_id)
             return
     except Exception:
         pass
     
     # Mute user
     try:
-        permissions = ChatPermissions(
-            can_send_messages=False,
-            can_send_polls=False,
-            can_send_other_messages=False,
-            can_add_web_page_previews=False,
-            can_change_info=False,
-            can_invite_users=False,
-            can_pin_messages=False
-        )
-        await context.bot.restrict_chat_member(
-            chat_id=chat_id,
-            user_id=target_user.id,
-            permissions=permissions
-        )
+        await restrict_member(context.bot, chat_id, target_user.id, MUTED_PERMISSIONS)
         
         success_msg = await update.message.reply_text(
             f"🔇 {target_user.first_name} has been muted."
         )
-        context.job_queue.run_once(delete_message, 60.0, data={'chat_id': chat_id, 'message_id': success_msg.message_id})
-        context.job_queue.run_once(delete_message, 60.0, data={'chat_id': chat_id, 'message_id': update.message.message_id})
+        schedule_delete(chat_id, success_msg.message_id, update.message.message_id)
     except Exception as e:
         error_msg = await update.message.reply_text(f"❌ Failed to mute user: {str(e)}")
-        context.job_queue.run_once(delete_message, 60.0, data={'chat_id': chat_id, 'message_id': error_msg.message_id})
-        context.job_queue.run_once(delete_message, 60.0, data={'chat_id': chat_id, 'message_id': update.message.message_id})
+        schedule_delete(chat_id, error_msg.message_id, update.message.message_id)
 
 async def unmute_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Unmute a user (admin only)"""
@@ -74,42 +93,187 @@ async def unmute_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     # Check if user is admin
     if not await check_is_admin(update, context):
         error_msg = await update.message.reply_text("❌ Only admins can use this command.")
-        context.job_queue.run_once(delete_message, 60.0, data={'chat_id': chat_id, 'message_id': error_msg.message_id})
-        context.job_queue.run_once(delete_message, 60.0, data={'chat_id': chat_id, 'message_id': update.message.message_id})
+        schedule_delete(chat_id, error_msg.message_id, update.message.message_id)
         return
     
     # Check if user replied to a message
     if not update.message.reply_to_message:
         error_msg = await update.message.reply_text("❌ Please reply to a user's message to unmute them.")
-        context.job_queue.run_once(delete_message, 60.0, data={'chat_id': chat_id, 'message_id': error_msg.message_id})
-        context.job_queue.run_once(delete_message, 60.0, data={'chat_id': chat_id, 'message_id': update.message.message_id})
+        schedule_delete(chat_id, error_msg.message_id, update.message.message_id)
         return
     
     target_user = update.message.reply_to_message.from_user
     
     # Unmute user by restoring permissions
     try:
-        permissions = ChatPermissions(
-            can_send_messages=True,
-            can_send_polls=True,
-            can_send_other_messages=True,
-            can_add_web_page_previews=True,
-            can_change_info=False,
-            can_invite_users=False,
-            can_pin_messages=False
-        )
-        await context.bot.restrict_chat_member(
-            chat_id=chat_id,
-            user_id=target_user.id,
-            permissions=permissions
-        )
+        await restrict_member(context.bot, chat_id, target_user.id, UNMUTED_PERMISSIONS)
         
         success_msg = await update.message.reply_text(
             f"🔊 {target_user.first_name} has been unmuted."
         )
-        context.job_queue.run_once(delete_message, 60.0, data={'chat_id': chat_id, 'message_id': success_msg.message_id})
-        context.job_queue.run_once(delete_message, 60.0, data={'chat_id': chat_id, 'message_id': update.message.message_id})
+        schedule_delete(chat_id, success_msg.message_id, update.message.message_id)
     except Exception as e:
         error_msg = await update.message.reply_text(f"❌ Failed to unmute user: {str(e)}")
-        context.job_queue.run_once(delete_message, 60.0, data={'chat_id': chat_id, 'message_id': error_msg.message_id})
-        context.job_queue.run_once(delete_message, 60.0, data={'chat_id': chat_id, 'message_id': update.message.message_id})
+        schedule_delete(chat_id, error_msg.message_id, update.message.message_id)
+
+async def joins_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Show, pause or resume join-request approvals in this chat (admin only)"""
+    if not update.message:
+        return
+    
+    chat_id = update.effective_chat.id
+    
+    # Check if user is admin
+    if not await check_is_admin(update, context):
+        error_msg = await update.message.reply_text("❌ Only admins can use this command.")
+        schedule_delete(chat_id, error_msg.message_id, update.message.message_id)
+        return
+    
+    action = context.args[0].lower() if context.args else ''
+    if action == 'pause':
+        # During a raid, hold requests until admins have a look
+        join_requests.pause(chat_id)
+    elif action == 'resume':
+        join_requests.resume(chat_id)
+    elif action:
+        error_msg = await update.message.reply_text("❌ Usage: /joins [pause|resume]")
+        schedule_delete(chat_id, error_msg.message_id, update.message.message_id)
+        return
+    
+    state = "⏸️ paused" if join_requests.is_paused(chat_id) else "▶️ running"
+    status_msg = await update.message.reply_text(
+        f"🚪 Join-request approvals are {state}.\n"
+        f"Waiting: {join_requests.backlog(chat_id)}"
+    )
+    schedule_delete(chat_id, status_msg.message_id, update.message.message_id)
+
+async def members_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Show what the membership index knows about this chat (admin only)"""
+    if not update.message:
+        return
+    
+    chat_id = update.effective_chat.id
+    
+    # Check if user is admin
+    if not await check_is_admin(update, context):
+        error_msg = await update.message.reply_text("❌ Only admins can use this command.")
+        schedule_delete(chat_id, error_msg.message_id, update.message.message_id)
+        return
+    
+    stats = membership.chat_stats(chat_id)
+    if stats is None:
+        text = "👥 Nothing is indexed for this chat yet."
+    else:
+        # Members are only tracked while the bot is an admin and receives member updates
+        source = "live member updates" if stats['live'] else "admin list only (make me an admin to track members)"
+        accuracy = f"{stats['accuracy']:.0%} of {stats['verified']} checks" if stats['verified'] else "not checked yet"
+        text = (
+            f"👥 Members indexed: {stats['members']} ({stats['admins']} admins)\n"
+            f"Source: {source}\n"
+            f"Memory: {stats['bytes'] / 1024:.1f} KiB\n"
+            f"Admin list accuracy: {accuracy}"
+        )
+    status_msg = await update.message.reply_text(text)
+    schedule_delete(chat_id, status_msg.message_id, update.message.message_id)
+
+async def report_window_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Show or set how long reports of a message are collected before admins are told (admin only)"""
+    if not update.message:
+        return
+    
+    chat_id = update.effective_chat.id
+    
+    # Check if user is admin
+    if not await check_is_admin(update, context):
+        error_msg = await update.message.reply_text("❌ Only admins can use this command.")
+        schedule_delete(chat_id, error_msg.message_id, update.message.message_id)
+        return
+    
+    if context.args:
+        try:
+            seconds = None if context.args[0].lower() == 'default' else float(context.args[0])
+        except ValueError:
+            seconds = -1.0
+        if seconds is not None and not 0 <= seconds <= MAX_WINDOW:
+            error_msg = await update.message.reply_text(f"❌ Usage: /reportwindow [0-{MAX_WINDOW:.0f} seconds|default]")
+            schedule_delete(chat_id, error_msg.message_id, update.message.message_id)
+            return
+        report_digests.set_window(chat_id, seconds)
+    
+    status_msg = await update.message.reply_text(
+        f"🚨 Reports of the same message are collected for {report_digests.window(chat_id):g} seconds "
+        f"before admins get one DM; later reports update it."
+    )
+    schedule_delete(chat_id, status_msg.message_id, update.message.message_id)
+
+async def unreachable_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """List the admins of this chat who cannot receive report DMs (admin only)"""
+    if not update.message:
+        return
+    
+    chat_id = update.effective_chat.id
+    
+    # Check if user is admin
+    if not await check_is_admin(update, context):
+        error_msg = await update.message.reply_text("❌ Only admins can use this command.")
+        schedule_delete(chat_id, error_msg.message_id, update.message.message_id)
+        return
+    
+    try:
+        chat_admins = (await admin_cache.get(context.bot, chat_id)).admins
+    except Exception as e:
+        error_msg = await update.message.reply_text(f"❌ Failed to get admins: {str(e)}")
+        schedule_delete(chat_id, error_msg.message_id, update.message.message_id)
+        return
+    
+    now = time.time()
+    lines = []
+    for admin in chat_admins:
+        status = reachability.status(admin.user.id)
+        if admin.user.is_bot or status is None:
+            continue
+        retry = max(0, int(status['retry_at'] - now)) // 60
+        lines.append(
+            f"• {admin.user.full_name} (@{admin.user.username or 'N/A'}): unreachable for "
+            f"{int(now - status['since']) // 60} min, next try in {retry} min"
+        )
+    if lines:
+        # Starting the bot in private makes an admin reachable again right away
+        text = "📭 Admins who don't get report DMs:\n" + "\n".join(lines) + "\n\nOpen a private chat with me and press Start to fix it."
+    else:
+        text = "📬 All admins of this chat can receive report DMs."
+    status_msg = await update.message.reply_text(text)
+    schedule_delete(chat_id, status_msg.message_id, update.message.message_id)
+
+async def flood_guard(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Mute members who flood a group for a while; Telegram lifts the mute itself"""
+    message = update.message
+    if not message or not message.from_user or message.sender_chat:
+        return
+    
+    chat_id = update.effective_chat.id
+    user = message.from_user
+    reason = flood_detector.check(chat_id, user.id, message.text or message.caption)
+    if reason is None:
+        return
+    
+    # Admins are allowed to flood (served from the admin cache)
+    try:
+        if await admin_cache.is_admin(context.bot, chat_id, user.id):
+            return
+    except Exception:
+        pass
+    
+    try:
+        await restrict_member(context.bot, chat_id, user.id, MUTED_PERMISSIONS, seconds=FLOOD_MUTE_SECONDS)
+    except Exception as e:
+        logger.warning("Failed to mute %s for flooding in %s: %s", user.id, chat_id, e, extra={'chat_id': chat_id, 'user_id': user.id})
+        return
+    
+    what = "sending the same message" if reason == 'duplicate' else "flooding"
+    duration = f"{FLOOD_MUTE_SECONDS // 60} minutes" if FLOOD_MUTE_SECONDS >= 120 else f"{FLOOD_MUTE_SECONDS} seconds"
+    notice = await context.bot.send_message(
+        chat_id=chat_id,
+        text=f"🔇 {user.first_name} has been muted for {duration} for {what}."
+    )
+    schedule_delete(chat_id, notice.message_id, message.message_id)
@@ -1,35 +1,25 @@
 import logging
-from telegram import Update, ReactionTypeEmoji
+from telegram import Chat, Update, ReactionTypeEmoji
 from telegram.ext import ContextTypes
-from app.utils.helpers import delete_message, extract_status_change
+from app.utils.helpers import extract_status_change
+from app.utils.admin_cache import admin_cache, ADMIN_STATUSES
+from app.utils.join_requests import join_requests
+from app.utils.membership import membership
+from app.utils.reachability import reachability
+from app.utils.logs import log_event
+from app.utils.welcome import welcomes
 
 logger = logging.getLogger(__name__)
 
 async def welcome_new_member(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Welcome new members to the group"""
-    for member in update.message.new_chat_members:
-        if member.is_bot:
-            continue
-        
-        # Get username or first name
-        username = f"@{member.username}" if member.username else member.first_name
-        
-        welcome_text = (
-            f"👋 Welcome {username}!\n\n"
-            f"We're glad to have you here. Use ```/help``` to see available commands."
-        )
-        
-        msg = await context.bot.send_message(
-            chat_id=update.effective_chat.id,
-            text=welcome_text
-        )
-        
-        # Delete welcome message after 1 minute
-        context.job_queue.run_once(
-            delete_message,
-            60.0,
-            data={'chat_id': update.effective_chat.id, 'message_id': msg.message_id}
-        )
+    """Welcome new members to the group (one message per burst of joins)"""
+    # Get username or first name
+    names = [
+        f"@{member.username}" if member.username else member.first_name
+        for member in update.message.new_chat_members
+        if not member.is_bot
+    ]
+    welcomes.add(update.effective_chat.id, names)
 
 async def handle_chat_member_update(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Auto-accept group invitations"""
@@ -39,6 +29,19 @@ async def handle_chat_member_update(update: Update, context: ContextTypes.DEFAUL
     
     was_member, is_member = result
     
+    # In a private chat the user blocked or (re)started the bot
+    if update.effective_chat.type == Chat.PRIVATE:
+        if is_member:
+            reachability.mark_reachable(update.effective_chat.id)
+        else:
+            reachability.mark_unreachable(update.effective_chat.id, 'blocked the bot')
+        return
+    
+    # The bot's own rights changed, so refresh the chat's admin list;
+    # chat_member updates may also have stopped
+    admin_cache.invalidate(update.effective_chat.id)
+    membership.invalidate(update.effective_chat.id)
+    
     # Bot was added to a group
     if not was_member and is_member:
         await context.bot.send_message(
@@ -46,28 +49,39 @@ async def handle_chat_member_update(update: Update, context: ContextTypes.DEFAUL
             text="👋 Hello! Thanks for adding me to the group. Use ```/help``` to see what I can do!"
         )
 
-from telegram.error import BadRequest
+async def handle_private_message(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """A user who messages the bot can be sent DMs again"""
+    if update.effective_user:
+        reachability.mark_reachable(update.effective_user.id)
+
+async def handle_member_change(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Update the membership index and invalidate the admin cache on promotions and demotions"""
+    chat_member = update.chat_member
+    if not chat_member:
+        return
+    
+    membership.apply(chat_member)
+    
+    was_admin = chat_member.old_chat_member.status in ADMIN_STATUSES
+    is_admin = chat_member.new_chat_member.status in ADMIN_STATUSES
+    
+    # Permission edits of an existing admin also change the cached objects
+    if was_admin or is_admin:
+        admin_cache.invalidate(chat_member.chat.id)
 
 async def handle_join_request(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Auto-approve join requests"""
+    """Auto-approve join requests (queued and approved in the background)"""
     chat_join_request = update.chat_join_request
     
     if not chat_join_request:
         return
     
-    try:
-        await context.bot.approve_chat_join_request(
-            chat_id=chat_join_request.chat.id,
-            user_id=chat_join_request.from_user.id
-        )
-        logger.info(f"Auto-approved join request from user {chat_join_request.from_user.id} in chat {chat_join_request.chat.id}")
-    except BadRequest as e:
-        if "User_already_participant" in str(e):
-            logger.info(f"User {chat_join_request.from_user.id} was already accepted or is a member.")
-        else:
-            logger.error(f"Failed to auto-approve join request: {str(e)}")
-    except Exception as e:
-        logger.error(f"Failed to auto-approve join request: {str(e)}")
+    chat_id = chat_join_request.chat.id
+    user_id = chat_join_request.from_user.id
+    
+    # Always approve: Telegram only sends requests from non-members, so an index
+    # hit here would be stale, and a request left alone stays pending forever
+    join_requests.submit(chat_id, user_id)
 
 async def handle_pinned_message(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """React to pinned messages with fire emoji"""
@@ -88,6 +102,6 @@ async def handle_pinned_message(update: Update, context: ContextTypes.DEFAULT_TY
             message_id=pinned_msg.message_id,
             reaction=[ReactionTypeEmoji(emoji="🔥")]
         )
-        logger.info(f"Reacted to pinned message {pinned_msg.message_id} with fire emoji")
+        log_event(logger, "Reacted to pinned message %s with fire emoji", pinned_msg.message_id, message_id=pinned_msg.message_id)
     except Exception as e:
-        logger.error(f"Failed to react to pinned message: {str(e)}")
+        logger.error("Failed to react to pinned message: %s", e, extra={'chat_id': update.effective_chat.id})
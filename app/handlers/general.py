@@ -1,83 +1,103 @@
-import requests
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram import Update
+from telegram.error import BadRequest
 from telegram.ext import ContextTypes
-from app.utils.helpers import delete_message
+from app.utils.helpers import schedule_delete
+from app.utils.responses import responses, keyboard
+from app.utils.roast import roast_provider
 
-async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    if not update.message:
-        return
-    
-    start_text = (
-        "👋 Welcome! Here are the commands you can use:"
+# Static replies, built once at import
+responses.register(
+    'start',
+    "👋 Welcome! Here are the commands you can use:",
+    reply_markup=keyboard(
+        (("📋 Help", 'help'), ("🔥 Roast", 'roast')),
+        (("🚨 Report", 'report_info'),)
     )
-    
-    keyboard = [
-        [InlineKeyboardButton("📋 Help", callback_data='help'), InlineKeyboardButton("🔥 Roast", callback_data='roast')],
-        [InlineKeyboardButton("🚨 Report", callback_data='report_info')]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    
+)
+
+responses.register(
+    'help_command',
+    "📚 *Available Commands*\n\n"
+    "🌟 *General*\n"
+    "`/start` - Start the bot\n"
+    "`/help` - Show this message\n"
+    "`/alive` - Check connection status\n\n"
+    "🔥 *Fun*\n"
+    "`/roast` - Get roasted (tag a user or yourself!)\n\n"
+    "🛡️ *Moderation*\n"
+    "`/report` - Report a message (Reply to msg)\n"
+    "`/cancel` - Cancel active report\n\n"
+    "👮‍♂️ *Admin Only*\n"
+    "`/mute` - Mute a user (Reply to msg)\n"
+    "`/unmute` - Unmute a user (Reply to msg)\n"
+    "`/joins` - Pause or resume join-request approvals\n"
+    "`/members` - Show the membership index of this chat\n"
+    "`/reportwindow` - Show or set how long reports are collected\n"
+    "`/unreachable` - List admins who don't get report DMs",
+    parse_mode='Markdown',
+    reply_markup=keyboard((("🔥 Roast", 'roast'), ("🚨 Report Info", 'report_info')))
+)
+
+# Shown by the buttons; the callback data is the response name
+responses.register(
+    'help',
+    "📚 *Available Commands*\n\n"
+    "🌟 *General*\n"
+    "`/start` - Start the bot\n"
+    "`/help` - Show this message\n"
+    "`/alive` - Check status\n\n"
+    "🔥 *Fun*\n"
+    "`/roast` - Get roasted (tag/self)\n\n"
+    "🛡️ *Moderation*\n"
+    "`/report` - Report a message\n"
+    "`/cancel` - Cancel report\n\n"
+    "👮‍♂️ *Admin Only*\n"
+    "`/mute` - Mute user\n"
+    "`/unmute` - Unmute user\n"
+    "`/joins` - Join-request approvals\n"
+    "`/members` - Membership index\n"
+    "`/reportwindow` - Report window\n"
+    "`/unreachable` - Unreachable admins",
+    parse_mode='Markdown'
+)
+
+responses.register(
+    'roast',
+    "🔥 Use `/roast` command to get roasted!\n\nReply to someone's message with `/roast` to roast them, or just type `/roast` to roast yourself!",
+    parse_mode='Markdown'
+)
+
+responses.register(
+    'report_info',
+    "🚨 *To report a message:*\n\n1. Reply to the offending message with `/report`\n2. The bot will ask for a reason\n3. Reply to the bot's message with your reason\n\n⚠️ You cannot report admins!",
+    parse_mode='Markdown'
+)
+
+async def send_response(update: Update, context: ContextTypes.DEFAULT_TYPE, name: str) -> None:
+    """Send a static response to a command and delete both after 1 minute"""
+    response = responses[name]
     msg = await context.bot.send_message(
-        chat_id=update.effective_chat.id, 
-        text=start_text,
-        reply_markup=reply_markup
+        chat_id=update.effective_chat.id,
+        text=response.text,
+        parse_mode=response.parse_mode,
+        reply_markup=response.reply_markup
     )
+    responses.remember(update.effective_chat.id, msg.message_id, name)
     
     # Delete command and response after 1 minute
-    context.job_queue.run_once(
-        delete_message,
-        60.0,
-        data={'chat_id': update.effective_chat.id, 'message_id': update.message.message_id}
-    )
-    context.job_queue.run_once(
-        delete_message,
-        60.0,
-        data={'chat_id': update.effective_chat.id, 'message_id': msg.message_id}
-    )
+    schedule_delete(update.effective_chat.id, update.message.message_id, msg.message_id)
 
-async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     if not update.message:
         return
     
-    help_text = (
-        "📚 *Available Commands*\n\n"
-        "🌟 *General*\n"
-        "`/start` - Start the bot\n"
-        "`/help` - Show this message\n"
-        "`/alive` - Check connection status\n\n"
-        "🔥 *Fun*\n"
-        "`/roast` - Get roasted (tag a user or yourself!)\n\n"
-        "🛡️ *Moderation*\n"
-        "`/report` - Report a message (Reply to msg)\n"
-        "`/cancel` - Cancel active report\n\n"
-        "👮‍♂️ *Admin Only*\n"
-        "`/mute` - Mute a user (Reply to msg)\n"
-        "`/unmute` - Unmute a user (Reply to msg)"
-    )
-    
-    keyboard = [
-        [InlineKeyboardButton("🔥 Roast", callback_data='roast'), InlineKeyboardButton("🚨 Report Info", callback_data='report_info')]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    
-    msg = await context.bot.send_message(
-        chat_id=update.effective_chat.id, 
-        text=help_text,
-        reply_markup=reply_markup,
-        parse_mode='Markdown'
-    )
+    await send_response(update, context, 'start')
+
+async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    if not update.message:
+        return
     
-    # Delete command and response after 1 minute
-    context.job_queue.run_once(
-        delete_message,
-        60.0,
-        data={'chat_id': update.effective_chat.id, 'message_id': update.message.message_id}
-    )
-    context.job_queue.run_once(
-        delete_message,
-        60.0,
-        data={'chat_id': update.effective_chat.id, 'message_id': msg.message_id}
-    )
+    await send_response(update, context, 'help_command')
 
 async def alive_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Check if bot is alive"""
@@ -93,31 +113,14 @@ async def alive_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
     )
     
     # Delete command and response after 1 minute
-    context.job_queue.run_once(
-        delete_message,
-        60.0,
-        data={'chat_id': update.effective_chat.id, 'message_id': update.message.message_id}
-    )
-    context.job_queue.run_once(
-        delete_message,
-        60.0,
-        data={'chat_id': update.effective_chat.id, 'message_id': msg.message_id}
-    )
+    schedule_delete(update.effective_chat.id, update.message.message_id, msg.message_id)
 
 async def roast_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     if not update.message:
         return
     
-    url = "https://evilinsult.com/generate_insult.php"
-
-    try:
-        response = requests.get(url, timeout=5)
-        if response.status_code == 200:
-            roast_text = response.text
-        else:
-            roast_text = "Failed to fetch roast. here's the classic one: 'You're as useless as the 'ueue' in 'queue'."
-    except requests.RequestException:
-        roast_text = "Failed to fetch roast. here's the classic one: 'You're as useless as the 'ueue' in 'queue'."
+    # Served from the prefetch buffer, falling back to the network or a canned line
+    roast_text = await roast_provider.get()
 
     # Check if user replied to a message (roasting someone else)
     if update.message.reply_to_message and update.message.reply_to_message.from_user:
@@ -133,40 +136,39 @@ async def roast_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
     msg = await context.bot.send_message(chat_id=update.effective_chat.id, text=final_text)
     
     # Delete command and roast message after 1 minute
-    context.job_queue.run_once(
-        delete_message,
-        60.0,
-        data={'chat_id': update.effective_chat.id, 'message_id': update.message.message_id}
-    )
-    context.job_queue.run_once(
-        delete_message,
-        60.0,
-        data={'chat_id': update.effective_chat.id, 'message_id': msg.message_id}
-    )
+    schedule_delete(update.effective_chat.id, update.message.message_id, msg.message_id)
 
 async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle button presses"""
     query = update.callback_query
     await query.answer()
     
-    if query.data == 'help':
-        help_text = (
-            "📚 *Available Commands*\n\n"
-            "🌟 *General*\n"
-            "`/start` - Start the bot\n"
-            "`/help` - Show this message\n"
-            "`/alive` - Check status\n\n"
-            "🔥 *Fun*\n"
-            "`/roast` - Get roasted (tag/self)\n\n"
-            "🛡️ *Moderation*\n"
-            "`/report` - Report a message\n"
-            "`/cancel` - Cancel report\n\n"
-            "👮‍♂️ *Admin Only*\n"
-            "`/mute` - Mute user\n"
-            "`/unmute` - Unmute user"
-        )
-        await query.edit_message_text(text=help_text, parse_mode='Markdown')
-    elif query.data == 'roast':
-        await query.edit_message_text(text="🔥 Use `/roast` command to get roasted!\n\nReply to someone's message with `/roast` to roast them, or just type `/roast` to roast yourself!", parse_mode='Markdown')
-    elif query.data == 'report_info':
-        await query.edit_message_text(text="🚨 *To report a message:*\n\n1. Reply to the offending message with `/report`\n2. The bot will ask for a reason\n3. Reply to the bot's message with your reason\n\n⚠️ You cannot report admins!", parse_mode='Markdown')
+    name = query.data
+    if name not in ('help', 'roast', 'report_info') or not query.message:
+        return
+    
+    chat_id = query.message.chat.id
+    message_id = query.message.message_id
+    
+    # Repeated presses (e.g. a user mashing the button) would not change anything
+    if responses.shown(chat_id, message_id) == name:
+        responses.count_edit('avoided')
+        return
+    
+    # Recorded before the edit, so presses handled meanwhile are skipped too
+    previous = responses.shown(chat_id, message_id)
+    responses.remember(chat_id, message_id, name)
+    response = responses[name]
+    try:
+        await query.edit_message_text(text=response.text, parse_mode=response.parse_mode, reply_markup=response.reply_markup)
+        responses.count_edit('edited')
+    except BadRequest as e:
+        if 'not modified' in str(e).lower():
+            # Shown before we started tracking the message (e.g. before a restart)
+            responses.count_edit('not_modified')
+            return
+        if previous is None:
+            responses.forget(chat_id, message_id)
+        else:
+            responses.remember(chat_id, message_id, previous)
+        raise
@@ -1,15 +1,19 @@
 import logging
+import math
 import time
-from datetime import datetime
 from telegram import Update
 from telegram.ext import ContextTypes, ConversationHandler
-from app.utils.helpers import delete_message, update_countdown_timer
+from app.utils.helpers import schedule_delete
+from app.utils.countdown import countdowns
+from app.utils.admin_cache import admin_cache
+from app.utils.report_digest import report_digests
+from app.utils.pending_reports import pending_reports, PendingReport
+from app.utils.cooldown import report_cooldowns
 
 # States
 WAITING_FOR_REASON = 1
 
-# Dictionary to track last report time per user
-last_report_time = {}
+COOLDOWN_TEXT = "⏳ Please wait {remaining} seconds before submitting another report."
 
 logger = logging.getLogger(__name__)
 
@@ -19,7 +23,6 @@ async def report_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         return ConversationHandler.END
     
     user_id = update.effective_user.id
-    current_time = datetime.now()
     
     # Check if user replied to a message
     if not update.message.reply_to_message:
@@ -27,79 +30,34 @@ async def report_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
             "❌ Please reply to the message you want to report with /report"
         )
         # Schedule message deletion after 1 minute
-        context.job_queue.run_once(
-            delete_message,
-            60.0,
-            data={'chat_id': update.effective_chat.id, 'message_id': error_msg.message_id}
-        )
-        context.job_queue.run_once(
-            delete_message,
-            60.0,
-            data={'chat_id': update.effective_chat.id, 'message_id': update.message.message_id}
-        )
+        schedule_delete(update.effective_chat.id, error_msg.message_id, update.message.message_id)
         return ConversationHandler.END
     
     # Check if reported user is an admin
     reported_user = update.message.reply_to_message.from_user
     if reported_user:
         try:
-            chat_admins = await context.bot.get_chat_administrators(update.effective_chat.id)
-            is_admin = any(admin.user.id == reported_user.id for admin in chat_admins)
-            
-            if is_admin:
+            if await admin_cache.is_admin(context.bot, update.effective_chat.id, reported_user.id):
                 error_msg = await update.message.reply_text(
                     "😏 You think you are smart dumbass, reporting admins is not allowed"
                 )
-                context.job_queue.run_once(
-                    delete_message,
-                    60.0,
-                    data={'chat_id': update.effective_chat.id, 'message_id': error_msg.message_id}
-                )
-                context.job_queue.run_once(
-                    delete_message,
-                    60.0,
-                    data={'chat_id': update.effective_chat.id, 'message_id': update.message.message_id}
-                )
+                schedule_delete(update.effective_chat.id, error_msg.message_id, update.message.message_id)
                 return ConversationHandler.END
         except Exception:
             pass
     
     # Check if user is in cooldown period
-    if user_id in last_report_time:
-        time_since_last_report = (current_time - last_report_time[user_id]).total_seconds()
-        if time_since_last_report < 60:
-            remaining_time = int(60 - time_since_last_report)
-            cooldown_msg = await update.message.reply_text(
-                f"⏳ Please wait {remaining_time} seconds before submitting another report."
-            )
-            
-            # Start countdown timer
-            context.job_queue.run_repeating(
-                update_countdown_timer,
-                interval=1.0,
-                first=1.0,
-                data={
-                    'chat_id': update.effective_chat.id, 
-                    'message_id': cooldown_msg.message_id,
-                    'remaining': remaining_time,
-                    'initial_time': remaining_time
-                },
-                name=f'countdown_{cooldown_msg.message_id}'
-            )
-            
-            # Delete the command message
-            context.job_queue.run_once(
-                delete_message,
-                60.0,
-                data={'chat_id': update.effective_chat.id, 'message_id': update.message.message_id}
-            )
-            return ConversationHandler.END
-    
-    # Store the reported message info
-    reported_msg = update.message.reply_to_message
-    context.user_data['reported_message_id'] = reported_msg.message_id
-    context.user_data['reported_user'] = reported_msg.from_user
-    context.user_data['reported_message_text'] = reported_msg.text or reported_msg.caption or '[Media/Sticker/Other]'
+    remaining_cooldown = await report_cooldowns.check(user_id)
+    if remaining_cooldown > 0:
+        remaining_time = math.ceil(remaining_cooldown)
+        cooldown_msg = await update.message.reply_text(COOLDOWN_TEXT.format(remaining=remaining_time))
+        
+        # Count the message down and delete it at zero
+        countdowns.add(update.effective_chat.id, cooldown_msg.message_id, remaining_time, COOLDOWN_TEXT)
+        
+        # Delete the command message
+        schedule_delete(update.effective_chat.id, update.message.message_id)
+        return ConversationHandler.END
     
     # Ask for reason by replying to this prompt
     prompt_msg = await update.message.reply_text(
@@ -107,16 +65,24 @@ async def report_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         "⏱️ You have 1 minute to respond or this request will be cancelled."
     )
     
-    # Store the prompt message ID to delete later
-    context.user_data['prompt_message_id'] = prompt_msg.message_id
-    context.user_data['command_message_id'] = update.message.message_id
+    # Store the reported message info, keyed by chat and user
+    reported_msg = update.message.reply_to_message
+    report = PendingReport(
+        chat_id=update.effective_chat.id,
+        user_id=user_id,
+        reported_message_id=reported_msg.message_id,
+        reported_user=reported_msg.from_user,
+        reported_message_text=reported_msg.text or reported_msg.caption or '[Media/Sticker/Other]',
+        prompt_message_id=prompt_msg.message_id,
+        command_message_id=update.message.message_id
+    )
+    pending_reports.add(report)
     
     # Schedule timeout (1 minute)
-    context.job_queue.run_once(
+    report.timeout_job = context.job_queue.run_once(
         timeout_report,
         60.0,
-        data={'chat_id': update.effective_chat.id, 'user_id': user_id, 'prompt_msg_id': prompt_msg.message_id, 'cmd_msg_id': update.message.message_id},
-        name=f'report_timeout_{user_id}_{current_time.timestamp()}'
+        data={'chat_id': update.effective_chat.id, 'user_id': user_id}
     )
     
     return WAITING_FOR_REASON
@@ -127,38 +93,23 @@ async def receive_report_reason(update: Update, context: ContextTypes.DEFAULT_TY
     user = update.effective_user
     chat = update.effective_chat
     
+    report = pending_reports.get(chat.id, user_id)
+    if report is None:
+        # The report already timed out
+        return ConversationHandler.END
+    
     # Check if user replied to the bot's prompt message
-    if not update.message.reply_to_message or update.message.reply_to_message.message_id != context.user_data.get('prompt_message_id'):
+    if not update.message.reply_to_message or update.message.reply_to_message.message_id != report.prompt_message_id:
         # Ignore messages that are not replies to the prompt
         return WAITING_FOR_REASON
     
     reason = update.message.text
     
-    # Cancel all timeout jobs for this user
-    all_jobs = context.job_queue.jobs()
-    for job in all_jobs:
-        if job.name and job.name.startswith(f'report_timeout_{user_id}_'):
-            job.schedule_removal()
+    # Remove the report and cancel its timeout job
+    pending_reports.close(chat.id, user_id)
     
-    # Delete the prompt message
-    try:
-        if 'prompt_message_id' in context.user_data:
-            await context.bot.delete_message(
-                chat_id=chat.id,
-                message_id=context.user_data['prompt_message_id']
-            )
-    except Exception:
-        pass
-    
-    # Delete the command message
-    try:
-        if 'command_message_id' in context.user_data:
-            await context.bot.delete_message(
-                chat_id=chat.id,
-                message_id=context.user_data['command_message_id']
-            )
-    except Exception:
-        pass
+    # Delete the prompt and command messages
+    schedule_delete(chat.id, report.prompt_message_id, report.command_message_id, delay=0)
     
     # Send confirmation to user
     confirmation_msg = await update.message.reply_text(
@@ -167,66 +118,16 @@ async def receive_report_reason(update: Update, context: ContextTypes.DEFAULT_TY
     )
     
     # Schedule confirmation message deletion after 1 minute
-    context.job_queue.run_once(
-        delete_message,
-        60.0,
-        data={'chat_id': chat.id, 'message_id': confirmation_msg.message_id}
-    )
+    schedule_delete(chat.id, confirmation_msg.message_id)
     
-    # Get reported message details
-    reported_user = context.user_data.get('reported_user')
-    reported_msg_text = context.user_data.get('reported_message_text', 'N/A')
+    # Admins get one DM per reported message, edited as more members report it
+    report_digests.add(chat.id, chat.title or chat.first_name, report, user, reason)
     
-    # Get all admins in the chat
-    try:
-        chat_admins = await context.bot.get_chat_administrators(chat.id)
-        logger.info(f"Found {len(chat_admins)} admins in chat {chat.id}")
-        
-        # Send report to each admin via DM
-        report_text = (
-            f"🚨 NEW REPORT\n\n"
-            f"👤 Reporter: {user.full_name} (@{user.username or 'N/A'})\n"
-            f"🆔 Reporter ID: {user_id}\n\n"
-            f"🎯 Reported User: {reported_user.full_name if reported_user else 'Unknown'} (@{reported_user.username if reported_user and reported_user.username else 'N/A'})\n"
-            f"📝 Reported Message: {reported_msg_text[:100]}{'...' if len(reported_msg_text) > 100 else ''}\n\n"
-            f"💬 Chat: {chat.title or chat.first_name}\n"
-            f"📋 Reason: {reason}\n"
-            f"🕒 Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
-        )
-        
-        admin_notified_count = 0
-        for admin in chat_admins:
-            # Skip bots and the reporter
-            if admin.user.is_bot:
-                continue
-            if admin.user.id == user_id:
-                continue
-            
-            try:
-                await context.bot.send_message(
-                    chat_id=admin.user.id,
-                    text=report_text
-                )
-                admin_notified_count += 1
-            except Exception as e:
-                # Admin may have blocked the bot or never started it
-                logger.warning(f"Failed to notify admin {admin.user.id}: {str(e)}")
-                pass
-        
-        logger.info(f"Total admins notified: {admin_notified_count}")
-    except Exception as e:
-        logger.error(f"Error getting admins or sending reports: {str(e)}")
-        pass
-    
-    # Update last report time
-    last_report_time[user_id] = datetime.now()
+    # Start the user's report cooldown
+    await report_cooldowns.record(user_id)
     
     # Delete user's reason message after 1 minute
-    context.job_queue.run_once(
-        delete_message,
-        60.0,
-        data={'chat_id': chat.id, 'message_id': update.message.message_id}
-    )
+    schedule_delete(chat.id, update.message.message_id)
     
     return ConversationHandler.END
 
@@ -234,47 +135,17 @@ async def cancel_report(update: Update, context: ContextTypes.DEFAULT_TYPE) -> i
     """Cancel the report conversation"""
     user_id = update.effective_user.id
     
-    # Cancel all timeout jobs for this user
-    all_jobs = context.job_queue.jobs()
-    for job in all_jobs:
-        if job.name and job.name.startswith(f'report_timeout_{user_id}_'):
-            job.schedule_removal()
+    # Remove the report and cancel its timeout job
+    report = pending_reports.close(update.effective_chat.id, user_id)
     
     cancel_msg = await update.message.reply_text("Report cancelled.")
     
-    # Delete prompt message
-    try:
-        if 'prompt_message_id' in context.user_data:
-            await context.bot.delete_message(
-                chat_id=update.effective_chat.id,
-                message_id=context.user_data['prompt_message_id']
-            )
-    except Exception:
-        pass
-    
-    # Delete command message
-    try:
-        if 'command_message_id' in context.user_data:
-            await context.bot.delete_message(
-                chat_id=update.effective_chat.id,
-                message_id=context.user_data['command_message_id']
-            )
-    except Exception:
-        pass
-    
-    # Schedule cancel message deletion
-    context.job_queue.run_once(
-        delete_message,
-        60.0,
-        data={'chat_id': update.effective_chat.id, 'message_id': cancel_msg.message_id}
-    )
+    # Delete the prompt and command messages
+    if report is not None:
+        schedule_delete(update.effective_chat.id, report.prompt_message_id, report.command_message_id, delay=0)
     
-    # Delete cancel command message
-    context.job_queue.run_once(
-        delete_message,
-        60.0,
-        data={'chat_id': update.effective_chat.id, 'message_id': update.message.message_id}
-    )
+    # Schedule cancel message and cancel command deletion
+    schedule_delete(update.effective_chat.id, cancel_msg.message_id, update.message.message_id)
     
     return ConversationHandler.END
 
@@ -282,8 +153,11 @@ async def timeout_report(context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle timeout when user doesn't provide reason within 1 minute"""
     job_data = context.job.data
     chat_id = job_data['chat_id']
-    prompt_msg_id = job_data.get('prompt_msg_id')
-    cmd_msg_id = job_data.get('cmd_msg_id')
+    
+    # The job has fired, so the report is no longer pending
+    report = pending_reports.pop(chat_id, job_data['user_id'])
+    if report is None:
+        return
     
     try:
         timeout_msg = await context.bot.send_message(
@@ -292,30 +166,21 @@ async def timeout_report(context: ContextTypes.DEFAULT_TYPE) -> None:
         )
         
         # Schedule timeout message deletion
-        context.job_queue.run_once(
-            delete_message,
-            60.0,
-            data={'chat_id': chat_id, 'message_id': timeout_msg.message_id}
-        )
+        schedule_delete(chat_id, timeout_msg.message_id)
         
-        # Delete the prompt message
-        if prompt_msg_id:
-            try:
-                await context.bot.delete_message(
-                    chat_id=chat_id,
-                    message_id=prompt_msg_id
-                )
-            except Exception:
-                pass
-        
-        # Delete the command message
-        if cmd_msg_id:
-            try:
-                await context.bot.delete_message(
-                    chat_id=chat_id,
-                    message_id=cmd_msg_id
-                )
-            except Exception:
-                pass
+        # Delete the prompt and command messages
+        schedule_delete(chat_id, report.prompt_message_id, report.command_message_id, delay=0)
     except Exception:
         pass
+
+def restore_pending_reports(job_queue, saved: list | None) -> None:
+    """Re-open reports saved before a restart and re-arm their timeouts"""
+    now = time.time()
+    for timeout_at, fields in saved or []:
+        report = PendingReport(*fields)
+        pending_reports.add(report)
+        report.timeout_job = job_queue.run_once(
+            timeout_report,
+            max(0.0, timeout_at - now),
+            data={'chat_id': report.chat_id, 'user_id': report.user_id}
+        )
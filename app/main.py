@@ -1,39 +1,178 @@
+import asyncio
 import logging
-import threading
 from telegram import Update
+from telegram.request import HTTPXRequest
 from telegram.ext import (
     ApplicationBuilder, CommandHandler, MessageHandler, 
     CallbackQueryHandler, ChatMemberHandler, ChatJoinRequestHandler, 
-    ConversationHandler, filters
+    ConversationHandler, TypeHandler, JobQueue, filters
 )
-from app.config import TOKEN
+from app.config import TOKEN, WEBHOOK_MODE, RECORD_DIR, BOT_API_URL
 from app.utils.helpers import keep_alive, error_handler
-from app.web_server import start_server_thread
+from app.web_server import web_server
+from app.utils.roast import roast_provider
+from app.utils.deleter import deleter
+from app.utils.countdown import countdowns
+from app.utils.ratelimit import outbound
+from app.utils.processor import update_processor
+from app.utils.persistence import persistence
+from app.utils.pending_reports import pending_reports
+from app.utils.watchdog import watchdog
+from app.utils.join_requests import join_requests
+from app.utils.welcome import welcomes
+from app.utils.report_digest import report_digests
+from app.utils.reachability import reachability
+from app.utils.admin_cache import admin_cache
+from app.utils.cooldown import report_cooldowns
+from app.utils.flood import flood_detector
+from app.utils.membership import membership
+from app.utils.dedupe import seen_updates
+from app.utils.metrics import registry, instrument_handlers, metrics_endpoint, seconds_since_last_poll, PollTrackingRequest
+from app.utils.startup import startup
+from app.utils.http import ssl_context
+from app.utils.logs import setup_logging, log_queue
 
 from app.handlers.general import start_command, help_command, roast_command, alive_command, button_callback
-from app.handlers.admin import mute_command, unmute_command
-from app.handlers.report import report_command, receive_report_reason, cancel_report, WAITING_FOR_REASON
-from app.handlers.events import welcome_new_member, handle_pinned_message, handle_chat_member_update, handle_join_request
+from app.handlers.admin import mute_command, unmute_command, joins_command, members_command, report_window_command, unreachable_command, flood_guard
+from app.handlers.report import report_command, receive_report_reason, cancel_report, restore_pending_reports, WAITING_FOR_REASON
+from app.handlers.events import welcome_new_member, handle_pinned_message, handle_chat_member_update, handle_member_change, handle_join_request, handle_private_message
 
-if __name__ == '__main__':
-    # Setup logging
-    logging.basicConfig(
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        level=logging.INFO
-    )
-    # Silence httpx logs (too noisy)
-    logging.getLogger("httpx").setLevel(logging.WARNING)
-    
-    print('Starting bot...')
+if RECORD_DIR:
+    # Only imported when recording, to keep it out of the cold start otherwise
+    from app.utils.recorder import recorder
+else:
+    recorder = None
 
-    # Start dummy web server for Render port binding
-    start_server_thread()
-    
-    # Start keep-alive thread
-    threading.Thread(target=keep_alive, daemon=True).start()
+logger = logging.getLogger(__name__)
+
+# Long-running tasks owned by the application, cancelled on shutdown
+background_tasks: set[asyncio.Task] = set()
+
+async def on_startup(app) -> None:
+    """Start background services once the application is initialized"""
+    startup.mark('initialized')
+    await watchdog.start()
+    await web_server.start()
+    await roast_provider.start()
+    await deleter.start(app.bot)
+    await countdowns.start(app.bot)
+    await join_requests.start(app.bot)
+    await welcomes.start(app.bot)
+    await report_digests.start(app.bot)
+    background_tasks.add(asyncio.create_task(keep_alive()))
     
+    if persistence:
+        # Re-arm deletions, report timeouts and join requests saved by the previous run
+        deleter.restore(persistence.load_state('deletions') or [])
+        restore_pending_reports(app.job_queue, persistence.load_state('pending_reports'))
+        join_requests.restore(persistence.load_state('join_requests'))
+        membership.restore(persistence.load_state('membership'))
+        report_digests.restore(persistence.load_state('report_windows'))
+        reachability.restore(persistence.load_state('unreachable_users'))
+        persistence.track('deletions', deleter.snapshot)
+        persistence.track('pending_reports', pending_reports.snapshot)
+        persistence.track('join_requests', join_requests.snapshot)
+        persistence.track('membership', membership.snapshot)
+        persistence.track('report_windows', report_digests.snapshot)
+        persistence.track('unreachable_users', reachability.snapshot)
+    startup.mark('ready')
+
+async def on_stop(app) -> None:
+    """Stop services that still need the bot, before state is flushed"""
+    await join_requests.stop()
+    await welcomes.stop()
+    await report_digests.stop()
+    await countdowns.stop()
+    # With persistence, queued deletions are saved by the flush instead of deleted now
+    await deleter.stop(flush=persistence is None)
+
+async def on_shutdown(app) -> None:
+    """Stop background services before the application exits"""
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    background_tasks.clear()
+    await web_server.stop()
+    await roast_provider.stop()
+    if recorder:
+        await recorder.close()
+    # Last, so strict mode reports stalls from the whole run
+    await watchdog.stop()
+
+def register_metrics(app) -> None:
+    """Expose the state of the application and shared services on /metrics"""
+    registry.collected('bot_seconds_since_last_poll', 'Seconds since the last successful getUpdates', seconds_since_last_poll)
+    registry.collected('bot_job_queue_jobs', 'Jobs scheduled in the JobQueue', lambda: len(app.job_queue.jobs()))
+    registry.collected('bot_report_cooldowns', 'Users currently on report cooldown', lambda: len(report_cooldowns))
+    registry.collected('bot_pending_reports', 'Reports waiting for a reason', lambda: len(pending_reports))
+    registry.collected('bot_admin_cache_chats', 'Chats in the admin cache', lambda: admin_cache.stats()['size'])
+    registry.collected(
+        'bot_admin_cache_lookups_total', 'Admin cache lookups by result',
+        lambda: [(('hit',), admin_cache.hits), (('miss',), admin_cache.misses), (('index',), admin_cache.index_answers)], ('result',), 'counter'
+    )
+    registry.collected('bot_membership_chats', 'Chats in the membership index', lambda: len(membership))
+    registry.collected('bot_membership_entries', 'Members with a known role in the membership index', lambda: membership.stats()['entries'])
+    registry.collected('bot_membership_bytes', 'Estimated memory used by the membership index', lambda: membership.stats()['bytes'])
+    registry.collected('bot_membership_accuracy', 'Share of admin list re-fetches that matched the membership index', lambda: membership.stats()['accuracy'])
+    registry.collected(
+        'bot_membership_lookups_total', 'Membership index lookups by result',
+        lambda: [(('answered',), membership.answered), (('unanswered',), membership.unanswered)], ('result',), 'counter'
+    )
+    registry.collected('bot_deletions_queued', 'Messages waiting to be auto-deleted', lambda: deleter.stats()['queued'])
+    registry.collected('bot_countdowns_active', 'Live cooldown countdown messages', lambda: countdowns.stats()['active'])
+    registry.collected('bot_countdown_edits_total', 'Edits of cooldown countdown messages', lambda: countdowns.edits, kind='counter')
+    registry.collected('bot_countdown_edits_per_minute', 'Countdown message edits in the last minute', lambda: countdowns.stats()['edits_per_minute'])
+    registry.collected(
+        'bot_outbound_queued', 'Bot API requests waiting in the outbound scheduler by priority',
+        lambda: [((priority,), depth) for priority, depth in outbound.stats()['queued'].items()], ('priority',)
+    )
+    registry.collected('bot_outbound_floods_total', '429 responses from the Bot API', lambda: outbound.floods, kind='counter')
+    registry.collected(
+        'bot_startup_seconds', 'Seconds from process start to each startup milestone',
+        lambda: [((milestone,), seconds) for milestone, seconds in startup.marks.items()], ('milestone',)
+    )
+    registry.collected('bot_report_cases_open', 'Reported messages whose admin DMs are still updated', lambda: report_digests.stats()['cases'])
+    registry.collected('bot_unreachable_users', 'Users the bot cannot DM', lambda: len(reachability))
+    registry.collected('bot_join_requests_queued', 'Join requests waiting for approval', lambda: join_requests.stats()['queued'])
+    registry.collected('bot_join_requests_paused_chats', 'Chats with approvals paused', lambda: join_requests.stats()['paused'])
+    registry.collected('bot_join_approvals_per_minute', 'Join requests approved in the last minute', join_requests.approvals_per_minute)
+    registry.collected('bot_dedupe_lookups_total', 'Update ids checked for duplicates', lambda: seen_updates.lookups, kind='counter')
+    registry.collected('bot_dedupe_hits_total', 'Duplicate updates dropped', lambda: seen_updates.hits, kind='counter')
+    registry.collected('bot_dedupe_hit_rate', 'Share of updates dropped as duplicates', lambda: seen_updates.stats()['hit_rate'])
+    registry.collected('bot_flood_tracked_senders', 'Senders with a live flood window', lambda: flood_detector.stats()['tracked'])
+    registry.collected('bot_event_loop_lag_recent_seconds', 'Event-loop lag quantiles over recent samples', watchdog.quantiles, ('quantile',))
+    registry.collected('bot_log_records_dropped_total', 'Log records dropped because the log queue was full', lambda: log_queue.dropped, kind='counter')
+    registry.collected('bot_updates_in_flight', 'Updates being processed', lambda: app.update_processor.current_concurrent_updates)
+    web_server.route('GET', '/metrics', metrics_endpoint)
+
+def build_application(token: str = TOKEN, base_url: str | None = None, job_queue: JobQueue | None = None):
+    """Build the application and register all handlers"""
     # Build application
-    app = ApplicationBuilder().token(TOKEN).build()
+    builder = (
+        ApplicationBuilder()
+        .token(token)
+        .rate_limiter(outbound)
+        # Both requests share one TLS context instead of loading the CA bundle twice
+        .request(HTTPXRequest(connection_pool_size=256, httpx_kwargs={'verify': ssl_context()}))
+        .get_updates_request(PollTrackingRequest(connection_pool_size=1, httpx_kwargs={'verify': ssl_context()}))
+        .concurrent_updates(update_processor)
+        .post_init(on_startup)
+        .post_stop(on_stop)
+        .post_shutdown(on_shutdown)
+    )
+    if base_url:
+        # Used by the benchmarks to talk to a local fake Bot API
+        builder.base_url(base_url)
+    if job_queue:
+        # The replay benchmark runs timeouts on an accelerated clock
+        builder.job_queue(job_queue)
+    if persistence:
+        builder.persistence(persistence)
+    app = builder.build()
+    
+    if recorder:
+        # Record every incoming update before any handler sees it
+        app.add_handler(TypeHandler(Update, recorder.record), group=-100)
     
     # Add command handlers (group 0 - highest priority)
     app.add_handler(CommandHandler('start', start_command), group=0)
@@ -42,6 +181,10 @@ if __name__ == '__main__':
     app.add_handler(CommandHandler('mute', mute_command), group=0)
     app.add_handler(CommandHandler('unmute', unmute_command), group=0)
     app.add_handler(CommandHandler('alive', alive_command), group=0)
+    app.add_handler(CommandHandler('joins', joins_command), group=0)
+    app.add_handler(CommandHandler('members', members_command), group=0)
+    app.add_handler(CommandHandler('reportwindow', report_window_command), group=0)
+    app.add_handler(CommandHandler('unreachable', unreachable_command), group=0)
     
     # Add conversation handler for /report
     report_conv_handler = ConversationHandler(
@@ -52,7 +195,9 @@ if __name__ == '__main__':
             ],
         },
         fallbacks=[CommandHandler('cancel', cancel_report)],
-        conversation_timeout=60
+        conversation_timeout=60,
+        name='report',
+        persistent=persistence is not None
     )
     
     app.add_handler(report_conv_handler, group=0)
@@ -66,11 +211,44 @@ if __name__ == '__main__':
     
     # Add special handlers (group 1)
     app.add_handler(ChatMemberHandler(handle_chat_member_update, ChatMemberHandler.MY_CHAT_MEMBER), group=1)
+    app.add_handler(ChatMemberHandler(handle_member_change, ChatMemberHandler.CHAT_MEMBER), group=1)
     app.add_handler(ChatJoinRequestHandler(handle_join_request), group=1)
+
+    # Flood detection sees every group message, whatever else handled it (group 2)
+    if flood_detector.enabled:
+        app.add_handler(MessageHandler(filters.ChatType.GROUPS & ~filters.StatusUpdate.ALL, flood_guard), group=2)
+    # Users who message the bot privately can be sent report DMs again
+    app.add_handler(MessageHandler(filters.ChatType.PRIVATE, handle_private_message), group=2)
     
     # Add error handler
     app.add_error_handler(error_handler)
+
+    # Time every handler registered above
+    instrument_handlers(app)
+    register_metrics(app)
+    
+    return app
+
+def main() -> None:
+    # Log through a queue to a writer thread, as JSON lines unless LOG_FORMAT=text
+    setup_logging()
+    # Silence httpx logs (too noisy)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
     
-    # Start polling
-    print('Bot is running...')
-    app.run_polling(poll_interval=3, allowed_updates=Update.ALL_TYPES)
+    logger.info('Starting bot...')
+
+    startup.mark('imported')
+    app = build_application(base_url=BOT_API_URL)
+    startup.mark('built')
+    
+    logger.info('Bot is running...')
+    if WEBHOOK_MODE:
+        # Telegram pushes updates to the web server on $PORT
+        from app.webhook import run_webhook
+        asyncio.run(run_webhook(app))
+    else:
+        # Long polling without a pause between getUpdates calls
+        app.run_polling(poll_interval=0, allowed_updates=Update.ALL_TYPES)
+
+if __name__ == '__main__':
+    main()
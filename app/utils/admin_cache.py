@@ -0,0 +1,103 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import NamedTuple
+from telegram import Bot, ChatMember
+from app.config import ADMIN_CACHE_TTL, ADMIN_CACHE_MAX_CHATS
+from app.utils.membership import membership
+
+ADMIN_STATUSES = (ChatMember.ADMINISTRATOR, ChatMember.OWNER)
+
+class AdminEntry(NamedTuple):
+    """Snapshot of a chat's administrators"""
+    ids: frozenset
+    admins: tuple
+    expires_at: float
+
+class AdminCache:
+    """Per-chat admin index with TTL, bounded size and LRU eviction"""
+
+    def __init__(self, ttl: float = ADMIN_CACHE_TTL, max_chats: int = ADMIN_CACHE_MAX_CHATS):
+        self.ttl = ttl
+        self.max_chats = max_chats
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # is_admin calls answered by the membership index without the cache
+        self.index_answers = 0
+        self._entries: OrderedDict[int, AdminEntry] = OrderedDict()
+        # One in-flight fetch per chat so concurrent misses share a single API call
+        self._inflight: dict[int, asyncio.Task] = {}
+        # Bumped by invalidate while a fetch is in flight, so its now stale result is not stored
+        self._generations: dict[int, int] = {}
+
+    async def get(self, bot: Bot, chat_id: int) -> AdminEntry:
+        """Return the admin entry for a chat, fetching it on a miss"""
+        entry = self._entries.get(chat_id)
+        if entry is not None and entry.expires_at > time.monotonic():
+            self._entries.move_to_end(chat_id)
+            self.hits += 1
+            return entry
+
+        self.misses += 1
+        task = self._inflight.get(chat_id)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(bot, chat_id))
+            self._inflight[chat_id] = task
+            task.add_done_callback(lambda done: self._fetched(chat_id, done))
+        return await asyncio.shield(task)
+
+    def _fetched(self, chat_id: int, task: asyncio.Task) -> None:
+        # A fetch started after invalidate may have replaced this one
+        if self._inflight.get(chat_id) is task:
+            del self._inflight[chat_id]
+        if chat_id not in self._inflight:
+            self._generations.pop(chat_id, None)
+
+    async def _fetch(self, bot: Bot, chat_id: int) -> AdminEntry:
+        generation = self._generations.get(chat_id, 0)
+        admins = tuple(await bot.get_chat_administrators(chat_id))
+        entry = AdminEntry(
+            ids=frozenset(admin.user.id for admin in admins),
+            admins=admins,
+            expires_at=time.monotonic() + self.ttl
+        )
+        if self._generations.get(chat_id, 0) != generation:
+            # Invalidated while fetching, the list may predate the change
+            return entry
+        membership.warm(chat_id, admins)
+        self._entries[chat_id] = entry
+        self._entries.move_to_end(chat_id)
+        while len(self._entries) > self.max_chats:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        return entry
+
+    async def is_admin(self, bot: Bot, chat_id: int, user_id: int) -> bool:
+        """Check whether a user is an admin of a chat"""
+        # Answered by the membership index while it knows the chat's admins
+        known = membership.is_admin(chat_id, user_id)
+        if known is not None:
+            self.index_answers += 1
+            return known
+        entry = await self.get(bot, chat_id)
+        return user_id in entry.ids
+
+    def invalidate(self, chat_id: int) -> None:
+        """Drop the cached admins of a chat, and the result of a fetch in flight"""
+        self._entries.pop(chat_id, None)
+        if self._inflight.pop(chat_id, None) is not None:
+            self._generations[chat_id] = self._generations.get(chat_id, 0) + 1
+
+    def stats(self) -> dict:
+        """Return cache counters"""
+        return {
+            'size': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'index_answers': self.index_answers
+        }
+
+# Shared instance used by all handlers
+admin_cache = AdminCache()
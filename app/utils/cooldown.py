@@ -0,0 +1,127 @@
+import asyncio
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from app.config import REPORT_COOLDOWN, COOLDOWN_DB
+
+class CooldownStore(ABC):
+    """Per-key cooldowns of a fixed duration"""
+
+    def __init__(self, duration: float):
+        self.duration = duration
+
+    @abstractmethod
+    def remaining(self, key: int) -> float:
+        """Seconds left on the key's cooldown, 0 if it is not cooling down"""
+
+    @abstractmethod
+    def start(self, key: int) -> None:
+        """Start (or restart) the key's cooldown now"""
+
+    @abstractmethod
+    def __len__(self) -> int:
+        """Number of keys cooling down"""
+
+    async def check(self, key: int) -> float:
+        """`remaining` for handlers; backends with I/O do it off the event loop"""
+        return self.remaining(key)
+
+    async def record(self, key: int) -> None:
+        """`start` for handlers; backends with I/O do it off the event loop"""
+        self.start(key)
+
+class MemoryCooldownStore(CooldownStore):
+    """In-process store using monotonic time, bounded by recently active keys"""
+
+    def __init__(self, duration: float):
+        super().__init__(duration)
+        self._expires: dict[int, float] = {}
+        # Every cooldown has the same duration, so insertion order is expiry order
+        self._order: deque[tuple[float, int]] = deque()
+
+    def remaining(self, key: int) -> float:
+        expires_at = self._expires.get(key)
+        if expires_at is None:
+            return 0.0
+        return max(0.0, expires_at - time.monotonic())
+
+    def start(self, key: int) -> None:
+        now = time.monotonic()
+        expires_at = now + self.duration
+        self._expires[key] = expires_at
+        self._order.append((expires_at, key))
+        self._sweep(now)
+
+    def _sweep(self, now: float) -> None:
+        # Lazily drop expired entries from the front; each entry is visited once
+        order = self._order
+        expires = self._expires
+        while order and order[0][0] <= now:
+            expires_at, key = order.popleft()
+            # Skip keys whose cooldown was restarted after this entry
+            if expires.get(key) == expires_at:
+                del expires[key]
+
+    def __len__(self) -> int:
+        self._sweep(time.monotonic())
+        return len(self._expires)
+
+class SQLiteCooldownStore(CooldownStore):
+    """Cooldowns in a WAL-mode SQLite file shared by all workers on the host
+
+    Handlers go through `check` and `record`, which query the file in a
+    worker thread. The length is the count seen by the last `start`.
+    """
+
+    def __init__(self, duration: float, path: str, sweep_interval: float = 60.0):
+        super().__init__(duration)
+        self.sweep_interval = sweep_interval
+        self._conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute('PRAGMA busy_timeout=1000')
+        self._conn.execute('CREATE TABLE IF NOT EXISTS cooldowns (key INTEGER PRIMARY KEY, expires_at REAL NOT NULL)')
+        self._last_sweep = 0.0
+        self._lock = threading.Lock()
+        self._count = 0
+
+    def remaining(self, key: int) -> float:
+        # Wall-clock time, since monotonic clocks are not comparable across processes
+        with self._lock:
+            row = self._conn.execute('SELECT expires_at FROM cooldowns WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return 0.0
+        return max(0.0, row[0] - time.time())
+
+    def start(self, key: int) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute('INSERT OR REPLACE INTO cooldowns (key, expires_at) VALUES (?, ?)', (key, now + self.duration))
+            if now - self._last_sweep >= self.sweep_interval:
+                self._last_sweep = now
+                self._conn.execute('DELETE FROM cooldowns WHERE expires_at <= ?', (now,))
+            self._count = self._conn.execute('SELECT COUNT(*) FROM cooldowns WHERE expires_at > ?', (now,)).fetchone()[0]
+
+    def __len__(self) -> int:
+        # Cached, so a metrics scrape does not query the file on the event loop
+        return self._count
+
+    async def check(self, key: int) -> float:
+        return await asyncio.to_thread(self.remaining, key)
+
+    async def record(self, key: int) -> None:
+        await asyncio.to_thread(self.start, key)
+
+    def close(self) -> None:
+        self._conn.close()
+
+def create_cooldown_store(duration: float = REPORT_COOLDOWN, path: str | None = COOLDOWN_DB) -> CooldownStore:
+    """Use the shared SQLite backend when a path is configured, memory otherwise"""
+    if path:
+        return SQLiteCooldownStore(duration, path)
+    return MemoryCooldownStore(duration)
+
+# Shared /report cooldowns per user
+report_cooldowns = create_cooldown_store()
@@ -0,0 +1,123 @@
+import asyncio
+import math
+import time
+from collections import deque
+from telegram import Bot
+from telegram.error import BadRequest
+from app.config import COUNTDOWN_COARSE_INTERVAL, COUNTDOWN_FINE_WINDOW
+from app.utils.deleter import deleter
+
+class Countdown:
+    __slots__ = ('chat_id', 'message_id', 'deadline', 'template', 'shown')
+
+    def __init__(self, chat_id: int, message_id: int, deadline: float, template: str, shown: int):
+        self.chat_id = chat_id
+        self.message_id = message_id
+        self.deadline = deadline
+        self.template = template
+        self.shown = shown
+
+class CountdownEngine:
+    """Drive every live countdown message from a single periodic tick"""
+
+    def __init__(self, coarse_interval: int = COUNTDOWN_COARSE_INTERVAL, fine_window: int = COUNTDOWN_FINE_WINDOW, tick: float = 1.0):
+        # Edit on multiples of `coarse_interval`, then every tick for the last `fine_window` seconds
+        self.coarse_interval = max(1, coarse_interval)
+        self.fine_window = fine_window
+        self.tick = tick
+        self.edits = 0
+        self.skipped = 0
+        self._countdowns: dict[tuple[int, int], Countdown] = {}
+        self._recent_edits: deque[float] = deque()
+        self._bot: Bot | None = None
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    def add(self, chat_id: int, message_id: int, seconds: int, template: str) -> None:
+        """Count a message down from `seconds`; `template` is formatted with `remaining`"""
+        deadline = time.monotonic() + seconds
+        self._countdowns[(chat_id, message_id)] = Countdown(chat_id, message_id, deadline, template, seconds)
+        self._wakeup.set()
+
+    async def start(self, bot: Bot) -> None:
+        self._bot = bot
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        # Clean up the countdown messages that would otherwise stay behind
+        for countdown in self._countdowns.values():
+            deleter.schedule(countdown.chat_id, countdown.message_id, delay=0)
+        self._countdowns.clear()
+
+    def _needs_edit(self, countdown: Countdown, remaining: int) -> bool:
+        if remaining == countdown.shown:
+            return False
+        if remaining <= self.fine_window:
+            return True
+        return math.ceil(remaining / self.coarse_interval) < math.ceil(countdown.shown / self.coarse_interval)
+
+    async def _run(self) -> None:
+        while True:
+            if not self._countdowns:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+
+            now = time.monotonic()
+            edits = []
+            for key, countdown in list(self._countdowns.items()):
+                remaining = math.ceil(countdown.deadline - now)
+                if remaining <= 0:
+                    del self._countdowns[key]
+                    deleter.schedule(countdown.chat_id, countdown.message_id, delay=0)
+                elif self._needs_edit(countdown, remaining):
+                    countdown.shown = remaining
+                    edits.append(self._edit(countdown, remaining))
+                else:
+                    self.skipped += 1
+
+            if edits:
+                await asyncio.gather(*edits)
+            # Keep a steady tick regardless of how long the edits took
+            await asyncio.sleep(max(0.0, self.tick - (time.monotonic() - now)))
+
+    async def _edit(self, countdown: Countdown, remaining: int) -> None:
+        self.edits += 1
+        self._recent_edits.append(time.monotonic())
+        self._prune_recent_edits()
+        try:
+            await self._bot.edit_message_text(
+                chat_id=countdown.chat_id,
+                message_id=countdown.message_id,
+                text=countdown.template.format(remaining=remaining)
+            )
+        except BadRequest as e:
+            if 'not modified' not in str(e).lower():
+                # The message is gone, stop counting it down
+                self._countdowns.pop((countdown.chat_id, countdown.message_id), None)
+        except Exception:
+            pass
+
+    def _prune_recent_edits(self) -> None:
+        cutoff = time.monotonic() - 60
+        while self._recent_edits and self._recent_edits[0] < cutoff:
+            self._recent_edits.popleft()
+
+    def stats(self) -> dict:
+        """Return the number of live countdowns and edit counters"""
+        self._prune_recent_edits()
+        return {
+            'active': len(self._countdowns),
+            'edits': self.edits,
+            'skipped': self.skipped,
+            'edits_per_minute': len(self._recent_edits)
+        }
+
+# Shared instance used by /report
+countdowns = CountdownEngine()
@@ -0,0 +1,148 @@
+import asyncio
+import logging
+import sqlite3
+import time
+from app.config import DEDUPE_CAPACITY, DEDUPE_DB
+
+logger = logging.getLogger(__name__)
+
+# Telegram keeps undelivered updates for 24 hours, older ids cannot come back
+SQLITE_RETENTION = 24 * 60 * 60
+
+class UpdateDeduplicator:
+    """Recognise update ids seen recently
+
+    The last `capacity` ids are kept in a ring buffer for eviction order and
+    a set for lookups, so memory stays constant however long the bot runs.
+    """
+
+    def __init__(self, capacity: int = DEDUPE_CAPACITY):
+        self.capacity = max(1, capacity)
+        self.lookups = 0
+        self.hits = 0
+        self._ring: list[int | None] = [None] * self.capacity
+        self._ids: set[int] = set()
+        self._next = 0
+
+    def is_duplicate(self, update_id: int) -> bool:
+        """Record an update id; return True if it was seen before"""
+        self.lookups += 1
+        if update_id in self._ids:
+            self.hits += 1
+            return True
+        claimed = self._claim(update_id)
+        self._remember(update_id)
+        if not claimed:
+            self.hits += 1
+        return not claimed
+
+    async def check(self, update_id: int) -> bool:
+        """Like `is_duplicate`, for backends that must wait for I/O"""
+        return self.is_duplicate(update_id)
+
+    def _claim(self, update_id: int) -> bool:
+        """Return False if another worker already took the update"""
+        return True
+
+    def _remember(self, update_id: int) -> None:
+        oldest = self._ring[self._next]
+        if oldest is not None:
+            self._ids.discard(oldest)
+        self._ring[self._next] = update_id
+        self._ids.add(update_id)
+        self._next = (self._next + 1) % self.capacity
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def stats(self) -> dict:
+        """Return lookup counters and the hit rate"""
+        return {
+            'size': len(self._ids),
+            'lookups': self.lookups,
+            'hits': self.hits,
+            'hit_rate': self.hits / self.lookups if self.lookups else 0.0
+        }
+
+class SQLiteUpdateDeduplicator(UpdateDeduplicator):
+    """Deduplicator whose claims go through a WAL-mode SQLite file shared by all workers on the host
+
+    The in-memory ring still answers repeats seen by this worker without a
+    query. `check` claims the other ids in batches, one transaction per
+    batch in a worker thread, so the event loop never waits on the file.
+    """
+
+    def __init__(self, path: str, capacity: int = DEDUPE_CAPACITY, sweep_interval: float = 60.0):
+        super().__init__(capacity)
+        self.sweep_interval = sweep_interval
+        self._conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute('PRAGMA busy_timeout=1000')
+        self._conn.execute('CREATE TABLE IF NOT EXISTS seen_updates (update_id INTEGER PRIMARY KEY, seen_at REAL NOT NULL)')
+        self._last_sweep = 0.0
+        self._pending: list[tuple[int, asyncio.Future]] = []
+        self._claimer: asyncio.Task | None = None
+
+    async def check(self, update_id: int) -> bool:
+        self.lookups += 1
+        if update_id in self._ids:
+            self.hits += 1
+            return True
+        # Remembered right away, so a repeat arriving during the claim is a hit
+        self._remember(update_id)
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((update_id, future))
+        if self._claimer is None or self._claimer.done():
+            self._claimer = asyncio.create_task(self._claim_pending())
+        claimed = await future
+        if not claimed:
+            self.hits += 1
+        return not claimed
+
+    async def _claim_pending(self) -> None:
+        # Let the other updates of the same getUpdates batch join
+        await asyncio.sleep(0)
+        while self._pending:
+            batch, self._pending = self._pending, []
+            try:
+                claimed = await asyncio.to_thread(self._claim_many, [update_id for update_id, _ in batch])
+            except Exception as e:
+                # Better to risk a duplicate than to drop updates
+                logger.warning("Failed to claim %d update ids: %s", len(batch), e)
+                claimed = [True] * len(batch)
+            for (_, future), result in zip(batch, claimed):
+                if not future.done():
+                    future.set_result(result)
+
+    def _claim(self, update_id: int) -> bool:
+        return self._claim_many([update_id])[0]
+
+    def _claim_many(self, update_ids: list[int]) -> list[bool]:
+        now = time.time()
+        claimed = []
+        self._conn.execute('BEGIN')
+        try:
+            for update_id in update_ids:
+                cursor = self._conn.execute('INSERT OR IGNORE INTO seen_updates (update_id, seen_at) VALUES (?, ?)', (update_id, now))
+                claimed.append(cursor.rowcount == 1)
+            if now - self._last_sweep >= self.sweep_interval:
+                self._last_sweep = now
+                self._conn.execute('DELETE FROM seen_updates WHERE seen_at <= ?', (now - SQLITE_RETENTION,))
+            self._conn.execute('COMMIT')
+        except Exception:
+            self._conn.execute('ROLLBACK')
+            raise
+        return claimed
+
+    def close(self) -> None:
+        self._conn.close()
+
+def create_deduplicator(capacity: int = DEDUPE_CAPACITY, path: str | None = DEDUPE_DB) -> UpdateDeduplicator:
+    """Use the shared SQLite backend when a path is configured, memory otherwise"""
+    if path:
+        return SQLiteUpdateDeduplicator(path, capacity)
+    return UpdateDeduplicator(capacity)
+
+# Shared deduplicator checked before any handler runs
+seen_updates = create_deduplicator()
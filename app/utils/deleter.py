@@ -0,0 +1,140 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import math
+import time
+from telegram import Bot
+from telegram.constants import BulkRequestLimit
+from app.config import DELETE_RESOLUTION
+from app.utils.metrics import registry, Counter, Histogram
+
+logger = logging.getLogger(__name__)
+
+batch_sizes = registry.register(Histogram(
+    'bot_deletion_batch_size', 'Messages per delete request', buckets=(1, 2, 5, 10, 20, 50, 100)
+)).labels()
+failed_batches = registry.register(Counter('bot_deletion_batches_failed_total', 'Delete requests that failed')).labels()
+
+class DeletionScheduler:
+    """Delete messages after a delay, batched per chat with deleteMessages"""
+
+    def __init__(self, resolution: float = DELETE_RESOLUTION, batch_size: int = BulkRequestLimit.MAX_LIMIT):
+        # Due times are rounded up to the resolution so deletions scheduled
+        # around the same moment land in the same slot and share a request
+        self.resolution = resolution
+        self.batch_size = batch_size
+        self.scheduled = 0
+        self.deleted = 0
+        self.batches = 0
+        self.batched = 0
+        self.failed_batches = 0
+        self.max_batch = 0
+        self._heap: list[tuple[float, int, int, int]] = []
+        self._seq = itertools.count()
+        self._bot: Bot | None = None
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    def schedule(self, chat_id: int, *message_ids: int, delay: float = 60.0) -> None:
+        """Queue messages of a chat for deletion after `delay` seconds"""
+        due = time.monotonic() + delay
+        if self.resolution > 0:
+            due = math.ceil(due / self.resolution) * self.resolution
+        head = self._heap[0][0] if self._heap else math.inf
+        for message_id in message_ids:
+            if message_id is None:
+                continue
+            heapq.heappush(self._heap, (due, next(self._seq), chat_id, message_id))
+            self.scheduled += 1
+        if due < head:
+            self._wakeup.set()
+
+    async def start(self, bot: Bot) -> None:
+        """Start the background flush task"""
+        self._bot = bot
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self, flush: bool = True) -> None:
+        """Stop the flush task, deleting everything still queued if `flush` is set"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if flush and self._heap:
+            # Pending messages would otherwise stay in the chats forever
+            await self._flush(math.inf)
+
+    async def _run(self) -> None:
+        while True:
+            self._wakeup.clear()
+            if not self._heap:
+                await self._wakeup.wait()
+                continue
+
+            delay = self._heap[0][0] - time.monotonic()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                    # An earlier deletion was queued, recompute the deadline
+                    continue
+                except asyncio.TimeoutError:
+                    pass
+
+            await self._flush(time.monotonic())
+
+    async def _flush(self, now: float) -> None:
+        by_chat: dict[int, list[int]] = {}
+        while self._heap and self._heap[0][0] <= now:
+            _, _, chat_id, message_id = heapq.heappop(self._heap)
+            by_chat.setdefault(chat_id, []).append(message_id)
+
+        for chat_id, message_ids in by_chat.items():
+            for i in range(0, len(message_ids), self.batch_size):
+                await self._delete_batch(chat_id, message_ids[i:i + self.batch_size])
+
+    async def _delete_batch(self, chat_id: int, message_ids: list[int]) -> None:
+        self.batches += 1
+        self.batched += len(message_ids)
+        self.max_batch = max(self.max_batch, len(message_ids))
+        batch_sizes.observe(len(message_ids))
+        try:
+            if len(message_ids) == 1:
+                await self._bot.delete_message(chat_id=chat_id, message_id=message_ids[0])
+            else:
+                await self._bot.delete_messages(chat_id=chat_id, message_ids=message_ids)
+            self.deleted += len(message_ids)
+        except Exception as e:
+            # Messages may already be deleted or the bot lost its rights
+            self.failed_batches += 1
+            failed_batches.inc()
+            logger.debug("Failed to delete %d messages in chat %s: %s", len(message_ids), chat_id, e)
+
+    def snapshot(self) -> list[tuple[float, int, int]]:
+        """Return queued deletions as (wall-clock due time, chat id, message id)"""
+        offset = time.time() - time.monotonic()
+        return [(due + offset, chat_id, message_id) for due, _, chat_id, message_id in self._heap]
+
+    def restore(self, entries: list[tuple[float, int, int]]) -> None:
+        """Re-queue deletions saved by `snapshot`, overdue ones right away"""
+        now = time.time()
+        for due_at, chat_id, message_id in entries:
+            self.schedule(chat_id, message_id, delay=max(0.0, due_at - now))
+
+    def stats(self) -> dict:
+        """Return queue depth and batching counters"""
+        return {
+            'queued': len(self._heap),
+            'scheduled': self.scheduled,
+            'deleted': self.deleted,
+            'batches': self.batches,
+            'failed_batches': self.failed_batches,
+            'max_batch': self.max_batch,
+            'avg_batch': self.batched / self.batches if self.batches else 0.0
+        }
+
+# Shared instance used by all handlers
+deleter = DeletionScheduler()
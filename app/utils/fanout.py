@@ -0,0 +1,76 @@
+import asyncio
+from typing import Iterable, NamedTuple
+from telegram import Bot
+from telegram.error import BadRequest, Forbidden
+from app.config import FANOUT_CONCURRENCY, FANOUT_RATE
+from app.utils.ratelimit import TokenBucket
+from app.utils.metrics import fanout_deliveries
+from app.utils.reachability import reachability, ReachabilityCache
+
+class DeliveryResult(NamedTuple):
+    """Outcome of delivering a message to one recipient"""
+    chat_id: int
+    ok: bool
+    attempts: int
+    error: str | None = None
+    message_id: int | None = None
+
+# Global messages-per-second budget shared by every fan-out
+fanout_bucket = TokenBucket(FANOUT_RATE)
+
+async def fan_out(
+    bot: Bot,
+    chat_ids: Iterable[int],
+    text: str,
+    concurrency: int = FANOUT_CONCURRENCY,
+    bucket: TokenBucket = fanout_bucket,
+    message_ids: dict[int, int] | None = None,
+    reachable: ReachabilityCache = reachability
+) -> list[DeliveryResult]:
+    """Send the same text to many chats concurrently under the rate budget
+
+    Chats with an entry in `message_ids` get that earlier message edited
+    instead; if it is gone, a new one is sent. Users known to have blocked
+    the bot are skipped without a request (0 attempts) until their re-probe
+    is due. Flood-control waits are retried by the outbound scheduler, so a
+    RetryAfter reaching this point counts as a failed delivery.
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    message_ids = message_ids or {}
+
+    async def deliver(chat_id: int) -> DeliveryResult:
+        if reachable.should_skip(chat_id):
+            return DeliveryResult(chat_id, False, 0, 'unreachable')
+        message_id = message_ids.get(chat_id)
+        async with semaphore:
+            attempts = 0
+            while True:
+                attempts += 1
+                await bucket.acquire()
+                try:
+                    if message_id is None:
+                        message_id = (await bot.send_message(chat_id=chat_id, text=text)).message_id
+                        fanout_deliveries.inc('delivered')
+                    else:
+                        await bot.edit_message_text(chat_id=chat_id, message_id=message_id, text=text)
+                        fanout_deliveries.inc('edited')
+                    reachable.mark_reachable(chat_id)
+                    return DeliveryResult(chat_id, True, attempts, message_id=message_id)
+                except BadRequest as e:
+                    if message_id is None:
+                        fanout_deliveries.inc('failed')
+                        return DeliveryResult(chat_id, False, attempts, str(e))
+                    if 'not modified' in str(e).lower():
+                        return DeliveryResult(chat_id, True, attempts, message_id=message_id)
+                    # The recipient deleted the earlier message, send a fresh one
+                    message_id = None
+                except Forbidden as e:
+                    # Blocked the bot or never started it
+                    reachable.mark_unreachable(chat_id, str(e))
+                    fanout_deliveries.inc('failed')
+                    return DeliveryResult(chat_id, False, attempts, str(e))
+                except Exception as e:
+                    fanout_deliveries.inc('failed')
+                    return DeliveryResult(chat_id, False, attempts, str(e))
+
+    return list(await asyncio.gather(*(deliver(chat_id) for chat_id in chat_ids)))
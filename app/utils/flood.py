@@ -0,0 +1,107 @@
+import time
+from array import array
+from collections import OrderedDict
+from app.config import FLOOD_MESSAGES, FLOOD_WINDOW, FLOOD_DUPLICATES, FLOOD_MAX_TRACKED
+from app.utils.metrics import registry, Counter
+
+flood_detections = registry.register(Counter('bot_flood_detections_total', 'Users caught flooding, by reason', ('reason',)))
+
+class _Sender:
+    __slots__ = ('times', 'pos', 'last_hash', 'repeats', 'last_seen', 'quiet_until')
+
+    def __init__(self, size: int):
+        # Send times of the last `size` messages, overwritten in place
+        self.times = array('d', [float('-inf')]) * size
+        self.pos = 0
+        self.last_hash = 0
+        self.repeats = 0
+        self.last_seen = 0.0
+        self.quiet_until = 0.0
+
+class FloodDetector:
+    """Spot users who send too many or the same messages in a short time
+
+    Each (chat, user) keeps the send times of its last `max_messages`
+    messages in a fixed ring buffer: a user is flooding when the oldest of
+    them is less than `window` seconds old. The same text sent
+    `max_duplicates` times in a row within the window counts as flooding
+    too; a sender is reported once per window. Senders idle for a whole
+    window are evicted, and at most `max_tracked` are kept, so memory
+    stays bounded.
+    """
+
+    def __init__(
+        self,
+        max_messages: int = FLOOD_MESSAGES,
+        window: float = FLOOD_WINDOW,
+        max_duplicates: int = FLOOD_DUPLICATES,
+        max_tracked: int = FLOOD_MAX_TRACKED
+    ):
+        self.max_messages = max_messages
+        self.window = window
+        self.max_duplicates = max_duplicates
+        self.max_tracked = max_tracked
+        self.checked = 0
+        self._senders: OrderedDict[tuple[int, int], _Sender] = OrderedDict()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_messages > 0
+
+    def check(self, chat_id: int, user_id: int, text: str | None = None, now: float | None = None) -> str | None:
+        """Count a message; return 'rate' or 'duplicate' if the sender is flooding"""
+        if now is None:
+            now = time.monotonic()
+        self.checked += 1
+        key = (chat_id, user_id)
+        sender = self._senders.get(key)
+        if sender is None:
+            self._evict(now)
+            sender = self._senders[key] = _Sender(self.max_messages)
+        else:
+            # Most recently active last, so idle senders collect at the front
+            self._senders.move_to_end(key)
+
+        # A fresh window forgets the repeats before it
+        if now - sender.last_seen > self.window:
+            sender.repeats = 0
+        sender.last_seen = now
+
+        reason = None
+        oldest = sender.times[sender.pos]
+        sender.times[sender.pos] = now
+        sender.pos = (sender.pos + 1) % self.max_messages
+        if now - oldest < self.window:
+            reason = 'rate'
+
+        if text:
+            digest = hash(text)
+            sender.repeats = sender.repeats + 1 if digest == sender.last_hash else 1
+            sender.last_hash = digest
+            if self.max_duplicates and sender.repeats >= self.max_duplicates:
+                reason = reason or 'duplicate'
+
+        if reason is None or now < sender.quiet_until:
+            return None
+        # Messages of the same burst still in flight do not count again
+        sender.quiet_until = now + self.window
+        sender.repeats = 0
+        flood_detections.inc(reason)
+        return reason
+
+    def _evict(self, now: float) -> None:
+        cutoff = now - self.window
+        while self._senders:
+            key, sender = next(iter(self._senders.items()))
+            if sender.last_seen >= cutoff and len(self._senders) < self.max_tracked:
+                break
+            del self._senders[key]
+
+    def __len__(self) -> int:
+        return len(self._senders)
+
+    def stats(self) -> dict:
+        return {'tracked': len(self._senders), 'checked': self.checked}
+
+# Shared detector used by the flood guard handler
+flood_detector = FloodDetector()
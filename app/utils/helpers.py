@@ -1,53 +1,21 @@
+import asyncio
 import logging
-import time
 import os
-import requests
-from datetime import datetime
+import httpx
 from telegram import Update, ChatMember, ChatMemberUpdated
 from telegram.ext import ContextTypes
+from app.utils.admin_cache import admin_cache
+from app.utils.deleter import deleter
+from app.utils.metrics import errors_total
+from app.utils.http import ssl_context
+from app.utils.logs import update_summary
 
 # Logger
 logger = logging.getLogger(__name__)
 
-async def delete_message(context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Delete a message after delay"""
-    job_data = context.job.data
-    chat_id = job_data['chat_id']
-    message_id = job_data['message_id']
-    
-    try:
-        await context.bot.delete_message(chat_id=chat_id, message_id=message_id)
-    except Exception:
-        # Message may already be deleted
-        pass
-
-async def update_countdown_timer(context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Update countdown timer in real-time"""
-    job_data = context.job.data
-    chat_id = job_data['chat_id']
-    message_id = job_data['message_id']
-    remaining = job_data['remaining']
-    
-    remaining -= 1
-    job_data['remaining'] = remaining
-    
-    if remaining <= 0:
-        # Delete message when countdown reaches 0
-        context.job.schedule_removal()
-        try:
-            await context.bot.delete_message(chat_id=chat_id, message_id=message_id)
-        except Exception:
-            pass
-    else:
-        # Update message with new countdown
-        try:
-            await context.bot.edit_message_text(
-                chat_id=chat_id,
-                message_id=message_id,
-                text=f"⏳ Please wait {remaining} seconds before submitting another report."
-            )
-        except Exception:
-            pass
+def schedule_delete(chat_id: int, *message_ids: int, delay: float = 60.0) -> None:
+    """Delete messages after delay (batched with other deletions in the chat)"""
+    deleter.schedule(chat_id, *message_ids, delay=delay)
 
 def extract_status_change(chat_member_update: ChatMemberUpdated) -> tuple[bool, bool] | None:
     """Extract status change from ChatMemberUpdated"""
@@ -62,34 +30,41 @@ def extract_status_change(chat_member_update: ChatMemberUpdated) -> tuple[bool,
     return was_member, is_member
 
 async def error_handler(update: object, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Log errors caused by updates"""
-    logger.error(f'Update {update} caused error {context.error}')
+    """Log and count errors caused by updates"""
+    errors_total.inc(type(context.error).__name__)
+    # Ids and type only; the update itself may be large and holds user content
+    summary = update_summary(update)
+    logger.error(
+        "Update %s (%s) caused error %s", summary.get('update_id'), summary['update_type'], context.error,
+        exc_info=context.error, extra=summary
+    )
 
-def keep_alive():
+async def keep_alive() -> None:
     """Keep the service alive on Render by pinging itself"""
     # Render spins down free tier services after 15 mins of inactivity.
     # We ping it every 14 mins to keep it awake.
     url = os.getenv("RENDER_EXTERNAL_URL") 
     
     if not url:
-        print("No RENDER_EXTERNAL_URL found. Keep-alive pinger disabled.")
+        logger.info("No RENDER_EXTERNAL_URL found. Keep-alive pinger disabled.")
         return
 
     # Ensure URL ends with / if needed, though simple GET works on root
-    print(f"Starting keep-alive pinger for {url}")
+    logger.info("Starting keep-alive pinger for %s", url)
     
-    while True:
-        time.sleep(14 * 60)  # Sleep 14 minutes
-        try:
-            requests.get(url, timeout=10)
-            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Keep-alive ping sent to {url}")
-        except Exception as e:
-            print(f"Keep-alive ping failed: {e}")
+    # Runs on the event loop, so it must not block: no time.sleep or requests
+    async with httpx.AsyncClient(timeout=10, verify=ssl_context()) as client:
+        while True:
+            await asyncio.sleep(14 * 60)  # Sleep 14 minutes
+            try:
+                await client.get(url)
+                logger.info("Keep-alive ping sent to %s", url)
+            except Exception as e:
+                logger.warning("Keep-alive ping failed: %s", e)
 
 async def check_is_admin(update: Update, context: ContextTypes.DEFAULT_TYPE) -> bool:
     """Check if the user is an admin in the chat"""
     try:
-        chat_admins = await context.bot.get_chat_administrators(update.effective_chat.id)
-        return any(admin.user.id == update.effective_user.id for admin in chat_admins)
+        return await admin_cache.is_admin(context.bot, update.effective_chat.id, update.effective_user.id)
     except Exception:
         return False
@@ -0,0 +1,12 @@
+import functools
+import ssl
+import httpx
+
+@functools.cache
+def ssl_context() -> ssl.SSLContext:
+    """Return the TLS context shared by every HTTP client
+
+    Each httpx client otherwise loads the CA bundle itself, which takes
+    tens of milliseconds per client on a cold start.
+    """
+    return httpx.create_ssl_context()
@@ -0,0 +1,190 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+from telegram import Bot
+from telegram.error import BadRequest, RetryAfter
+from app.config import JOIN_APPROVAL_CONCURRENCY, JOIN_APPROVAL_RATE
+from app.utils.ratelimit import TokenBucket, PRIORITY_COSMETIC
+from app.utils.metrics import registry, Counter
+
+logger = logging.getLogger(__name__)
+
+join_outcomes = registry.register(Counter('bot_join_requests_total', 'Join requests by outcome', ('outcome',)))
+
+class JoinRequestQueue:
+    """Approve join requests in the background, fairly across chats
+
+    Requests are queued per chat and deduplicated by (chat, user). A single
+    drain task takes them round-robin over chats that are not paused and
+    approves up to `concurrency` at once under a `rate` per second budget,
+    so a raid on one group neither floods the API nor delays other chats.
+    Approvals are sent at cosmetic priority, behind replies to commands.
+    """
+
+    def __init__(self, concurrency: int = JOIN_APPROVAL_CONCURRENCY, rate: float = JOIN_APPROVAL_RATE):
+        self.concurrency = max(1, concurrency)
+        self.bucket = TokenBucket(rate)
+        self.approved = 0
+        self.already_member = 0
+        self.failed = 0
+        self.duplicates = 0
+        self._queues: OrderedDict[int, deque[int]] = OrderedDict()
+        self._pending: set[tuple[int, int]] = set()
+        self._paused: set[int] = set()
+        self._recent_approvals: deque[float] = deque()
+        self._in_flight: set[asyncio.Task] = set()
+        self._slots: asyncio.Semaphore | None = None
+        self._bot: Bot | None = None
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    def submit(self, chat_id: int, user_id: int) -> bool:
+        """Queue a request; return False if the same one is already queued"""
+        if (chat_id, user_id) in self._pending:
+            self.duplicates += 1
+            join_outcomes.inc('duplicate')
+            return False
+        self._pending.add((chat_id, user_id))
+        self._queues.setdefault(chat_id, deque()).append(user_id)
+        self._wakeup.set()
+        return True
+
+    def pause(self, chat_id: int) -> None:
+        """Stop approving a chat's requests; new ones keep queueing"""
+        self._paused.add(chat_id)
+
+    def resume(self, chat_id: int) -> None:
+        self._paused.discard(chat_id)
+        self._wakeup.set()
+
+    def is_paused(self, chat_id: int) -> bool:
+        return chat_id in self._paused
+
+    def backlog(self, chat_id: int | None = None) -> int:
+        """Return the number of queued requests, for one chat or all"""
+        if chat_id is None:
+            return sum(len(queue) for queue in self._queues.values())
+        return len(self._queues.get(chat_id, ()))
+
+    async def start(self, bot: Bot) -> None:
+        """Start the background drain task"""
+        self._bot = bot
+        self._slots = asyncio.Semaphore(self.concurrency)
+        self._task = asyncio.create_task(self._drain())
+
+    async def stop(self) -> None:
+        """Stop draining and wait for approvals already sent"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._in_flight:
+            await asyncio.gather(*self._in_flight, return_exceptions=True)
+
+    def _next_chat(self) -> int | None:
+        """Return the next chat with queued requests that is not paused, round-robin"""
+        for chat_id in self._queues:
+            if chat_id not in self._paused:
+                self._queues.move_to_end(chat_id)
+                return chat_id
+        return None
+
+    async def _drain(self) -> None:
+        while True:
+            self._wakeup.clear()
+            chat_id = self._next_chat()
+            if chat_id is None:
+                await self._wakeup.wait()
+                continue
+
+            await self.bucket.acquire()
+            await self._slots.acquire()
+            # The chat may have been paused while waiting for budget
+            queue = self._queues.get(chat_id)
+            if not queue or chat_id in self._paused:
+                self._slots.release()
+                self.bucket.tokens += 1
+                continue
+
+            user_id = queue.popleft()
+            if not queue:
+                del self._queues[chat_id]
+            task = asyncio.create_task(self._approve(chat_id, user_id))
+            self._in_flight.add(task)
+            task.add_done_callback(self._in_flight.discard)
+
+    async def _approve(self, chat_id: int, user_id: int) -> None:
+        try:
+            await self._bot.approve_chat_join_request(chat_id=chat_id, user_id=user_id, rate_limit_args=PRIORITY_COSMETIC)
+            self._record('approved')
+        except BadRequest as e:
+            if "User_already_participant" in str(e):
+                # Approved elsewhere (another admin or a retry), which is what we wanted
+                self._record('already_member')
+            else:
+                # Usually the request was withdrawn or handled by an admin
+                self._record('failed')
+                logger.debug("Failed to approve join request of %s in %s: %s", user_id, chat_id, e, extra={'chat_id': chat_id, 'user_id': user_id})
+        except RetryAfter:
+            # The outbound scheduler gave up retrying, try again later
+            self._pending.discard((chat_id, user_id))
+            self.submit(chat_id, user_id)
+            return
+        except Exception as e:
+            self._record('failed')
+            logger.warning("Failed to approve join request of %s in %s: %s", user_id, chat_id, e, extra={'chat_id': chat_id, 'user_id': user_id})
+        finally:
+            self._slots.release()
+        self._pending.discard((chat_id, user_id))
+
+    def snapshot(self) -> dict:
+        """Return queued requests by chat and the paused chats"""
+        return {
+            'queued': [(chat_id, list(queue)) for chat_id, queue in self._queues.items()],
+            'paused': list(self._paused)
+        }
+
+    def restore(self, state: dict | None) -> None:
+        """Re-queue requests saved by `snapshot`; Telegram does not send them again"""
+        if not state:
+            return
+        self._paused.update(state['paused'])
+        for chat_id, user_ids in state['queued']:
+            for user_id in user_ids:
+                self.submit(chat_id, user_id)
+
+    def _record(self, outcome: str) -> None:
+        join_outcomes.inc(outcome)
+        if outcome == 'approved':
+            self.approved += 1
+            self._recent_approvals.append(time.monotonic())
+        elif outcome == 'already_member':
+            self.already_member += 1
+        else:
+            self.failed += 1
+
+    def approvals_per_minute(self) -> int:
+        cutoff = time.monotonic() - 60
+        while self._recent_approvals and self._recent_approvals[0] < cutoff:
+            self._recent_approvals.popleft()
+        return len(self._recent_approvals)
+
+    def stats(self) -> dict:
+        """Return backlog and approval counters"""
+        return {
+            'queued': self.backlog(),
+            'chats': len(self._queues),
+            'paused': len(self._paused),
+            'approved': self.approved,
+            'already_member': self.already_member,
+            'failed': self.failed,
+            'duplicates': self.duplicates,
+            'approvals_per_minute': self.approvals_per_minute()
+        }
+
+# Shared queue fed by the join-request handler
+join_requests = JoinRequestQueue()
@@ -0,0 +1,117 @@
+import atexit
+import contextvars
+import json
+import logging
+import queue
+import random
+import sys
+from logging.handlers import QueueHandler, QueueListener
+from telegram import Update
+from app.config import LOG_FORMAT, LOG_LEVEL, LOG_QUEUE_SIZE, LOG_SAMPLE_RATE
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Structured fields copied from a record into its JSON line when set
+FIELDS = ('update_id', 'update_type', 'chat_id', 'user_id', 'message_id', 'command', 'handler', 'latency_ms', 'sample_rate')
+
+# (update id, chat id, handler) of the handler running in this task, set by the handler timing wrapper
+log_context: contextvars.ContextVar[tuple | None] = contextvars.ContextVar('log_context', default=None)
+
+class JsonFormatter(logging.Formatter):
+    """Format a record as one JSON object per line"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage()
+        }
+        for field in FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class NonBlockingQueueHandler(QueueHandler):
+    """Hand records to the writer thread without formatting or waiting
+
+    The message is formatted on the writer thread, so log values, not
+    objects that change afterwards. When the queue is full, records are
+    dropped and counted instead of blocking the event loop.
+    """
+
+    def __init__(self, queue_size: int = LOG_QUEUE_SIZE):
+        # SimpleQueue is lock-free on put, unlike Queue; its size is bounded here instead
+        super().__init__(queue.SimpleQueue())
+        self.queue_size = queue_size
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Only the update context must be read here, on the thread that logged
+        context = log_context.get()
+        if context is not None:
+            update_id, chat_id, handler = context
+            if getattr(record, 'update_id', None) is None:
+                record.update_id = update_id
+            if getattr(record, 'chat_id', None) is None:
+                record.chat_id = chat_id
+            if getattr(record, 'handler', None) is None:
+                record.handler = handler
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        if self.queue.qsize() >= self.queue_size:
+            self.dropped += 1
+            return
+        self.queue.put_nowait(record)
+
+# Installed on the root logger by setup_logging
+log_queue = NonBlockingQueueHandler()
+
+def setup_logging(level: str = LOG_LEVEL, fmt: str = LOG_FORMAT, stream=None) -> QueueListener:
+    """Route all logging through `log_queue` to a background writer thread"""
+    output = logging.StreamHandler(stream or sys.stderr)
+    output.setFormatter(JsonFormatter() if fmt == 'json' else logging.Formatter(TEXT_FORMAT))
+    root = logging.getLogger()
+    root.handlers[:] = [log_queue]
+    root.setLevel(level)
+    listener = QueueListener(log_queue.queue, output)
+    listener.start()
+    # Write out what is still queued when the process exits
+    atexit.register(stop_logging, listener)
+    return listener
+
+def stop_logging(listener: QueueListener) -> None:
+    """Stop the writer thread once the queue is drained; safe to call twice"""
+    # Python before 3.12 fails on a second stop
+    if listener._thread is not None:
+        listener.stop()
+
+def log_event(logger: logging.Logger, message: str, *args, rate: float = LOG_SAMPLE_RATE, **fields) -> None:
+    """Log a routine per-event message at INFO for a `rate` share of occurrences"""
+    if rate < 1:
+        if random.random() >= rate:
+            return
+        fields['sample_rate'] = rate
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(message, *args, extra=fields)
+
+def update_summary(update: object) -> dict:
+    """Describe an update by its ids, type and command, without its content"""
+    if not isinstance(update, Update):
+        return {'update_type': type(update).__name__}
+    summary = {
+        'update_id': update.update_id,
+        'update_type': next((kind for kind in Update.ALL_TYPES if getattr(update, kind, None) is not None), 'unknown'),
+        'chat_id': update.effective_chat.id if update.effective_chat else None,
+        'user_id': update.effective_user.id if update.effective_user else None
+    }
+    message = update.effective_message
+    if message is not None:
+        summary['message_id'] = message.message_id
+        if message.text and message.text.startswith('/'):
+            summary['command'] = message.text.split(maxsplit=1)[0]
+    return summary
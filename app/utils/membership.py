@@ -0,0 +1,169 @@
+import sys
+import time
+from collections import OrderedDict
+from typing import Iterable
+from telegram import ChatMember, ChatMemberUpdated
+from app.config import ADMIN_CACHE_TTL, MEMBERSHIP_MAX_CHATS
+
+# Roles are stored as small ints, which Python shares, so an entry costs a dict slot and the user id
+MEMBER, RESTRICTED, ADMINISTRATOR, OWNER, BANNED = range(1, 6)
+# Size of a user id (ids above 2**30 take 4 more bytes than small ones)
+USER_ID_SIZE = sys.getsizeof(2 ** 40)
+
+def role_of(member: ChatMember) -> int | None:
+    """Return the role code of a chat member, None if they are not in the chat"""
+    status = member.status
+    if status == ChatMember.OWNER:
+        return OWNER
+    if status == ChatMember.ADMINISTRATOR:
+        return ADMINISTRATOR
+    if status == ChatMember.MEMBER:
+        return MEMBER
+    if status == ChatMember.RESTRICTED:
+        return RESTRICTED if member.is_member else None
+    if status == ChatMember.BANNED:
+        return BANNED
+    return None
+
+class _ChatIndex:
+    __slots__ = ('roles', 'admins_until', 'live', 'fetched', 'verified', 'mismatched')
+
+    def __init__(self):
+        self.roles: dict[int, int] = {}
+        # The admin roles are complete until then; forever while chat_member updates arrive
+        self.admins_until = 0.0
+        self.live = False
+        # The admin roles came from get_chat_administrators, not only from a restore
+        self.fetched = False
+        self.verified = 0
+        self.mismatched = 0
+
+    def admin_ids(self) -> set[int]:
+        return {user_id for user_id, role in self.roles.items() if role in (ADMINISTRATOR, OWNER)}
+
+class MembershipIndex:
+    """Per-chat members and roles, kept current by chat_member updates
+
+    Telegram only sends chat_member updates to bots that are admins of the
+    chat. Until the first one arrives, admin roles loaded by `warm` from
+    get_chat_administrators are trusted for `ttl` seconds, like the admin
+    cache; afterwards they are kept current and never expire.
+    """
+
+    def __init__(self, ttl: float = ADMIN_CACHE_TTL, max_chats: int = MEMBERSHIP_MAX_CHATS):
+        self.ttl = ttl
+        self.max_chats = max_chats
+        self.updates = 0
+        self.answered = 0
+        self.unanswered = 0
+        self._chats: OrderedDict[int, _ChatIndex] = OrderedDict()
+
+    def _chat(self, chat_id: int) -> _ChatIndex:
+        chat = self._chats.get(chat_id)
+        if chat is None:
+            chat = self._chats[chat_id] = _ChatIndex()
+            while len(self._chats) > self.max_chats:
+                self._chats.popitem(last=False)
+        else:
+            self._chats.move_to_end(chat_id)
+        return chat
+
+    def apply(self, change: ChatMemberUpdated) -> None:
+        """Record a membership or role change from a chat_member update"""
+        self.updates += 1
+        chat = self._chat(change.chat.id)
+        if not chat.live:
+            chat.live = True
+            # Restored admins may have been demoted while the bot was down; they
+            # keep their TTL until the next fetch makes the list permanent
+            if chat.fetched and chat.admins_until > time.monotonic():
+                chat.admins_until = float('inf')
+        user_id = change.new_chat_member.user.id
+        role = role_of(change.new_chat_member)
+        if role is None:
+            chat.roles.pop(user_id, None)
+        else:
+            chat.roles[user_id] = role
+
+    def warm(self, chat_id: int, admins: Iterable[ChatMember]) -> None:
+        """Load the admin roles of a chat from a get_chat_administrators result"""
+        chat = self._chat(chat_id)
+        fetched = {admin.user.id: role_of(admin) for admin in admins}
+        if chat.admins_until:
+            # Compare what the index believed with what Telegram says
+            chat.verified += 1
+            if chat.admin_ids() != set(fetched):
+                chat.mismatched += 1
+        for user_id in chat.admin_ids() - set(fetched):
+            chat.roles[user_id] = MEMBER
+        chat.roles.update(fetched)
+        chat.fetched = True
+        chat.admins_until = float('inf') if chat.live else time.monotonic() + self.ttl
+
+    def invalidate(self, chat_id: int) -> None:
+        """Forget a chat, e.g. when the bot's own rights change and updates may stop"""
+        self._chats.pop(chat_id, None)
+
+    def is_admin(self, chat_id: int, user_id: int) -> bool | None:
+        """Return whether a user is an admin, None if the index cannot tell"""
+        chat = self._chats.get(chat_id)
+        if chat is None or chat.admins_until <= time.monotonic():
+            self.unanswered += 1
+            return None
+        self.answered += 1
+        return chat.roles.get(user_id) in (ADMINISTRATOR, OWNER)
+
+    def chat_stats(self, chat_id: int) -> dict | None:
+        """Return size, memory and accuracy of one chat's index"""
+        chat = self._chats.get(chat_id)
+        if chat is None:
+            return None
+        return {
+            'members': len(chat.roles),
+            'admins': len(chat.admin_ids()),
+            'live': chat.live,
+            'admins_known': chat.admins_until > time.monotonic(),
+            'bytes': self._size(chat),
+            'verified': chat.verified,
+            'accuracy': 1 - chat.mismatched / chat.verified if chat.verified else None
+        }
+
+    @staticmethod
+    def _size(chat: _ChatIndex) -> int:
+        # The dict and its int keys; role values are shared small ints
+        return sys.getsizeof(chat.roles) + len(chat.roles) * USER_ID_SIZE
+
+    def snapshot(self) -> dict:
+        """Return the roles of every chat as {chat id: [(user id, role), ...]}"""
+        return {chat_id: list(chat.roles.items()) for chat_id, chat in self._chats.items()}
+
+    def restore(self, state: dict | None) -> None:
+        """Load roles saved by `snapshot`; admins are trusted for `ttl` seconds until checked again"""
+        if not state:
+            return
+        expires_at = time.monotonic() + self.ttl
+        for chat_id, roles in state.items():
+            chat = self._chat(chat_id)
+            chat.roles.update(roles)
+            chat.admins_until = expires_at
+
+    def __len__(self) -> int:
+        return len(self._chats)
+
+    def stats(self) -> dict:
+        """Return totals over all chats"""
+        verified = sum(chat.verified for chat in self._chats.values())
+        mismatched = sum(chat.mismatched for chat in self._chats.values())
+        return {
+            'chats': len(self._chats),
+            'live_chats': sum(chat.live for chat in self._chats.values()),
+            'entries': sum(len(chat.roles) for chat in self._chats.values()),
+            'bytes': sum(self._size(chat) for chat in self._chats.values()),
+            'updates': self.updates,
+            'answered': self.answered,
+            'unanswered': self.unanswered,
+            'accuracy': 1 - mismatched / verified if verified else 1.0
+        }
+
+# Shared index fed by the chat_member handler
+membership = MembershipIndex()
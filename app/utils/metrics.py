@@ -0,0 +1,253 @@
+import bisect
+import logging
+import math
+import random
+import time
+from typing import Callable, Iterable
+from telegram.error import BadRequest, Forbidden, NetworkError, RetryAfter, TimedOut
+from telegram.ext import Application, ConversationHandler
+from telegram.request import HTTPXRequest
+from app.web_server import Request, Response
+from app.utils.startup import startup
+from app.config import LOG_SAMPLE_RATE
+from app.utils.logs import log_context
+
+logger = logging.getLogger(__name__)
+
+# Handler latencies in seconds
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _format_labels(names: tuple, values: tuple, extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+class _CounterSeries:
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+class Counter:
+    """Monotonic counter; series are plain objects, no locks (single event loop)"""
+
+    kind = 'counter'
+
+    def __init__(self, name: str, help: str, labelnames: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._series: dict[tuple, _CounterSeries] = {}
+
+    def labels(self, *values) -> _CounterSeries:
+        series = self._series.get(values)
+        if series is None:
+            series = self._series[values] = _CounterSeries()
+        return series
+
+    def inc(self, *values, amount: float = 1.0) -> None:
+        self.labels(*values).value += amount
+
+    def render(self) -> Iterable[str]:
+        for values, series in self._series.items():
+            yield f'{self.name}{_format_labels(self.labelnames, values)} {_format_value(series.value)}'
+
+class _HistogramSeries:
+    __slots__ = ('buckets', 'counts', 'sum')
+
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+class Histogram:
+    """Fixed-bucket histogram; observations are stored per bucket and summed at scrape time"""
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, help: str, labelnames: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self._series: dict[tuple, _HistogramSeries] = {}
+
+    def labels(self, *values) -> _HistogramSeries:
+        series = self._series.get(values)
+        if series is None:
+            series = self._series[values] = _HistogramSeries(self.buckets)
+        return series
+
+    def observe(self, value: float, *values) -> None:
+        self.labels(*values).observe(value)
+
+    def render(self) -> Iterable[str]:
+        for values, series in self._series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), series.counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                yield f'{self.name}_bucket{_format_labels(self.labelnames, values, le)} {cumulative}'
+            labels = _format_labels(self.labelnames, values)
+            yield f'{self.name}_sum{labels} {_format_value(series.sum)}'
+            yield f'{self.name}_count{labels} {cumulative}'
+
+class Collected:
+    """Metric read from existing state at scrape time
+
+    `collect` returns a number, or (label values, number) pairs when
+    `labelnames` is set.
+    """
+
+    def __init__(self, name: str, help: str, collect: Callable, labelnames: tuple = (), kind: str = 'gauge'):
+        self.name = name
+        self.help = help
+        self.collect = collect
+        self.labelnames = labelnames
+        self.kind = kind
+
+    def render(self) -> Iterable[str]:
+        samples = self.collect()
+        if not self.labelnames:
+            samples = [((), samples)]
+        for values, value in samples:
+            yield f'{self.name}{_format_labels(self.labelnames, values)} {_format_value(value)}'
+
+class Registry:
+    """Named metrics rendered in the Prometheus text format"""
+
+    def __init__(self):
+        self._metrics: dict[str, Counter | Histogram | Collected] = {}
+
+    def register(self, metric):
+        # Re-registering a name replaces it, e.g. when the application is rebuilt
+        self._metrics[metric.name] = metric
+        return metric
+
+    def collected(self, name: str, help: str, collect: Callable, labelnames: tuple = (), kind: str = 'gauge') -> Collected:
+        return self.register(Collected(name, help, collect, labelnames, kind))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+# Shared registry served on /metrics
+registry = Registry()
+
+handler_latency = registry.register(Histogram('bot_handler_duration_seconds', 'Handler run time; _count is the number of invocations', ('handler',)))
+handler_errors = registry.register(Counter('bot_handler_errors_total', 'Handler invocations that raised', ('handler',)))
+updates_total = registry.register(Counter('bot_updates_total', 'Updates handed to the update processor'))
+errors_total = registry.register(Counter('bot_errors_total', 'Errors passed to the error handler', ('error',)))
+api_calls = registry.register(Counter('bot_api_calls_total', 'Bot API requests by method and outcome', ('method', 'outcome')))
+fanout_deliveries = registry.register(Counter('bot_fanout_deliveries_total', 'Report DMs by outcome', ('outcome',)))
+
+# Wall-clock time of the last successful getUpdates, 0 until the first one
+last_poll = 0.0
+
+def api_outcome(error: BaseException | None) -> str:
+    """Classify a Bot API call result for the outcome label"""
+    if error is None:
+        return 'ok'
+    if isinstance(error, RetryAfter):
+        return 'retry_after'
+    if isinstance(error, BadRequest):
+        return 'bad_request'
+    if isinstance(error, Forbidden):
+        return 'forbidden'
+    if isinstance(error, TimedOut):
+        return 'timeout'
+    if isinstance(error, NetworkError):
+        return 'network_error'
+    return 'error'
+
+def seconds_since_last_poll() -> float:
+    return time.time() - last_poll if last_poll else math.nan
+
+def mark_polled() -> None:
+    global last_poll
+    last_poll = time.time()
+    startup.mark('first_poll')
+
+class PollTrackingRequest(HTTPXRequest):
+    """getUpdates request that records when Telegram last answered
+
+    getUpdates does not go through the rate limiter, so its calls are
+    counted here instead.
+    """
+
+    async def do_request(self, url: str, method: str, *args, **kwargs) -> tuple[int, bytes]:
+        api_method = url.rsplit('/', 1)[-1]
+        try:
+            code, payload = await super().do_request(url, method, *args, **kwargs)
+        except Exception as e:
+            api_calls.inc(api_method, api_outcome(e))
+            raise
+        api_calls.inc(api_method, 'ok' if code == 200 else f'http_{code}')
+        if code == 200:
+            mark_polled()
+        return code, payload
+
+def _timed(name: str, callback: Callable) -> Callable:
+    latency = handler_latency.labels(name)
+    errors = handler_errors.labels(name)
+    perf_counter = time.perf_counter
+    sample = random.random
+
+    async def timed_callback(update, context):
+        chat = getattr(update, 'effective_chat', None)
+        token = log_context.set((getattr(update, 'update_id', None), chat.id if chat else None, name))
+        started = perf_counter()
+        try:
+            return await callback(update, context)
+        except Exception:
+            errors.value += 1
+            raise
+        finally:
+            elapsed = perf_counter() - started
+            latency.observe(elapsed)
+            # Sampled inline, this runs for every handler
+            if sample() < LOG_SAMPLE_RATE:
+                logger.info("Handled update", extra={'latency_ms': round(elapsed * 1000, 3), 'sample_rate': LOG_SAMPLE_RATE})
+            log_context.reset(token)
+
+    timed_callback.__wrapped__ = callback
+    return timed_callback
+
+def instrument_handlers(app: Application) -> None:
+    """Time every registered handler callback, including those inside conversations"""
+    handlers = [handler for group in app.handlers.values() for handler in group]
+    while handlers:
+        handler = handlers.pop()
+        if isinstance(handler, ConversationHandler):
+            handlers.extend(handler.entry_points)
+            handlers.extend(handler.fallbacks)
+            for state in handler.states.values():
+                handlers.extend(state)
+        elif not hasattr(handler.callback, '__wrapped__'):
+            handler.callback = _timed(handler.callback.__name__, handler.callback)
+
+async def metrics_endpoint(request: Request) -> Response:
+    """Serve the registry for Prometheus to scrape"""
+    return Response(body=registry.render().encode(), content_type=CONTENT_TYPE)
@@ -0,0 +1,70 @@
+from telegram import User
+from telegram.ext import Job
+
+class PendingReport:
+    """State of a report waiting for its reason"""
+
+    __slots__ = (
+        'chat_id', 'user_id', 'reported_message_id', 'reported_user',
+        'reported_message_text', 'prompt_message_id', 'command_message_id', 'timeout_job'
+    )
+
+    def __init__(
+        self,
+        chat_id: int,
+        user_id: int,
+        reported_message_id: int,
+        reported_user: User | None,
+        reported_message_text: str,
+        prompt_message_id: int,
+        command_message_id: int
+    ):
+        self.chat_id = chat_id
+        self.user_id = user_id
+        self.reported_message_id = reported_message_id
+        self.reported_user = reported_user
+        self.reported_message_text = reported_message_text
+        self.prompt_message_id = prompt_message_id
+        self.command_message_id = command_message_id
+        self.timeout_job: Job | None = None
+
+class PendingReports:
+    """Registry of open reports keyed by (chat, user)"""
+
+    def __init__(self):
+        self._reports: dict[tuple[int, int], PendingReport] = {}
+
+    def add(self, report: PendingReport) -> None:
+        """Register a report, replacing (and cancelling) any older one for the same chat and user"""
+        self.close(report.chat_id, report.user_id)
+        self._reports[(report.chat_id, report.user_id)] = report
+
+    def get(self, chat_id: int, user_id: int) -> PendingReport | None:
+        return self._reports.get((chat_id, user_id))
+
+    def pop(self, chat_id: int, user_id: int) -> PendingReport | None:
+        """Remove a report without touching its timeout job"""
+        return self._reports.pop((chat_id, user_id), None)
+
+    def close(self, chat_id: int, user_id: int) -> PendingReport | None:
+        """Remove a report and cancel its timeout job"""
+        report = self._reports.pop((chat_id, user_id), None)
+        if report is not None and report.timeout_job is not None:
+            report.timeout_job.schedule_removal()
+        return report
+
+    def snapshot(self) -> list[tuple[float, tuple]]:
+        """Return open reports as (wall-clock timeout, fields) pairs"""
+        return [
+            (
+                report.timeout_job.next_t.timestamp() if report.timeout_job and report.timeout_job.next_t else 0.0,
+                tuple(getattr(report, field) for field in PendingReport.__slots__[:-1])
+            )
+            for report in self._reports.values()
+        ]
+
+    def __len__(self) -> int:
+        return len(self._reports)
+
+# Shared registry used by the /report conversation
+pending_reports = PendingReports()
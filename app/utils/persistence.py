@@ -0,0 +1,220 @@
+import asyncio
+import json
+import logging
+import pickle
+import sqlite3
+import threading
+import time
+from typing import Any, Callable
+from telegram.ext import BasePersistence, PersistenceInput
+from app.config import PERSISTENCE_DB, PERSISTENCE_WRITE_DELAY
+
+logger = logging.getLogger(__name__)
+
+# Longest wait between attempts while writes keep failing
+WRITE_RETRY_MAX = 60.0
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS entries (kind TEXT NOT NULL, key TEXT NOT NULL, value BLOB NOT NULL, PRIMARY KEY (kind, key))',
+    'CREATE TABLE IF NOT EXISTS runtime (name TEXT PRIMARY KEY, value BLOB NOT NULL)',
+)
+
+class SQLitePersistence(BasePersistence[dict, dict, dict]):
+    """Persistence backed by a WAL-mode SQLite file
+
+    Only entries PTB reports as changed are written, one row per user, chat
+    or conversation key. Changes are collected for `write_delay` seconds and
+    committed in a single transaction off the event loop. Other runtime state
+    (pending deletions, open reports) is registered with `track` and saved
+    on flush, which the application runs when it shuts down on SIGTERM.
+    """
+
+    def __init__(self, path: str, write_delay: float = PERSISTENCE_WRITE_DELAY, update_interval: float = 60):
+        super().__init__(
+            store_data=PersistenceInput(bot_data=True, chat_data=True, user_data=True, callback_data=False),
+            update_interval=update_interval
+        )
+        self.path = path
+        self.write_delay = write_delay
+        self.writes = 0
+        self.rows_written = 0
+        self.write_seconds = 0.0
+        self.restore_seconds = 0.0
+        self._conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        for statement in SCHEMA:
+            self._conn.execute(statement)
+        self._lock = threading.Lock()
+        self._dirty: dict[tuple[str, str], Any] = {}
+        self._write_task: asyncio.Task | None = None
+        self._writing = False
+        self._flushing = False
+        self.write_failures = 0
+        self._tracked: dict[str, Callable[[], Any]] = {}
+
+    # Reading (only at startup)
+
+    def _load(self, kind: str) -> dict[str, Any]:
+        started = time.perf_counter()
+        rows = self._conn.execute('SELECT key, value FROM entries WHERE kind = ?', (kind,)).fetchall()
+        data = {key: pickle.loads(value) for key, value in rows}
+        self.restore_seconds += time.perf_counter() - started
+        return data
+
+    async def get_user_data(self) -> dict[int, dict]:
+        return {int(key): value for key, value in self._load('user').items()}
+
+    async def get_chat_data(self) -> dict[int, dict]:
+        return {int(key): value for key, value in self._load('chat').items()}
+
+    async def get_bot_data(self) -> dict:
+        return self._load('bot').get('', {})
+
+    async def get_callback_data(self) -> None:
+        return None
+
+    async def get_conversations(self, name: str) -> dict[tuple, object]:
+        return {tuple(json.loads(key)): state for key, state in self._load(f'conversation:{name}').items()}
+
+    def load_state(self, name: str) -> Any:
+        """Return runtime state saved under `name` by a previous run, if any"""
+        row = self._conn.execute('SELECT value FROM runtime WHERE name = ?', (name,)).fetchone()
+        return pickle.loads(row[0]) if row else None
+
+    # Writing (batched)
+
+    def _mark(self, kind: str, key: Any, value: Any) -> None:
+        # None means delete; the latest value for a key wins within a batch
+        self._dirty[(kind, str(key))] = value
+        if self._write_task is None or self._write_task.done():
+            self._write_task = asyncio.get_running_loop().create_task(self._write_soon())
+
+    async def _write_soon(self) -> None:
+        failures = 0
+        while True:
+            # Back off while the database keeps failing
+            await asyncio.sleep(min(WRITE_RETRY_MAX, self.write_delay * 2 ** failures))
+            batch, written = self._serialize_dirty()
+            if batch:
+                self._writing = True
+                try:
+                    await asyncio.to_thread(self._write, batch)
+                except Exception as e:
+                    failures += 1
+                    self.write_failures += 1
+                    logger.error("Failed to write %d persisted entries, retrying: %s", len(batch), e)
+                else:
+                    failures = 0
+                    self._clean(written)
+                finally:
+                    self._writing = False
+            # Entries marked during the write saw this task running and scheduled nothing
+            if self._flushing or not self._dirty:
+                return
+
+    def _serialize_dirty(self) -> tuple[list[tuple[str, str, bytes | None]], dict[tuple[str, str], Any]]:
+        # Pickle on the event loop so handlers cannot mutate data mid-write
+        written = dict(self._dirty)
+        batch = [
+            (kind, key, None if value is None else pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+            for (kind, key), value in written.items()
+        ]
+        return batch, written
+
+    def _clean(self, written: dict[tuple[str, str], Any]) -> None:
+        # Keys stay dirty until written; ones marked again meanwhile are kept for the next batch
+        for entry, value in written.items():
+            if self._dirty.get(entry, entry) is value:
+                del self._dirty[entry]
+
+    def _write(self, batch: list[tuple[str, str, bytes | None]], runtime: dict[str, bytes] | None = None) -> None:
+        started = time.perf_counter()
+        upserts = [row for row in batch if row[2] is not None]
+        deletes = [(kind, key) for kind, key, value in batch if value is None]
+        with self._lock:
+            self._conn.execute('BEGIN')
+            try:
+                self._conn.executemany('INSERT OR REPLACE INTO entries (kind, key, value) VALUES (?, ?, ?)', upserts)
+                self._conn.executemany('DELETE FROM entries WHERE kind = ? AND key = ?', deletes)
+                if runtime:
+                    self._conn.executemany('INSERT OR REPLACE INTO runtime (name, value) VALUES (?, ?)', runtime.items())
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+        self.writes += 1
+        self.rows_written += len(batch)
+        self.write_seconds += time.perf_counter() - started
+
+    async def update_user_data(self, user_id: int, data: dict) -> None:
+        self._mark('user', user_id, dict(data))
+
+    async def update_chat_data(self, chat_id: int, data: dict) -> None:
+        self._mark('chat', chat_id, dict(data))
+
+    async def update_bot_data(self, data: dict) -> None:
+        self._mark('bot', '', dict(data))
+
+    async def update_callback_data(self, data: Any) -> None:
+        pass
+
+    async def update_conversation(self, name: str, key: tuple, new_state: object | None) -> None:
+        self._mark(f'conversation:{name}', json.dumps(list(key)), new_state)
+
+    async def drop_user_data(self, user_id: int) -> None:
+        self._mark('user', user_id, None)
+
+    async def drop_chat_data(self, chat_id: int) -> None:
+        self._mark('chat', chat_id, None)
+
+    async def refresh_user_data(self, user_id: int, user_data: dict) -> None:
+        pass
+
+    async def refresh_chat_data(self, chat_id: int, chat_data: dict) -> None:
+        pass
+
+    async def refresh_bot_data(self, bot_data: dict) -> None:
+        pass
+
+    # Runtime state and shutdown
+
+    def track(self, name: str, snapshot: Callable[[], Any]) -> None:
+        """Save `snapshot()` under `name` whenever the persistence is flushed"""
+        self._tracked[name] = snapshot
+
+    async def flush(self) -> None:
+        """Write everything still pending, including tracked runtime state"""
+        task = self._write_task
+        if task is not None and not task.done():
+            # Let a write in progress finish, but skip a wait for the next one
+            self._flushing = True
+            if not self._writing:
+                task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+            finally:
+                self._flushing = False
+        runtime = {name: pickle.dumps(snapshot(), pickle.HIGHEST_PROTOCOL) for name, snapshot in self._tracked.items()}
+        batch, written = self._serialize_dirty()
+        self._write(batch, runtime)
+        self._clean(written)
+        with self._lock:
+            self._conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        logger.info("Persistence flushed (%d writes, %d rows, %.1f ms writing)", self.writes, self.rows_written, self.write_seconds * 1000)
+
+    def stats(self) -> dict:
+        """Return write and restore timings"""
+        return {
+            'writes': self.writes,
+            'rows_written': self.rows_written,
+            'write_seconds': self.write_seconds,
+            'restore_seconds': self.restore_seconds,
+            'write_failures': self.write_failures,
+            'pending': len(self._dirty)
+        }
+
+# Shared instance, None when persistence is disabled
+persistence = SQLitePersistence(PERSISTENCE_DB) if PERSISTENCE_DB else None
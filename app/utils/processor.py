@@ -0,0 +1,96 @@
+import asyncio
+from typing import Any, Awaitable
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+from app.config import UPDATE_CONCURRENCY
+from app.utils.metrics import updates_total
+from app.utils.dedupe import UpdateDeduplicator, seen_updates
+from app.utils.startup import startup
+
+class _Shard:
+    __slots__ = ('lock', 'waiting')
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.waiting = 0
+
+class ChatShardedUpdateProcessor(BaseUpdateProcessor):
+    """Process updates of different chats concurrently, each chat in order
+
+    Updates are sharded by chat id (falling back to the user id for updates
+    without a chat). A FIFO lock per shard keeps a chat's updates, and with
+    them every user's report conversation, in arrival order. At most
+    `concurrency` handlers run at once; the lock is taken before a slot, so
+    a backlog in one busy chat cannot occupy the slots other chats need.
+    Updates already seen by `dedupe` are dropped before any handler runs.
+    """
+
+    def __init__(
+        self,
+        concurrency: int = UPDATE_CONCURRENCY,
+        max_pending: int = 4096,
+        dedupe: UpdateDeduplicator | None = seen_updates
+    ):
+        # PTB's own semaphore only caps how many updates may be waiting in here
+        super().__init__(max_concurrent_updates=max(max_pending, concurrency))
+        self.concurrency = concurrency
+        self.dedupe = dedupe
+        self.max_shard_backlog = 0
+        self._slots: asyncio.Semaphore | None = None
+        self._shards: dict[int, _Shard] = {}
+
+    @staticmethod
+    def shard_key(update: object) -> int | None:
+        if not isinstance(update, Update):
+            return None
+        if update.effective_chat is not None:
+            return update.effective_chat.id
+        if update.effective_user is not None:
+            return update.effective_user.id
+        return None
+
+    async def initialize(self) -> None:
+        self._slots = asyncio.Semaphore(self.concurrency)
+
+    async def shutdown(self) -> None:
+        self._shards.clear()
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        updates_total.inc()
+        startup.mark('first_update')
+        if self.dedupe is not None and isinstance(update, Update) and await self.dedupe.check(update.update_id):
+            # Redelivered after a restart, a webhook retry or by another worker
+            coroutine.close()
+            return
+
+        key = self.shard_key(update)
+        if key is None:
+            async with self._slots:
+                await coroutine
+            return
+
+        shard = self._shards.get(key)
+        if shard is None:
+            shard = self._shards[key] = _Shard()
+        shard.waiting += 1
+        self.max_shard_backlog = max(self.max_shard_backlog, shard.waiting)
+        try:
+            async with shard.lock:
+                async with self._slots:
+                    await coroutine
+        finally:
+            shard.waiting -= 1
+            # Forget idle chats so memory tracks active chats only
+            if not shard.waiting:
+                del self._shards[key]
+
+    def stats(self) -> dict:
+        """Return the number of busy chats and the deepest per-chat backlog seen"""
+        return {
+            'active_chats': len(self._shards),
+            'in_flight': self.current_concurrent_updates,
+            'max_shard_backlog': self.max_shard_backlog
+        }
+
+# Shared instance plugged into the ApplicationBuilder
+update_processor = ChatShardedUpdateProcessor()
@@ -0,0 +1,331 @@
+import asyncio
+import heapq
+import logging
+import math
+import time
+from collections import OrderedDict, deque
+from datetime import timedelta
+from typing import Any
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+from app.config import RATE_LIMIT_GLOBAL, RATE_LIMIT_GROUP_PER_MINUTE, RATE_LIMIT_PRIVATE, RATE_LIMIT_MAX_RETRIES
+from app.utils.metrics import registry, Histogram, api_calls, api_outcome
+from app.utils.startup import startup
+
+logger = logging.getLogger(__name__)
+
+def retry_after_seconds(error: RetryAfter) -> float:
+    """Return the server-provided flood wait of a RetryAfter in seconds"""
+    delay = error.retry_after
+    if isinstance(delay, timedelta):
+        return delay.total_seconds()
+    return float(delay)
+
+class TokenBucket:
+    """Token bucket refilled continuously at `rate` tokens per second"""
+
+    __slots__ = ('rate', 'capacity', 'tokens', 'updated_at')
+
+    def __init__(self, rate: float, capacity: float | None = None):
+        if rate <= 0:
+            raise ValueError(f"Token bucket rate must be positive, got {rate}")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def try_acquire(self, tokens: float = 1.0) -> float:
+        """Take tokens if available; otherwise return the seconds to wait for them"""
+        self._refill(time.monotonic())
+        if self.tokens >= tokens:
+            self.tokens -= tokens
+            return 0.0
+        return (tokens - self.tokens) / self.rate
+
+    async def acquire(self, tokens: float = 1.0) -> None:
+        """Wait until tokens are available and take them"""
+        while True:
+            wait = self.try_acquire(tokens)
+            if not wait:
+                return
+            await asyncio.sleep(wait)
+
+# Request priorities, lower runs first
+PRIORITY_MODERATION = 0
+PRIORITY_REPLY = 1
+PRIORITY_COSMETIC = 2
+
+ENDPOINT_PRIORITIES = {
+    'restrictChatMember': PRIORITY_MODERATION,
+    'banChatMember': PRIORITY_MODERATION,
+    'unbanChatMember': PRIORITY_MODERATION,
+    'approveChatJoinRequest': PRIORITY_MODERATION,
+    'declineChatJoinRequest': PRIORITY_MODERATION,
+    'getChatAdministrators': PRIORITY_MODERATION,
+    'getChatMember': PRIORITY_MODERATION,
+    'answerCallbackQuery': PRIORITY_MODERATION,
+    'deleteMessage': PRIORITY_COSMETIC,
+    'deleteMessages': PRIORITY_COSMETIC,
+    'setMessageReaction': PRIORITY_COSMETIC,
+}
+
+# Only these count against Telegram's per-chat message limits
+CHAT_LIMITED_PREFIXES = ('send', 'edit', 'copy', 'forward')
+
+# Calls that count as replying, for the startup timeline
+REPLY_ENDPOINTS = ('sendMessage', 'editMessageText')
+
+WAIT_BUCKETS = (0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+outbound_wait = registry.register(Histogram(
+    'bot_outbound_wait_seconds', 'Time Bot API requests waited in the outbound scheduler by priority', ('priority',), WAIT_BUCKETS
+))
+
+class _Pending:
+    __slots__ = ('priority', 'chat_id', 'chat_limited', 'granted', 'enqueued_at')
+
+    def __init__(self, priority: int, chat_id: int | None, chat_limited: bool):
+        self.priority = priority
+        self.chat_id = chat_id
+        self.chat_limited = chat_limited
+        self.granted = asyncio.get_running_loop().create_future()
+        self.enqueued_at = time.monotonic()
+
+class OutboundScheduler(BaseRateLimiter[int]):
+    """Schedule every Bot API request under global and per-chat token buckets
+
+    Requests wait in one queue per priority. A single dispatcher grants them
+    in priority order, parking requests whose chat has no token left, and
+    pauses everything when Telegram answers with a 429. `rate_limit_args`
+    may be passed to a bot method to override the priority of a call.
+    """
+
+    def __init__(
+        self,
+        global_rate: float = RATE_LIMIT_GLOBAL,
+        group_per_minute: float = RATE_LIMIT_GROUP_PER_MINUTE,
+        private_rate: float = RATE_LIMIT_PRIVATE,
+        max_retries: int = RATE_LIMIT_MAX_RETRIES,
+        max_chats: int = 10000
+    ):
+        self.global_bucket = TokenBucket(global_rate)
+        self.group_per_minute = group_per_minute
+        self.private_rate = private_rate
+        self.max_retries = max_retries
+        self.max_chats = max_chats
+        self.granted = 0
+        self.retries = 0
+        self.floods = 0
+        self._chat_buckets: OrderedDict[int, TokenBucket] = OrderedDict()
+        self._queues = tuple(deque() for _ in (PRIORITY_MODERATION, PRIORITY_REPLY, PRIORITY_COSMETIC))
+        # Per priority: requests of chats out of tokens, and (refill time, chat id) of each such chat
+        self._waits = tuple(outbound_wait.labels(priority) for priority in range(len(self._queues)))
+        self._parked: tuple[dict[int, deque], ...] = tuple({} for _ in self._queues)
+        self._refills: tuple[list[tuple[float, int]], ...] = tuple([] for _ in self._queues)
+        self._paused_until = 0.0
+        self._wakeup: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+
+    async def initialize(self) -> None:
+        # The bot may be initialized more than once (application and updater)
+        if self._task is not None:
+            return
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._dispatch())
+
+    async def shutdown(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        # Let anything still waiting go through rather than hang
+        waiting = [*self._queues, *(queue for parked in self._parked for queue in parked.values())]
+        for queue in waiting:
+            while queue:
+                pending = queue.popleft()
+                if not pending.granted.done():
+                    pending.granted.set_result(None)
+        for parked, refills in zip(self._parked, self._refills):
+            parked.clear()
+            refills.clear()
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            if chat_id < 0:
+                bucket = TokenBucket(self.group_per_minute / 60, capacity=self.group_per_minute)
+            else:
+                bucket = TokenBucket(self.private_rate, capacity=1)
+            self._chat_buckets[chat_id] = bucket
+            if len(self._chat_buckets) > self.max_chats:
+                self._chat_buckets.popitem(last=False)
+        else:
+            self._chat_buckets.move_to_end(chat_id)
+        return bucket
+
+    def _next_ready(self) -> tuple[_Pending | None, float]:
+        """Pop the first request whose chat has a token, or return the shortest wait
+
+        Only queue heads are looked at. A head whose chat has no token left
+        is parked with the rest of that chat's requests until the chat's
+        bucket refills, so it does not hold up other chats.
+        """
+        now = time.monotonic()
+        shortest = math.inf
+        for queue, parked, refills in zip(self._queues, self._parked, self._refills):
+            # Parked chats whose bucket has refilled go first, they were queued earlier
+            while refills and refills[0][0] <= now:
+                chat_id = refills[0][1]
+                waiting = parked[chat_id]
+                while waiting and waiting[0].granted.done():
+                    # The caller gave up (e.g. cancelled), drop it
+                    waiting.popleft()
+                if not waiting:
+                    heapq.heappop(refills)
+                    del parked[chat_id]
+                    continue
+                wait = self._chat_bucket(chat_id).try_acquire()
+                if wait:
+                    heapq.heapreplace(refills, (now + wait, chat_id))
+                    continue
+                pending = waiting.popleft()
+                if not waiting:
+                    heapq.heappop(refills)
+                    del parked[chat_id]
+                return pending, 0.0
+
+            while queue:
+                pending = queue.popleft()
+                if pending.granted.done():
+                    continue
+                if not pending.chat_limited:
+                    return pending, 0.0
+                waiting = parked.get(pending.chat_id)
+                if waiting is not None:
+                    # Keep the chat's requests in order behind the parked one
+                    waiting.append(pending)
+                    continue
+                wait = self._chat_bucket(pending.chat_id).try_acquire()
+                if not wait:
+                    return pending, 0.0
+                parked[pending.chat_id] = deque((pending,))
+                heapq.heappush(refills, (now + wait, pending.chat_id))
+
+            if refills:
+                shortest = min(shortest, refills[0][0] - now)
+        return None, shortest
+
+    def _queued(self) -> bool:
+        return any(self._queues) or any(self._parked)
+
+    async def _dispatch(self) -> None:
+        while True:
+            if not self._queued():
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            pause = self._paused_until - time.monotonic()
+            if pause > 0:
+                await asyncio.sleep(pause)
+                continue
+
+            wait = self.global_bucket.try_acquire()
+            if wait:
+                await asyncio.sleep(wait)
+                continue
+
+            pending, wait = self._next_ready()
+            if pending is None:
+                # Give the global token back and wait for a chat bucket to refill
+                self.global_bucket.tokens += 1
+                if wait:
+                    self._wakeup.clear()
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), timeout=wait)
+                    except asyncio.TimeoutError:
+                        pass
+                continue
+
+            self.granted += 1
+            self._waits[pending.priority].observe(time.monotonic() - pending.enqueued_at)
+            pending.granted.set_result(None)
+
+    @staticmethod
+    async def _call(endpoint: str, callback, args: Any, kwargs: dict[str, Any]):
+        try:
+            result = await callback(*args, **kwargs)
+        except Exception as e:
+            api_calls.inc(endpoint, api_outcome(e))
+            raise
+        api_calls.inc(endpoint, 'ok')
+        if endpoint in REPLY_ENDPOINTS:
+            startup.mark('first_reply')
+        return result
+
+    async def process_request(
+        self,
+        callback,
+        args: Any,
+        kwargs: dict[str, Any],
+        endpoint: str,
+        data: dict[str, Any],
+        rate_limit_args: int | None
+    ):
+        priority = rate_limit_args if rate_limit_args is not None else ENDPOINT_PRIORITIES.get(endpoint, PRIORITY_REPLY)
+        chat_id = data.get('chat_id')
+        try:
+            chat_id = int(chat_id) if chat_id is not None else None
+        except (TypeError, ValueError):
+            # @channel usernames, treat like a group
+            chat_id = -abs(hash(chat_id))
+        chat_limited = chat_id is not None and endpoint.startswith(CHAT_LIMITED_PREFIXES)
+
+        if self._task is None:
+            # Not running (e.g. during shutdown), don't queue behind a dead dispatcher
+            return await self._call(endpoint, callback, args, kwargs)
+
+        attempt = 0
+        while True:
+            pending = _Pending(priority, chat_id, chat_limited)
+            self._queues[priority].append(pending)
+            self._wakeup.set()
+            try:
+                await pending.granted
+            except asyncio.CancelledError:
+                pending.granted.cancel()
+                raise
+
+            try:
+                return await self._call(endpoint, callback, args, kwargs)
+            except RetryAfter as e:
+                self.floods += 1
+                if attempt >= self.max_retries:
+                    raise
+                attempt += 1
+                self.retries += 1
+                delay = retry_after_seconds(e)
+                logger.info("Flood control on %s, pausing outbound requests for %.1f seconds", endpoint, delay)
+                self._paused_until = max(self._paused_until, time.monotonic() + delay)
+
+    def stats(self) -> dict:
+        """Return queue depths and 429 counters; wait times are in `outbound_wait`"""
+        return {
+            'queued': {
+                priority: len(queue) + sum(map(len, parked.values()))
+                for priority, (queue, parked) in enumerate(zip(self._queues, self._parked))
+            },
+            'granted': self.granted,
+            'floods': self.floods,
+            'retries': self.retries
+        }
+
+# Shared instance plugged into the ApplicationBuilder
+outbound = OutboundScheduler()
@@ -0,0 +1,89 @@
+import time
+from app.config import UNREACHABLE_RETRY_BASE, UNREACHABLE_RETRY_MAX
+from app.utils.metrics import registry, Counter
+
+fanout_recipients = registry.register(Counter(
+    'bot_fanout_recipients_total', 'Report DM recipients by whether delivery was attempted or skipped as unreachable', ('action',)
+))
+
+class _Unreachable:
+    __slots__ = ('failures', 'since', 'retry_at', 'error')
+
+    def __init__(self, since: float):
+        self.failures = 0
+        self.since = since
+        self.retry_at = 0.0
+        self.error = ''
+
+class ReachabilityCache:
+    """Users the bot cannot DM because they blocked it or never started it
+
+    A failed DM marks the user unreachable; further DMs are skipped until
+    a re-probe is due, `base` seconds after the first failure and twice as
+    long after each further one, up to `max_delay`. Messaging the bot, or
+    a delivered DM, makes the user reachable again. Times are wall-clock
+    so they survive a restart.
+    """
+
+    def __init__(self, base: float = UNREACHABLE_RETRY_BASE, max_delay: float = UNREACHABLE_RETRY_MAX):
+        self.base = base
+        self.max_delay = max_delay
+        self.skipped = 0
+        self.attempted = 0
+        self._users: dict[int, _Unreachable] = {}
+
+    def should_skip(self, user_id: int) -> bool:
+        """Count a DM about to be sent; return True if it should not be tried"""
+        entry = self._users.get(user_id)
+        if entry is not None and time.time() < entry.retry_at:
+            self.skipped += 1
+            fanout_recipients.inc('skipped')
+            return True
+        self.attempted += 1
+        fanout_recipients.inc('attempted')
+        return False
+
+    def mark_unreachable(self, user_id: int, error: str) -> None:
+        """Record a failed DM and back off before the next probe"""
+        now = time.time()
+        entry = self._users.get(user_id)
+        if entry is None:
+            entry = self._users[user_id] = _Unreachable(now)
+        elif now < entry.retry_at:
+            # Another DM that was already in flight, not a new probe
+            entry.error = error
+            return
+        entry.failures += 1
+        entry.error = error
+        entry.retry_at = now + min(self.max_delay, self.base * 2 ** (entry.failures - 1))
+
+    def mark_reachable(self, user_id: int) -> None:
+        """Forget a user's failures, e.g. when they message the bot"""
+        self._users.pop(user_id, None)
+
+    def status(self, user_id: int) -> dict | None:
+        """Return when a user became unreachable, why, and when they are probed next"""
+        entry = self._users.get(user_id)
+        if entry is None:
+            return None
+        return {'since': entry.since, 'failures': entry.failures, 'retry_at': entry.retry_at, 'error': entry.error}
+
+    def snapshot(self) -> list:
+        return [(user_id, e.failures, e.since, e.retry_at, e.error) for user_id, e in self._users.items()]
+
+    def restore(self, state: list | None) -> None:
+        """Load unreachable users saved by `snapshot`"""
+        for user_id, failures, since, retry_at, error in state or ():
+            entry = self._users[user_id] = _Unreachable(since)
+            entry.failures = failures
+            entry.retry_at = retry_at
+            entry.error = error
+
+    def __len__(self) -> int:
+        return len(self._users)
+
+    def stats(self) -> dict:
+        return {'unreachable': len(self._users), 'skipped': self.skipped, 'attempted': self.attempted}
+
+# Shared cache consulted by report fan-out
+reachability = ReachabilityCache()
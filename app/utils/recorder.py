@@ -0,0 +1,163 @@
+import asyncio
+import glob
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import zlib
+from typing import Iterator
+from telegram import Update
+from telegram.ext import ContextTypes
+from app.config import TOKEN, RECORD_DIR, RECORD_MAX_BYTES, RECORD_KEEP
+
+logger = logging.getLogger(__name__)
+
+FILE_PATTERN = 'updates-*.jsonl.gz'
+
+# Personal fields dropped from every recorded user or chat; first_name is required, so it is replaced
+PERSONAL_FIELDS = ('last_name', 'username', 'bio', 'phone_number', 'language_code')
+# Message text replaced by filler of the same length, so entity offsets stay valid
+TEXT_FIELDS = ('text', 'caption')
+
+def pseudonym(user_id: int) -> int:
+    """Map a user id to a stable stand-in; keyed with the bot token so it cannot be reversed"""
+    digest = hashlib.blake2b(str(user_id).encode(), key=TOKEN.encode()[:64], digest_size=6).digest()
+    return int.from_bytes(digest, 'big')
+
+def _redact_text(text: str) -> str:
+    # Keep a leading /command so replays hit the same handlers
+    command, space, rest = text.partition(' ') if text.startswith('/') else ('', '', text)
+    # Telegram counts offsets in UTF-16 code units, so characters outside the BMP take two
+    return command + space + ''.join(c if c.isspace() else 'xx' if ord(c) > 0xFFFF else 'x' for c in rest)
+
+def redact(value):
+    """Return a copy of a raw update with names, user ids and message text removed"""
+    if isinstance(value, list):
+        return [redact(item) for item in value]
+    if not isinstance(value, dict):
+        return value
+
+    redacted = {}
+    for key, item in value.items():
+        if key in PERSONAL_FIELDS:
+            continue
+        if key == 'first_name':
+            redacted[key] = 'User'
+        elif key in TEXT_FIELDS and isinstance(item, str):
+            redacted[key] = _redact_text(item)
+        elif key == 'user_chat_id':
+            redacted[key] = pseudonym(item)
+        else:
+            redacted[key] = redact(item)
+
+    # Users (other than bots) and private chats are identified by the user id
+    is_person = value.get('is_bot') is False or value.get('type') == 'private'
+    if is_person and isinstance(value.get('id'), int):
+        redacted['id'] = pseudonym(value['id'])
+    return redacted
+
+class UpdateRecorder:
+    """Append redacted raw updates to rotating gzip-compressed JSONL files
+
+    Each line is {"t": receive time, "update": raw update}. Lines are
+    buffered and written in batches off the event loop; a file is rotated
+    once it reaches `max_bytes` compressed and only the newest `keep`
+    files are kept.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = RECORD_MAX_BYTES, keep: int = RECORD_KEEP, flush_interval: float = 1.0):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.keep = keep
+        self.flush_interval = flush_interval
+        self.recorded = 0
+        self.rotations = 0
+        self._pending: list[str] = []
+        self._file: gzip.GzipFile | None = None
+        self._path: str | None = None
+        self._flush_task: asyncio.Task | None = None
+        # A write cancelled on the loop keeps running in its thread; close() must not overlap it
+        self._lock = threading.RLock()
+        os.makedirs(directory, exist_ok=True)
+
+    async def record(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        """Handler callback that queues an update for writing"""
+        line = json.dumps({'t': round(time.time(), 3), 'update': redact(update.to_dict())}, ensure_ascii=False)
+        self._pending.append(line + '\n')
+        self.recorded += 1
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_soon())
+
+    async def _flush_soon(self) -> None:
+        try:
+            await asyncio.sleep(self.flush_interval)
+        finally:
+            # One writer at a time; lines queued meanwhile go in the next batch
+            while self._pending:
+                lines, self._pending = self._pending, []
+                await asyncio.to_thread(self._write, lines)
+            self._flush_task = None
+
+    def _write(self, lines: list[str]) -> None:
+        with self._lock:
+            if self._file is None:
+                self._open()
+            self._file.write(''.join(lines).encode())
+            self._file.flush()
+            if os.path.getsize(self._path) >= self.max_bytes:
+                self._file.close()
+                self._file = None
+                self.rotations += 1
+
+    def _close(self, lines: list[str]) -> None:
+        with self._lock:
+            if lines:
+                self._write(lines)
+            if self._file:
+                self._file.close()
+                self._file = None
+
+    def _open(self) -> None:
+        self._path = os.path.join(self.directory, f'updates-{time.time_ns() // 1000000}.jsonl.gz')
+        self._file = gzip.open(self._path, 'ab')
+        # Drop the oldest recordings beyond the limit; the file just opened is always kept
+        paths = sorted(glob.glob(os.path.join(self.directory, FILE_PATTERN)))
+        for path in paths[:len(paths) - max(1, self.keep)]:
+            os.remove(path)
+
+    async def close(self) -> None:
+        """Write what is buffered and close the current file"""
+        if self._flush_task:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        # A flush task cancelled before it started never wrote its lines
+        lines, self._pending = self._pending, []
+        await asyncio.to_thread(self._close, lines)
+
+    def stats(self) -> dict:
+        return {'recorded': self.recorded, 'buffered': len(self._pending), 'rotations': self.rotations, 'file': self._path}
+
+def read_recording(*paths: str) -> Iterator[tuple[float, dict]]:
+    """Yield (receive time, raw update) from recording files or directories, oldest first"""
+    files = []
+    for path in paths:
+        files.extend(sorted(glob.glob(os.path.join(path, FILE_PATTERN))) if os.path.isdir(path) else [path])
+    for path in files:
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                for line in f:
+                    entry = json.loads(line)
+                    yield entry['t'], entry['update']
+        except (EOFError, zlib.error, json.JSONDecodeError):
+            # The last file of a killed process ends mid-stream
+            logger.warning("Recording %s is truncated, replaying what could be read", path)
+
+# Opt-in recorder, None unless RECORD_DIR is set
+recorder = UpdateRecorder(RECORD_DIR) if RECORD_DIR else None
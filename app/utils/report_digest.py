@@ -0,0 +1,222 @@
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import NamedTuple
+from telegram import Bot, User
+from app.config import REPORT_WINDOW
+from app.utils.admin_cache import admin_cache
+from app.utils.fanout import fan_out
+from app.utils.metrics import registry, Counter
+from app.utils.pending_reports import PendingReport
+
+logger = logging.getLogger(__name__)
+
+report_cases = registry.register(Counter('bot_reports_total', 'Reports submitted, by whether they opened a case or joined one', ('kind',)))
+
+# Later reports of a message edit its admin DMs for this many seconds
+CASE_LIFETIME = 3600.0
+# Reporters listed by name in a DM; the rest are counted
+MAX_LISTED = 10
+# Longest per-chat window admins can set
+MAX_WINDOW = 600.0
+# Sending a case that failed is retried this many seconds later, doubling each time, up to FLUSH_ATTEMPTS tries
+FLUSH_RETRY_DELAY = 5.0
+FLUSH_ATTEMPTS = 5
+
+class _Reporter(NamedTuple):
+    user_id: int
+    name: str
+    username: str | None
+    reason: str
+    at: datetime
+
+class _ReportCase:
+    __slots__ = ('chat_title', 'reported_user', 'reported_text', 'reporters', 'admin_messages', 'shown', 'failures', 'task', 'updated')
+
+    def __init__(self, chat_title: str, reported_user: User | None, reported_text: str):
+        self.chat_title = chat_title
+        self.reported_user = reported_user
+        self.reported_text = reported_text
+        self.reporters: dict[int, _Reporter] = {}
+        # Admin id -> message id of the DM to edit on later reports
+        self.admin_messages: dict[int, int] = {}
+        self.shown = 0
+        self.failures = 0
+        self.task: asyncio.Task | None = None
+        self.updated = 0.0
+
+def report_text(case: _ReportCase) -> str:
+    """Describe a reported message with everyone who reported it"""
+    reporters = list(case.reporters.values())
+    reported_user = case.reported_user
+    header = "🚨 NEW REPORT" if len(reporters) == 1 else f"🚨 REPORTED BY {len(reporters)} MEMBERS"
+    lines = [
+        f"• {r.name} (@{r.username or 'N/A'}, {r.user_id}): {r.reason[:100]}{'...' if len(r.reason) > 100 else ''}"
+        for r in reporters[:MAX_LISTED]
+    ]
+    if len(reporters) > MAX_LISTED:
+        lines.append(f"...and {len(reporters) - MAX_LISTED} more")
+    when = reporters[0].at.strftime('%Y-%m-%d %H:%M:%S')
+    if len(reporters) > 1:
+        when += f" - {max(r.at for r in reporters).strftime('%H:%M:%S')}"
+    return (
+        f"{header}\n\n"
+        f"🎯 Reported User: {reported_user.full_name if reported_user else 'Unknown'} (@{reported_user.username if reported_user and reported_user.username else 'N/A'})\n"
+        f"📝 Reported Message: {case.reported_text[:100]}{'...' if len(case.reported_text) > 100 else ''}\n\n"
+        f"💬 Chat: {case.chat_title}\n"
+        f"📋 Reasons:\n" + '\n'.join(lines) + "\n"
+        f"🕒 Time: {when}"
+    )
+
+class ReportAggregator:
+    """Tell admins about reports of the same message with one DM each
+
+    Reports are keyed by (chat, reported message) and collected for the
+    chat's window before the admins are sent one DM listing every reporter
+    and reason. Reports of the same message arriving later edit those DMs
+    instead of sending new ones, for `lifetime` seconds.
+    """
+
+    def __init__(self, window: float = REPORT_WINDOW, lifetime: float = CASE_LIFETIME):
+        self.default_window = window
+        self.lifetime = lifetime
+        self.reports = 0
+        self.sent = 0
+        self.edits = 0
+        self._cases: dict[tuple[int, int], _ReportCase] = {}
+        self._windows: dict[int, float] = {}
+        self._bot: Bot | None = None
+
+    def window(self, chat_id: int) -> float:
+        """Return the seconds reports of a chat are collected before admins are told"""
+        return self._windows.get(chat_id, self.default_window)
+
+    def set_window(self, chat_id: int, seconds: float | None) -> None:
+        """Override the window of one chat; None goes back to the default"""
+        if seconds is None:
+            self._windows.pop(chat_id, None)
+        else:
+            self._windows[chat_id] = min(max(0.0, seconds), MAX_WINDOW)
+
+    def add(self, chat_id: int, chat_title: str, report: PendingReport, reporter: User, reason: str) -> None:
+        """Queue a submitted report for the next DM to the chat's admins"""
+        key = (chat_id, report.reported_message_id)
+        case = self._cases.get(key)
+        if case is None:
+            case = self._cases[key] = _ReportCase(chat_title, report.reported_user, report.reported_message_text)
+            report_cases.inc('new')
+        else:
+            report_cases.inc('merged')
+        self.reports += 1
+        # A second report by the same member replaces their reason
+        case.reporters[reporter.id] = _Reporter(reporter.id, reporter.full_name, reporter.username, reason, datetime.now())
+        case.updated = time.monotonic()
+        if case.task is None:
+            case.task = asyncio.create_task(self._flush_after(key, case, self.window(chat_id)))
+
+    async def start(self, bot: Bot) -> None:
+        self._bot = bot
+
+    async def stop(self) -> None:
+        """Send reports still being collected now instead of dropping them"""
+        waiting = [case.task for case in self._cases.values() if case.task]
+        for task in waiting:
+            task.cancel()
+        await asyncio.gather(*waiting, return_exceptions=True)
+        await asyncio.gather(*(
+            self._flush(key, case) for key, case in self._cases.items() if case.shown != len(case.reporters)
+        ), return_exceptions=True)
+        self._cases.clear()
+
+    async def _flush_after(self, key: tuple[int, int], case: _ReportCase, delay: float) -> None:
+        await asyncio.sleep(delay)
+        try:
+            sent = await self._flush(key, case)
+        finally:
+            case.task = None
+
+        if not sent and case.failures < FLUSH_ATTEMPTS and self._cases.get(key) is case:
+            # Keep the reports and try again later
+            delay = FLUSH_RETRY_DELAY * 2 ** (case.failures - 1)
+            case.task = asyncio.create_task(self._flush_after(key, case, delay))
+        elif sent and case.shown != len(case.reporters) and self._cases.get(key) is case:
+            # Reports submitted while the DMs were being sent, collected for another window
+            case.task = asyncio.create_task(self._flush_after(key, case, self.window(key[0])))
+        elif not case.admin_messages:
+            # No admin could be told; a later report starts over
+            if self._cases.get(key) is case:
+                del self._cases[key]
+        else:
+            asyncio.get_running_loop().call_later(self.lifetime, self._forget, key, case)
+
+    async def _flush(self, key: tuple[int, int], case: _ReportCase) -> bool:
+        """Send or edit the case's admin DMs; return False if that could not be tried"""
+        chat_id = key[0]
+        # Reports added while sending are not in this text
+        reporters = len(case.reporters)
+        text = report_text(case)
+        try:
+            chat_admins = (await admin_cache.get(self._bot, chat_id)).admins
+            # Skip bots and admins who reported the message themselves, unless they already have the DM
+            recipients = [
+                admin.user.id for admin in chat_admins
+                if not admin.user.is_bot and (admin.user.id in case.admin_messages or admin.user.id not in case.reporters)
+            ]
+            results = await fan_out(self._bot, recipients, text, message_ids=case.admin_messages)
+        except Exception as e:
+            case.failures += 1
+            logger.error(
+                "Error getting admins or sending reports (attempt %d): %s", case.failures, e, extra={'chat_id': chat_id}
+            )
+            return False
+        case.shown = reporters
+        case.failures = 0
+
+        admin_notified_count = 0
+        skipped = 0
+        for result in results:
+            if result.ok:
+                admin_notified_count += 1
+                if case.admin_messages.get(result.chat_id) == result.message_id:
+                    self.edits += 1
+                else:
+                    self.sent += 1
+                    case.admin_messages[result.chat_id] = result.message_id
+            elif result.attempts == 0:
+                # Known to have blocked the bot or never started it, listed by /unreachable
+                skipped += 1
+            else:
+                logger.warning("Failed to notify admin %s: %s", result.chat_id, result.error, extra={'chat_id': chat_id})
+        logger.info(
+            "Report of message %s (%d reporters): %d admins notified, %d unreachable skipped",
+            key[1], case.shown, admin_notified_count, skipped, extra={'chat_id': chat_id}
+        )
+        return True
+
+    def _forget(self, key: tuple[int, int], case: _ReportCase) -> None:
+        # Each report pushes the end of the case back, so only the last scheduled call removes it
+        if self._cases.get(key) is case and case.task is None and time.monotonic() - case.updated >= self.lifetime - 1:
+            del self._cases[key]
+
+    def snapshot(self) -> dict:
+        """Return the per-chat windows"""
+        return dict(self._windows)
+
+    def restore(self, state: dict | None) -> None:
+        """Load per-chat windows saved by `snapshot`"""
+        if state:
+            self._windows.update(state)
+
+    def stats(self) -> dict:
+        """Return report and DM counters"""
+        return {
+            'cases': len(self._cases),
+            'reports': self.reports,
+            'sent': self.sent,
+            'edits': self.edits,
+            'dms_per_report': (self.sent + self.edits) / self.reports if self.reports else 0.0
+        }
+
+# Shared aggregator used by the /report conversation
+report_digests = ReportAggregator()
@@ -0,0 +1,77 @@
+from collections import OrderedDict
+from typing import NamedTuple
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+from app.utils.metrics import registry, Counter
+
+callback_edits = registry.register(Counter('bot_callback_edits_total', 'Button presses by whether the message was edited', ('result',)))
+
+class Response(NamedTuple):
+    """A static reply: text, parse mode and keyboard, built once"""
+    text: str
+    parse_mode: str | None = None
+    reply_markup: InlineKeyboardMarkup | None = None
+
+def keyboard(*rows: tuple[tuple[str, str], ...]) -> InlineKeyboardMarkup:
+    """Build an inline keyboard from rows of (label, callback data)"""
+    return InlineKeyboardMarkup([[InlineKeyboardButton(label, callback_data=data) for label, data in row] for row in rows])
+
+class ResponseRegistry:
+    """Static responses by name, and which one each bot message shows
+
+    Button presses that would edit a message into the response it already
+    shows are answered without the edit, which Telegram would reject as
+    "message is not modified". At most `max_messages` messages are
+    remembered, oldest first out.
+    """
+
+    def __init__(self, max_messages: int = 10000):
+        self.max_messages = max_messages
+        self.edits = 0
+        self.edits_avoided = 0
+        self.not_modified = 0
+        self._responses: dict[str, Response] = {}
+        self._shown: OrderedDict[tuple[int, int], str] = OrderedDict()
+
+    def register(self, name: str, text: str, parse_mode: str | None = None, reply_markup: InlineKeyboardMarkup | None = None) -> Response:
+        response = self._responses[name] = Response(text, parse_mode, reply_markup)
+        return response
+
+    def __getitem__(self, name: str) -> Response:
+        return self._responses[name]
+
+    def shown(self, chat_id: int, message_id: int) -> str | None:
+        """Return the name of the response a message shows, if known"""
+        return self._shown.get((chat_id, message_id))
+
+    def remember(self, chat_id: int, message_id: int, name: str) -> None:
+        """Record that a message now shows a response"""
+        key = (chat_id, message_id)
+        self._shown[key] = name
+        self._shown.move_to_end(key)
+        while len(self._shown) > self.max_messages:
+            self._shown.popitem(last=False)
+
+    def forget(self, chat_id: int, message_id: int) -> None:
+        self._shown.pop((chat_id, message_id), None)
+
+    def count_edit(self, result: str) -> None:
+        """Count a button press as 'edited', 'avoided' or 'not_modified' (edited in vain)"""
+        if result == 'edited':
+            self.edits += 1
+        elif result == 'avoided':
+            self.edits_avoided += 1
+        else:
+            self.not_modified += 1
+        callback_edits.inc(result)
+
+    def stats(self) -> dict:
+        """Return the number of remembered messages and edit counters"""
+        return {
+            'messages': len(self._shown),
+            'edits': self.edits,
+            'edits_avoided': self.edits_avoided,
+            'not_modified': self.not_modified
+        }
+
+# Shared registry filled by the handlers at import time
+responses = ResponseRegistry()
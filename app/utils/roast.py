@@ -0,0 +1,131 @@
+import asyncio
+import logging
+import time
+from collections import deque
+import httpx
+from app.config import ROAST_API_URL, ROAST_BUFFER_SIZE, ROAST_REFILL_CONCURRENCY, ROAST_MAX_AGE, ROAST_TIMEOUT
+from app.utils.http import ssl_context
+
+logger = logging.getLogger(__name__)
+
+FALLBACK_ROAST = "Failed to fetch roast. here's the classic one: 'You're as useless as the 'ueue' in 'queue'."
+
+class RoastProvider:
+    """Serve roasts from a pre-fetched buffer kept full by a background task"""
+
+    def __init__(
+        self,
+        url: str = ROAST_API_URL,
+        buffer_size: int = ROAST_BUFFER_SIZE,
+        concurrency: int = ROAST_REFILL_CONCURRENCY,
+        max_age: float = ROAST_MAX_AGE,
+        timeout: float = ROAST_TIMEOUT
+    ):
+        self.url = url
+        self.buffer_size = buffer_size
+        self.concurrency = max(1, concurrency)
+        self.max_age = max_age
+        self.timeout = timeout
+        self.served_from_buffer = 0
+        self.served_from_network = 0
+        self.served_fallback = 0
+        self._buffer: deque[tuple[float, str]] = deque(maxlen=buffer_size)
+        self._client: httpx.AsyncClient | None = None
+        self._refill_needed = asyncio.Event()
+        self._refill_task: asyncio.Task | None = None
+
+    async def start(self) -> None:
+        """Open the shared HTTP client and start the refill task"""
+        self._client = httpx.AsyncClient(
+            timeout=self.timeout,
+            verify=ssl_context(),
+            limits=httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency)
+        )
+        if self.buffer_size > 0:
+            self._refill_task = asyncio.create_task(self._refill_loop())
+            self._refill_needed.set()
+
+    async def stop(self) -> None:
+        """Stop refilling and close the HTTP client"""
+        if self._refill_task:
+            self._refill_task.cancel()
+            try:
+                await self._refill_task
+            except asyncio.CancelledError:
+                pass
+            self._refill_task = None
+        if self._client:
+            await self._client.aclose()
+            self._client = None
+
+    async def get(self) -> str:
+        """Return a roast, preferring the buffer over the network"""
+        roast = self._pop_fresh()
+        self._refill_needed.set()
+        if roast is not None:
+            self.served_from_buffer += 1
+            return roast
+
+        roast = await self._fetch_one()
+        if roast is not None:
+            self.served_from_network += 1
+            return roast
+
+        self.served_fallback += 1
+        return FALLBACK_ROAST
+
+    def _pop_fresh(self) -> str | None:
+        # Oldest entries sit on the left, so stale ones are dropped first
+        now = time.monotonic()
+        while self._buffer:
+            fetched_at, roast = self._buffer.popleft()
+            if now - fetched_at <= self.max_age:
+                return roast
+        return None
+
+    async def _fetch_one(self) -> str | None:
+        if self._client is None:
+            return None
+        try:
+            response = await self._client.get(self.url)
+        except httpx.HTTPError:
+            return None
+        if response.status_code != 200 or not response.text:
+            return None
+        return response.text
+
+    async def _refill_loop(self) -> None:
+        failures = 0
+        while True:
+            await self._refill_needed.wait()
+            self._refill_needed.clear()
+
+            missing = self.buffer_size - len(self._buffer)
+            while missing > 0:
+                batch = min(missing, self.concurrency)
+                results = await asyncio.gather(*(self._fetch_one() for _ in range(batch)))
+                now = time.monotonic()
+                fetched = [roast for roast in results if roast is not None]
+                self._buffer.extend((now, roast) for roast in fetched)
+
+                if not fetched:
+                    # Back off while the roast API is unreachable
+                    failures += 1
+                    delay = min(60.0, 2.0 ** failures)
+                    logger.warning("Roast refill failed, retrying in %.0f seconds", delay)
+                    await asyncio.sleep(delay)
+                else:
+                    failures = 0
+                missing = self.buffer_size - len(self._buffer)
+
+    def stats(self) -> dict:
+        """Return buffer and serving counters"""
+        return {
+            'buffered': len(self._buffer),
+            'from_buffer': self.served_from_buffer,
+            'from_network': self.served_from_network,
+            'fallback': self.served_fallback
+        }
+
+# Shared instance used by /roast
+roast_provider = RoastProvider()
@@ -0,0 +1,42 @@
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+# In the order they happen on a cold start
+MILESTONES = ('imported', 'built', 'initialized', 'ready', 'first_poll', 'first_update', 'first_reply')
+
+def process_age() -> float:
+    """Return seconds since the process started (Linux), 0 where that is unknown"""
+    try:
+        with open('/proc/self/stat') as f:
+            # Fields after the command name, which may contain spaces; starttime is field 22
+            fields = f.read().rsplit(')', 1)[1].split()
+        with open('/proc/uptime') as f:
+            uptime = float(f.read().split()[0])
+        return max(0.0, uptime - int(fields[19]) / os.sysconf('SC_CLK_TCK'))
+    except (OSError, ValueError, IndexError):
+        return 0.0
+
+class StartupTimeline:
+    """Seconds from process start to each startup milestone, logged once the first reply is sent"""
+
+    def __init__(self):
+        # Includes interpreter startup where the OS tells us when the process began
+        self.origin = time.perf_counter() - process_age()
+        self.marks: dict[str, float] = {}
+
+    def mark(self, milestone: str) -> None:
+        """Record the first time a milestone is reached"""
+        if milestone in self.marks:
+            return
+        self.marks[milestone] = time.perf_counter() - self.origin
+        if milestone == 'first_reply':
+            logger.info("Startup timeline: %s", self.summary())
+
+    def summary(self) -> str:
+        return ', '.join(f"{name} {self.marks[name]:.3f}s" for name in MILESTONES if name in self.marks)
+
+# Shared timeline marked from main, the poller, the update processor and the rate limiter
+startup = StartupTimeline()
@@ -0,0 +1,147 @@
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import NamedTuple
+from app.config import LOOP_LAG_INTERVAL, LOOP_STALL_THRESHOLD, LOOP_STRICT_MS
+from app.utils.metrics import registry, Histogram
+
+logger = logging.getLogger(__name__)
+
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+LAG_QUANTILES = (0.5, 0.9, 0.99)
+
+loop_lag = registry.register(Histogram('bot_event_loop_lag_seconds', 'Event-loop scheduling lag', buckets=LAG_BUCKETS))
+
+class Stall(NamedTuple):
+    """A period during which the event loop could not run other tasks"""
+    duration: float
+    task: str | None
+    stack: str | None
+
+class LoopBlockedError(RuntimeError):
+    """Raised in strict mode when the event loop was blocked too long"""
+
+class LoopWatchdog:
+    """Measure event-loop scheduling lag and capture what blocks the loop
+
+    A task sleeps `interval` seconds in a loop and records how late it
+    wakes up. A helper thread watches that heartbeat; when it stops for
+    more than `threshold` seconds, the thread grabs the loop thread's
+    stack, i.e. the code that is blocking it. With `strict_ms` set, every
+    stall longer than that is kept and `stop()` raises LoopBlockedError.
+    """
+
+    def __init__(
+        self,
+        interval: float = LOOP_LAG_INTERVAL,
+        threshold: float = LOOP_STALL_THRESHOLD,
+        strict_ms: float = LOOP_STRICT_MS,
+        samples: int = 1024
+    ):
+        self.interval = interval
+        self.strict = strict_ms / 1000
+        # Strict mode needs stacks for shorter stalls too
+        self.threshold = min(threshold, self.strict) if self.strict else threshold
+        self.stalls = 0
+        self.violations: list[Stall] = []
+        self._lag = loop_lag.labels()
+        self._recent: deque[float] = deque(maxlen=samples)
+        self._heartbeat = 0.0
+        self._captured: tuple[float, str | None, str] | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._loop_thread = 0
+        self._task: asyncio.Task | None = None
+        self._thread: threading.Thread | None = None
+        self._stopping = threading.Event()
+
+    async def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stopping.clear()
+        self._task = asyncio.create_task(self._tick())
+        self._thread = threading.Thread(target=self._monitor, name='loop-watchdog', daemon=True)
+        self._thread.start()
+
+    async def stop(self) -> None:
+        """Stop watching; in strict mode raise if the loop was blocked too long"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._thread:
+            self._stopping.set()
+            self._thread.join()
+            self._thread = None
+
+        if self.violations:
+            worst = max(self.violations, key=lambda stall: stall.duration)
+            violations, self.violations = self.violations, []
+            raise LoopBlockedError(
+                f"Event loop was blocked for more than {self.strict * 1000:.0f} ms {len(violations)} time(s), "
+                f"worst {worst.duration * 1000:.0f} ms in {worst.task}:\n{worst.stack or '(stack not captured)'}"
+            )
+
+    async def _tick(self) -> None:
+        while True:
+            beat = self._heartbeat
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(0.0, now - expected)
+            self._heartbeat = now
+            self._lag.observe(lag)
+            self._recent.append(lag)
+            if lag > self.threshold:
+                self._record_stall(lag, beat)
+
+    def _record_stall(self, lag: float, beat: float) -> None:
+        task = stack = None
+        captured, self._captured = self._captured, None
+        # Only use a stack grabbed during this stall, not an earlier one
+        if captured is not None and captured[0] == beat:
+            _, task, stack = captured
+        self.stalls += 1
+        logger.warning("Event loop blocked for %.0f ms in %s\n%s", lag * 1000, task, stack or '(stack not captured)')
+        if self.strict and lag > self.strict:
+            self.violations.append(Stall(lag, task, stack))
+
+    def _monitor(self) -> None:
+        # Sample often enough to catch the loop while it is still blocked
+        poll = self.threshold / 2
+        captured_beat = None
+        while not self._stopping.wait(poll):
+            beat = self._heartbeat
+            if beat == captured_beat or time.monotonic() - beat - self.interval < self.threshold:
+                continue
+            frame = sys._current_frames().get(self._loop_thread)
+            if frame is None:
+                continue
+            task = asyncio.current_task(self._loop)
+            self._captured = (beat, task.get_name() if task else None, ''.join(traceback.format_stack(frame)))
+            captured_beat = beat
+
+    def quantiles(self) -> list[tuple[tuple, float]]:
+        """Return recent lag quantiles as metric samples"""
+        recent = sorted(self._recent)
+        if not recent:
+            return []
+        return [((q,), recent[min(len(recent) - 1, int(q * len(recent)))]) for q in LAG_QUANTILES]
+
+    def stats(self) -> dict:
+        """Return stall counters and recent lag quantiles"""
+        return {
+            'stalls': self.stalls,
+            'violations': len(self.violations),
+            **{f'p{int(q * 100)}': value for (q,), value in self.quantiles()}
+        }
+
+# Shared watchdog started with the application
+watchdog = LoopWatchdog()
@@ -0,0 +1,145 @@
+import asyncio
+import logging
+import time
+from telegram import Bot
+from telegram.error import BadRequest
+from app.config import WELCOME_WINDOW, WELCOME_MAX_MENTIONS, WELCOME_SUMMARY_THRESHOLD
+from app.utils.deleter import deleter
+
+logger = logging.getLogger(__name__)
+
+# Welcome messages are deleted after this many seconds
+WELCOME_LIFETIME = 60.0
+
+WELCOME_FOOTER = "We're glad to have you here. Use ```/help``` to see available commands."
+
+def welcome_text(names: list[str], total: int, summary_threshold: int = WELCOME_SUMMARY_THRESHOLD) -> str:
+    """Greet the named members, mentioning the rest by count"""
+    if total > summary_threshold:
+        greeting = f"👋 Welcome to our {total} new members!"
+    elif total > len(names):
+        greeting = f"👋 Welcome {', '.join(names)} and {total - len(names)} more!"
+    else:
+        greeting = f"👋 Welcome {', '.join(names)}!"
+    return f"{greeting}\n\n{WELCOME_FOOTER}"
+
+class _ChatWelcome:
+    __slots__ = ('names', 'total', 'message_id', 'visible_until', 'shown_total', 'task')
+
+    def __init__(self):
+        self.names: list[str] = []
+        self.total = 0
+        self.message_id: int | None = None
+        self.visible_until = 0.0
+        self.shown_total = 0
+        self.task: asyncio.Task | None = None
+
+class WelcomeAggregator:
+    """Greet members who join a chat within `window` seconds with one message
+
+    While a welcome is still visible, later joins are added to it by
+    editing the message instead of sending another one. At most
+    `max_mentions` names are listed; past `summary_threshold` members the
+    welcome only gives the count.
+    """
+
+    def __init__(
+        self,
+        window: float = WELCOME_WINDOW,
+        max_mentions: int = WELCOME_MAX_MENTIONS,
+        summary_threshold: int = WELCOME_SUMMARY_THRESHOLD,
+        lifetime: float = WELCOME_LIFETIME
+    ):
+        self.window = window
+        self.max_mentions = max_mentions
+        self.summary_threshold = summary_threshold
+        self.lifetime = lifetime
+        self.members = 0
+        self.sent = 0
+        self.edits = 0
+        self._chats: dict[int, _ChatWelcome] = {}
+        self._bot: Bot | None = None
+
+    def add(self, chat_id: int, names: list[str]) -> None:
+        """Queue members who just joined a chat for the next welcome"""
+        if not names:
+            return
+        welcome = self._chats.get(chat_id)
+        if welcome is None:
+            welcome = self._chats[chat_id] = _ChatWelcome()
+        elif welcome.message_id is not None and time.monotonic() >= welcome.visible_until and welcome.task is None:
+            # The last welcome is gone, start a new one
+            self._chats[chat_id] = welcome = _ChatWelcome()
+
+        room = self.max_mentions - len(welcome.names)
+        welcome.names.extend(names[:max(0, room)])
+        welcome.total += len(names)
+        self.members += len(names)
+        if welcome.task is None:
+            welcome.task = asyncio.create_task(self._flush_after(chat_id, welcome, self.window))
+
+    async def start(self, bot: Bot) -> None:
+        self._bot = bot
+
+    async def stop(self) -> None:
+        """Drop welcomes not sent yet; they would be deleted right away on shutdown anyway"""
+        for welcome in self._chats.values():
+            if welcome.task:
+                welcome.task.cancel()
+        await asyncio.gather(*(w.task for w in self._chats.values() if w.task), return_exceptions=True)
+        self._chats.clear()
+
+    async def _flush_after(self, chat_id: int, welcome: _ChatWelcome, delay: float) -> None:
+        await asyncio.sleep(delay)
+        total = welcome.total
+        text = welcome_text(welcome.names, total, self.summary_threshold)
+        try:
+            if welcome.message_id is not None and time.monotonic() < welcome.visible_until:
+                await self._edit(chat_id, welcome, text)
+            else:
+                await self._send(chat_id, welcome, text)
+            welcome.shown_total = total
+        except Exception as e:
+            logger.error("Failed to welcome %d members in chat %s: %s", total, chat_id, e, extra={'chat_id': chat_id})
+        finally:
+            welcome.task = None
+
+        # Members who joined while the message was being sent
+        if welcome.total != welcome.shown_total and self._chats.get(chat_id) is welcome:
+            welcome.task = asyncio.create_task(self._flush_after(chat_id, welcome, 0))
+
+    async def _send(self, chat_id: int, welcome: _ChatWelcome, text: str) -> None:
+        msg = await self._bot.send_message(chat_id=chat_id, text=text)
+        self.sent += 1
+        welcome.message_id = msg.message_id
+        # Stop editing a little before the deleter removes it
+        welcome.visible_until = time.monotonic() + self.lifetime - 1
+        deleter.schedule(chat_id, msg.message_id, delay=self.lifetime)
+        asyncio.get_running_loop().call_later(self.lifetime, self._forget, chat_id, welcome)
+
+    async def _edit(self, chat_id: int, welcome: _ChatWelcome, text: str) -> None:
+        try:
+            await self._bot.edit_message_text(chat_id=chat_id, message_id=welcome.message_id, text=text)
+            self.edits += 1
+        except BadRequest as e:
+            if 'not modified' in str(e).lower():
+                return
+            # The welcome was deleted early (e.g. by an admin), send a fresh one
+            await self._send(chat_id, welcome, text)
+
+    def _forget(self, chat_id: int, welcome: _ChatWelcome) -> None:
+        if self._chats.get(chat_id) is welcome and welcome.task is None and time.monotonic() >= welcome.visible_until:
+            del self._chats[chat_id]
+
+    def stats(self) -> dict:
+        """Return member and message counters"""
+        return {
+            'chats': len(self._chats),
+            'members': self.members,
+            'sent': self.sent,
+            'edits': self.edits,
+            'members_per_message': self.members / (self.sent + self.edits) if self.sent + self.edits else 0.0
+        }
+
+# Shared aggregator used by the new-member handler
+welcomes = WelcomeAggregator()
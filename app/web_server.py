@@ -1,25 +1,148 @@
+import asyncio
+import logging
 import os
-import threading
-from http.server import HTTPServer, BaseHTTPRequestHandler
-
-class SimpleHTTPRequestHandler(BaseHTTPRequestHandler):
-    def do_GET(self):
-        self.send_response(200)
-        self.end_headers()
-        self.wfile.write(b'I am alive')
-
-    def log_message(self, format, *args):
-        # Silence server logs
-        return
-
-def run_server():
-    port = int(os.environ.get("PORT", 8080))
-    server_address = ('0.0.0.0', port)
-    httpd = HTTPServer(server_address, SimpleHTTPRequestHandler)
-    print(f"Starting heartbeat server on port {port}")
-    httpd.serve_forever()
-
-def start_server_thread():
-    t = threading.Thread(target=run_server)
-    t.daemon = True
-    t.start()
+from typing import Awaitable, Callable, NamedTuple
+
+logger = logging.getLogger(__name__)
+
+MAX_BODY_SIZE = 1024 * 1024
+MAX_HEADERS = 100
+# Seconds a client has to send a whole request, also how long a kept-alive connection may sit idle
+REQUEST_TIMEOUT = 30.0
+
+REASONS = {200: 'OK', 400: 'Bad Request', 403: 'Forbidden', 404: 'Not Found', 405: 'Method Not Allowed', 413: 'Payload Too Large', 431: 'Request Header Fields Too Large', 500: 'Internal Server Error'}
+
+class Request(NamedTuple):
+    method: str
+    path: str
+    headers: dict
+    body: bytes
+
+class Response(NamedTuple):
+    status: int = 200
+    body: bytes = b''
+    content_type: str = 'text/plain; charset=utf-8'
+
+Route = Callable[[Request], Awaitable[Response]]
+
+async def health(request: Request) -> Response:
+    """Answer Render's health checks"""
+    return Response(body=b'I am alive')
+
+class WebServer:
+    """Minimal asyncio HTTP/1.1 server running on the bot's event loop"""
+
+    def __init__(self, host: str = '0.0.0.0', port: int | None = None):
+        self.host = host
+        self.port = port if port is not None else int(os.environ.get("PORT", 8080))
+        self._routes: dict[tuple[str, str], Route] = {}
+        self._server: asyncio.AbstractServer | None = None
+        self.route('GET', '/', health)
+
+    def route(self, method: str, path: str, handler: Route) -> None:
+        """Register an async handler for a method and exact path"""
+        self._routes[(method, path)] = handler
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        if self.port == 0:
+            self.port = self._server.sockets[0].getsockname()[1]
+        logger.info("Web server listening on port %d", self.port)
+
+    async def stop(self) -> None:
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            # Keep the connection open between requests, Telegram reuses it
+            while True:
+                request = await self._read_request(reader)
+                if request is None:
+                    break
+                if isinstance(request, Response):
+                    await self._write_response(writer, request, keep_alive=False)
+                    break
+
+                handler = self._routes.get((request.method, request.path))
+                if handler is None:
+                    known_path = any(path == request.path for _, path in self._routes)
+                    response = Response(405 if known_path else 404)
+                else:
+                    try:
+                        response = await handler(request)
+                    except Exception:
+                        logger.exception("Web handler for %s %s failed", request.method, request.path)
+                        response = Response(500)
+
+                keep_alive = request.headers.get('connection', '').lower() != 'close'
+                await self._write_response(writer, response, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, asyncio.CancelledError):
+            # Client went away or the server is shutting down
+            pass
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Request | Response | None:
+        try:
+            return await asyncio.wait_for(self._read(reader), REQUEST_TIMEOUT)
+        except asyncio.TimeoutError:
+            # Idle or too slow, drop the connection
+            return None
+
+    async def _read(self, reader: asyncio.StreamReader) -> Request | Response | None:
+        head = await self._read_head(reader)
+        if head is None or isinstance(head, Response):
+            return head
+        method, target, headers = head
+
+        try:
+            length = int(headers.get('content-length') or 0)
+        except ValueError:
+            return Response(400)
+        if length > MAX_BODY_SIZE:
+            return Response(413)
+        body = await reader.readexactly(length) if length else b''
+        return Request(method, target.split('?', 1)[0], headers, body)
+
+    async def _read_head(self, reader: asyncio.StreamReader) -> tuple[str, str, dict] | Response | None:
+        # readline raises ValueError once a line is longer than the reader's limit (64 KiB)
+        try:
+            request_line = await reader.readline()
+        except ValueError:
+            return Response(400)
+        if not request_line:
+            return None
+        try:
+            method, target, _ = request_line.decode('latin-1').split(' ', 2)
+        except ValueError:
+            return Response(400)
+
+        headers = {}
+        for _ in range(MAX_HEADERS + 1):
+            try:
+                line = await reader.readline()
+            except ValueError:
+                return Response(431)
+            if line in (b'\r\n', b'\n', b''):
+                return method, target, headers
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        return Response(431)
+
+    async def _write_response(self, writer: asyncio.StreamWriter, response: Response, keep_alive: bool) -> None:
+        head = (
+            f"HTTP/1.1 {response.status} {REASONS.get(response.status, 'Error')}\r\n"
+            f"Content-Type: {response.content_type}\r\n"
+            f"Content-Length: {len(response.body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        )
+        writer.write(head.encode('latin-1') + response.body)
+        await writer.drain()
+
+# Shared server on $PORT for health checks and the webhook
+web_server = WebServer()
@@ -0,0 +1,77 @@
+import asyncio
+import hashlib
+import hmac
+import json
+import logging
+import signal
+from telegram import Update
+from telegram.ext import Application
+from app.config import TOKEN, WEBHOOK_URL, WEBHOOK_PATH, WEBHOOK_SECRET
+from app.web_server import web_server, Request, Response
+from app.utils.metrics import mark_polled
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = 'x-telegram-bot-api-secret-token'
+
+def default_secret(token: str = TOKEN) -> str:
+    """Derive a webhook secret from the bot token, the same on every start"""
+    return hmac.new(token.encode(), b'webhook-secret', hashlib.sha256).hexdigest()
+
+def webhook_route(app: Application, secret: str):
+    """Build the web server route that feeds webhook updates into the application"""
+    expected = secret.encode()
+
+    async def receive_update(request: Request) -> Response:
+        received = request.headers.get(SECRET_HEADER, '').encode()
+        if not hmac.compare_digest(received, expected):
+            return Response(403)
+        try:
+            data = json.loads(request.body)
+            if not isinstance(data, dict):
+                return Response(400)
+            update = Update.de_json(data, app.bot)
+        except (ValueError, TypeError, KeyError, AttributeError):
+            return Response(400)
+        await app.update_queue.put(update)
+        # A webhook delivery stands in for a successful getUpdates
+        mark_polled()
+        return Response()
+
+    return receive_update
+
+async def run_webhook(app: Application) -> None:
+    """Run the application with Telegram pushing updates to our web server"""
+    if not WEBHOOK_URL:
+        raise ValueError("WEBHOOK_MODE needs WEBHOOK_URL (or RENDER_EXTERNAL_URL) to be set.")
+    # Stable across restarts, so updates Telegram sends before set_webhook runs are accepted
+    secret = WEBHOOK_SECRET or default_secret()
+    web_server.route('POST', WEBHOOK_PATH, webhook_route(app, secret))
+
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop_event.set)
+
+    await app.initialize()
+    if app.post_init:
+        await app.post_init(app)
+    try:
+        # Start processing first: after a cold start the update that woke us is already queued.
+        # It was sent with the secret of the previous run, so this only helps while the secret stays the same
+        await app.start()
+        await app.bot.set_webhook(
+            url=WEBHOOK_URL.rstrip('/') + WEBHOOK_PATH,
+            secret_token=secret,
+            allowed_updates=Update.ALL_TYPES
+        )
+        logger.info("Receiving updates via webhook at %s", WEBHOOK_PATH)
+        await stop_event.wait()
+    finally:
+        if app.running:
+            await app.stop()
+            if app.post_stop:
+                await app.post_stop(app)
+        await app.shutdown()
+        if app.post_shutdown:
+            await app.post_shutdown(app)
@@ -0,0 +1,125 @@
+"""Measure time to first reply of a freshly started bot process with a backlog of updates.
+
+    python -m bench.cold_start_bench --runs 5 --backlog 50 --output cold.json
+    python -m bench.cold_start_bench --baseline cold.json --tolerance 0.25
+
+Each run starts `python -m app.main` against a local fake Bot API that
+already holds `backlog` pending /alive commands, as after a scale-to-zero
+spin-up, and times from process start to the first reply and to the last
+one. Prints one JSON document; with --baseline it exits with status 1 when
+the median time to first reply grew by more than --tolerance.
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import signal
+import statistics
+import sys
+import time
+
+from bench.harness import BENCH_ENV
+from bench.fake_bot_api import FakeBotAPI, FAKE_TOKEN
+from bench.fake_telegram import command_update
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+async def read_timeline(stream: asyncio.StreamReader, found: dict) -> None:
+    """Drain the bot's log output, keeping its startup timeline line"""
+    while line := await stream.readline():
+        text = line.decode(errors='replace')
+        if 'Startup timeline:' in text:
+            if text.startswith('{'):
+                # LOG_FORMAT=json
+                text = json.loads(text)['message']
+            found['timeline'] = text.split('Startup timeline:', 1)[1].strip()
+
+async def cold_start(api: FakeBotAPI, backlog: int, chats: int, timeout: float) -> dict:
+    """Start one bot process and time its replies to the pending backlog"""
+    api.feed([command_update('/alive', chat_id=-1000 - i % chats, user_id=100 + i) for i in range(backlog)])
+    replies: list[float] = []
+    all_replied = asyncio.Event()
+
+    def on_call(method: str, params: dict, result) -> None:
+        if method == 'sendMessage':
+            replies.append(time.perf_counter())
+            if len(replies) >= backlog:
+                all_replied.set()
+
+    api.listeners.append(on_call)
+    env = {**os.environ, **BENCH_ENV, 'BOT_TOKEN': FAKE_TOKEN, 'BOT_API_URL': api.base_url}
+    env.pop('RENDER_EXTERNAL_URL', None)
+    env.pop('PERSISTENCE_DB', None)
+
+    started = time.perf_counter()
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, '-m', 'app.main', cwd=ROOT, env=env,
+        stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.PIPE
+    )
+    found = {}
+    reader = asyncio.create_task(read_timeline(process.stderr, found))
+    try:
+        await asyncio.wait_for(all_replied.wait(), timeout)
+    finally:
+        api.listeners.remove(on_call)
+        process.send_signal(signal.SIGTERM)
+        await process.wait()
+        await reader
+
+    return {
+        'first_reply_ms': (replies[0] - started) * 1000,
+        'all_replied_ms': (replies[-1] - started) * 1000,
+        'timeline': found.get('timeline')
+    }
+
+async def run(args) -> dict:
+    api = FakeBotAPI(latency=args.latency)
+    await api.start()
+    try:
+        runs = [await cold_start(api, args.backlog, args.chats, args.timeout) for _ in range(args.runs)]
+    finally:
+        await api.stop()
+    return {
+        'settings': {'runs': args.runs, 'backlog': args.backlog, 'chats': args.chats, 'latency': args.latency},
+        'results': {
+            'first_reply_ms': statistics.median(run['first_reply_ms'] for run in runs),
+            'all_replied_ms': statistics.median(run['all_replied_ms'] for run in runs)
+        },
+        'runs': runs
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--backlog', type=int, default=50, help='updates pending when the bot starts')
+    parser.add_argument('--chats', type=int, default=10)
+    parser.add_argument('--latency', type=float, default=0.02, help='fake API latency in seconds')
+    parser.add_argument('--timeout', type=float, default=60)
+    parser.add_argument('--output', help='also write the JSON result to this file')
+    parser.add_argument('--baseline', help='JSON result of an earlier run to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed relative growth of the time to first reply')
+    args = parser.parse_args()
+
+    with contextlib.redirect_stdout(sys.stderr):
+        report = asyncio.run(run(args))
+
+    regressed = False
+    if args.baseline:
+        with open(args.baseline) as f:
+            before = json.load(f)['results']['first_reply_ms']
+        after = report['results']['first_reply_ms']
+        report['change_vs_baseline'] = round((after - before) / before, 4)
+        regressed = after > before * (1 + args.tolerance)
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    if regressed:
+        print(f"Time to first reply grew by more than {args.tolerance:.0%}", file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
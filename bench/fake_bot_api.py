@@ -0,0 +1,167 @@
+"""Local stand-in for the Telegram Bot API used by the benchmarks.
+
+Bots talk to it by pointing their base URL at `FakeBotAPI.base_url`. Every
+method answers after a configurable latency (plus random jitter), and a
+fraction of calls, optionally limited to some methods, can be answered with
+429 flood-control errors. Listeners see every successful call, so simulated
+users can react to what the bot sent.
+"""
+import asyncio
+import itertools
+import json
+import random
+import time
+from collections import Counter
+from typing import Callable
+from urllib.parse import parse_qsl
+from telegram import ChatMemberAdministrator, ChatMemberOwner, User
+from app.web_server import WebServer, Request, Response
+
+FAKE_TOKEN = '123456:FAKE-TOKEN'
+BOT_USER = {'id': 123456, 'is_bot': True, 'first_name': 'Fake Bot', 'username': 'fake_bot',
+            'can_join_groups': True, 'can_read_all_group_messages': False, 'supports_inline_queries': False}
+# Calls made by polling and startup rather than by handling updates
+POLLING_METHODS = ('getUpdates', 'getMe', 'deleteWebhook')
+
+def _admin(user_id: int, owner: bool = False) -> dict:
+    user = User(id=user_id, first_name=f'Admin {user_id}', is_bot=False, username=f'admin{user_id}')
+    if owner:
+        return ChatMemberOwner(user=user, is_anonymous=False).to_dict()
+    flags = dict.fromkeys((
+        'can_be_edited', 'is_anonymous', 'can_manage_chat', 'can_delete_messages', 'can_manage_video_chats',
+        'can_restrict_members', 'can_promote_members', 'can_change_info', 'can_invite_users',
+        'can_post_stories', 'can_edit_stories', 'can_delete_stories'
+    ), False)
+    return ChatMemberAdministrator(user=user, **flags).to_dict()
+
+class FakeBotAPI:
+    """In-process fake of the Bot API endpoints this bot uses"""
+
+    METHODS = (
+        'getMe', 'getUpdates', 'deleteWebhook', 'setWebhook', 'sendMessage', 'editMessageText',
+        'deleteMessage', 'deleteMessages', 'getChatAdministrators', 'restrictChatMember',
+        'approveChatJoinRequest', 'setMessageReaction', 'answerCallbackQuery', 'close', 'logOut'
+    )
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        flood_rate: float = 0.0,
+        retry_after: int = 1,
+        admins: int = 5,
+        port: int = 0,
+        jitter: float = 0.0,
+        flood_methods: tuple = (),
+        blocked: set[int] | None = None
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.flood_rate = flood_rate
+        self.flood_methods = flood_methods
+        self.retry_after = retry_after
+        self.admins = admins
+        # Users who blocked the bot; messages to them fail with 403
+        self.blocked = blocked or set()
+        self.calls: Counter = Counter()
+        self.floods: Counter = Counter()
+        # Called with (method, params, result) after every successful call
+        self.listeners: list[Callable[[str, dict, object], None]] = []
+        # When getUpdates first handed out each update, by update_id
+        self.delivered_at: dict[int, float] = {}
+        self._message_ids = itertools.count(1000)
+        self._updates: list[dict] = []
+        self._new_updates = asyncio.Event()
+        self._server = WebServer(host='127.0.0.1', port=port)
+        for method in self.METHODS:
+            self._server.route('POST', f'/bot{FAKE_TOKEN}/{method}', self._endpoint(method))
+
+    @property
+    def base_url(self) -> str:
+        return f'http://127.0.0.1:{self._server.port}/bot'
+
+    async def start(self) -> None:
+        await self._server.start()
+
+    async def stop(self) -> None:
+        await self._server.stop()
+
+    def feed(self, updates: list[dict]) -> None:
+        """Queue raw updates to be returned by getUpdates"""
+        self._updates.extend(updates)
+        self._new_updates.set()
+
+    def total_calls(self, exclude: tuple = POLLING_METHODS) -> int:
+        return sum(count for method, count in self.calls.items() if method not in exclude)
+
+    def _endpoint(self, method: str):
+        async def handle(request: Request) -> Response:
+            params = {}
+            for key, value in parse_qsl(request.body.decode()):
+                try:
+                    params[key] = json.loads(value)
+                except ValueError:
+                    params[key] = value
+
+            self.calls[method] += 1
+            if method != 'getUpdates':
+                if self.latency or self.jitter:
+                    await asyncio.sleep(self.latency + random.random() * self.jitter)
+                floodable = not self.flood_methods or method in self.flood_methods
+                if self.flood_rate and floodable and random.random() < self.flood_rate:
+                    self.floods[method] += 1
+                    return self._reply({
+                        'ok': False, 'error_code': 429,
+                        'description': f'Too Many Requests: retry after {self.retry_after}',
+                        'parameters': {'retry_after': self.retry_after}
+                    }, status=429)
+                if method in ('sendMessage', 'editMessageText') and params.get('chat_id') in self.blocked:
+                    return self._reply({'ok': False, 'error_code': 403, 'description': 'Forbidden: bot was blocked by the user'}, status=403)
+
+            result = await getattr(self, f'_{method}', self._true)(params)
+            for listener in self.listeners:
+                listener(method, params, result)
+            return self._reply({'ok': True, 'result': result})
+        return handle
+
+    @staticmethod
+    def _reply(payload: dict, status: int = 200) -> Response:
+        return Response(status, json.dumps(payload).encode(), 'application/json')
+
+    async def _true(self, params: dict) -> bool:
+        return True
+
+    async def _getMe(self, params: dict) -> dict:
+        return BOT_USER
+
+    async def _getUpdates(self, params: dict) -> list:
+        offset = params.get('offset') or 0
+        self._updates = [update for update in self._updates if update['update_id'] >= offset]
+        if not self._updates:
+            self._new_updates.clear()
+            try:
+                await asyncio.wait_for(self._new_updates.wait(), timeout=params.get('timeout') or 0)
+            except asyncio.TimeoutError:
+                return []
+        batch = self._updates[:params.get('limit') or 100]
+        now = time.perf_counter()
+        for update in batch:
+            self.delivered_at.setdefault(update['update_id'], now)
+        return batch
+
+    async def _sendMessage(self, params: dict) -> dict:
+        chat_id = params['chat_id']
+        return {
+            'message_id': next(self._message_ids),
+            'date': int(time.time()),
+            'chat': {'id': chat_id, 'type': 'private' if chat_id > 0 else 'supergroup'},
+            'from': BOT_USER,
+            'text': params.get('text', '')
+        }
+
+    async def _editMessageText(self, params: dict) -> dict:
+        message = await self._sendMessage(params)
+        message['message_id'] = params.get('message_id')
+        return message
+
+    async def _getChatAdministrators(self, params: dict) -> list:
+        return [_admin(1000 + i, owner=(i == 0)) for i in range(self.admins)]
@@ -0,0 +1,139 @@
+"""Post fake Telegram updates to a locally running webhook.
+
+Start the bot in webhook mode with a known secret, then fire updates at it:
+
+    WEBHOOK_MODE=1 WEBHOOK_URL=http://127.0.0.1:8080 WEBHOOK_SECRET=dev python -m app.main
+    python -m bench.fake_telegram --url http://127.0.0.1:8080/webhook --secret dev --count 200
+"""
+import argparse
+import asyncio
+import itertools
+import statistics
+import time
+import httpx
+
+_update_ids = itertools.count(1)
+_message_ids = itertools.count(1)
+
+def _user(user_id: int) -> dict:
+    return {'id': user_id, 'is_bot': False, 'first_name': 'Tester', 'username': f'tester{user_id}'}
+
+def _chat(chat_id: int) -> dict:
+    return {'id': chat_id, 'type': 'supergroup', 'title': 'Fake Group'}
+
+def message(text: str, chat_id: int, user_id: int, reply_to: dict | None = None, sender: dict | None = None) -> dict:
+    """Build a raw group message"""
+    raw = {
+        'message_id': next(_message_ids),
+        'date': int(time.time()),
+        'chat': _chat(chat_id),
+        'from': sender or _user(user_id),
+        'text': text
+    }
+    if reply_to is not None:
+        raw['reply_to_message'] = reply_to
+    return raw
+
+def message_update(text: str, chat_id: int = -1001, user_id: int = 42, reply_to: dict | None = None) -> dict:
+    """Build a raw update carrying a plain text message"""
+    return {'update_id': next(_update_ids), 'message': message(text, chat_id, user_id, reply_to)}
+
+def command_update(text: str = '/alive', chat_id: int = -1001, user_id: int = 42, reply_to: dict | None = None) -> dict:
+    """Build a raw group message update carrying a command"""
+    update = message_update(text, chat_id, user_id, reply_to)
+    update['message']['entities'] = [{'type': 'bot_command', 'offset': 0, 'length': len(text.split()[0])}]
+    return update
+
+def callback_update(data: str, chat_id: int = -1001, user_id: int = 42, sender: dict | None = None) -> dict:
+    """Build a button press on a message previously sent by `sender` (the bot)"""
+    return {
+        'update_id': next(_update_ids),
+        'callback_query': {
+            'id': str(next(_message_ids)),
+            'from': _user(user_id),
+            'chat_instance': str(chat_id),
+            'data': data,
+            'message': message('Menu', chat_id, user_id, sender=sender)
+        }
+    }
+
+def join_request_update(chat_id: int = -1001, user_id: int = 42) -> dict:
+    """Build a request to join a group"""
+    return {
+        'update_id': next(_update_ids),
+        'chat_join_request': {
+            'chat': _chat(chat_id),
+            'from': _user(user_id),
+            'user_chat_id': user_id,
+            'date': int(time.time())
+        }
+    }
+
+def new_members_update(chat_id: int = -1001, user_ids: tuple = (42,)) -> dict:
+    """Build the service message announcing new members"""
+    update = message_update('', chat_id, user_ids[0])
+    del update['message']['text']
+    update['message']['new_chat_members'] = [_user(user_id) for user_id in user_ids]
+    return update
+
+def chat_member_update(chat_id: int = -1001, user_id: int = 42, old_status: str = 'left', new_status: str = 'member') -> dict:
+    """Build a change of a member's status, as sent to bots that are admins"""
+    def member(status: str) -> dict:
+        raw = {'status': status, 'user': _user(user_id)}
+        if status == 'administrator':
+            raw.update({
+                'can_be_edited': False, 'is_anonymous': False, 'can_manage_chat': True, 'can_delete_messages': True,
+                'can_manage_video_chats': True, 'can_restrict_members': True, 'can_promote_members': False,
+                'can_change_info': True, 'can_invite_users': True, 'can_post_stories': False,
+                'can_edit_stories': False, 'can_delete_stories': False
+            })
+        elif status == 'kicked':
+            raw['until_date'] = 0
+        return raw
+
+    return {
+        'update_id': next(_update_ids),
+        'chat_member': {
+            'chat': _chat(chat_id),
+            'from': _user(user_id),
+            'date': int(time.time()),
+            'old_chat_member': member(old_status),
+            'new_chat_member': member(new_status)
+        }
+    }
+
+async def post_updates(url: str, secret: str, updates: list[dict], concurrency: int = 10) -> list[float]:
+    """Post updates concurrently and return the acknowledgement latency of each"""
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+    headers = {'X-Telegram-Bot-Api-Secret-Token': secret}
+
+    async with httpx.AsyncClient(headers=headers) as client:
+        async def post(update: dict) -> None:
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.post(url, json=update)
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - started)
+
+        await asyncio.gather(*(post(update) for update in updates))
+    return latencies
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', default='http://127.0.0.1:8080/webhook')
+    parser.add_argument('--secret', required=True)
+    parser.add_argument('--count', type=int, default=100)
+    parser.add_argument('--concurrency', type=int, default=10)
+    parser.add_argument('--text', default='/alive')
+    args = parser.parse_args()
+
+    updates = [command_update(args.text, user_id=42 + i % 50) for i in range(args.count)]
+    latencies = asyncio.run(post_updates(args.url, args.secret, updates, args.concurrency))
+    latencies.sort()
+    print(f"posted={len(latencies)} "
+          f"p50={statistics.median(latencies) * 1000:.2f}ms "
+          f"p99={latencies[int(len(latencies) * 0.99) - 1] * 1000:.2f}ms")
+
+if __name__ == '__main__':
+    main()
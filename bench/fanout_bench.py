@@ -0,0 +1,63 @@
+"""Compare sequential and concurrent report fan-out against the fake Bot API.
+
+    python -m bench.fanout_bench --latency 0.05 --rate 30 --concurrency 8
+"""
+import argparse
+import asyncio
+import os
+import time
+
+os.environ.setdefault('BOT_TOKEN', '123456:FAKE-TOKEN')
+
+from telegram import Bot
+from telegram.request import HTTPXRequest
+from bench.fake_bot_api import FakeBotAPI, FAKE_TOKEN
+from app.utils.fanout import fan_out
+from app.utils.ratelimit import TokenBucket
+
+async def sequential(bot: Bot, chat_ids: list[int], text: str) -> int:
+    # The pre-fan-out behaviour of receive_report_reason
+    delivered = 0
+    for chat_id in chat_ids:
+        try:
+            await bot.send_message(chat_id=chat_id, text=text)
+            delivered += 1
+        except Exception:
+            pass
+    return delivered
+
+async def run(args) -> None:
+    api = FakeBotAPI(latency=args.latency, flood_rate=args.flood_rate, retry_after=1)
+    await api.start()
+    bot = Bot(FAKE_TOKEN, base_url=api.base_url, request=HTTPXRequest(connection_pool_size=max(8, args.concurrency)))
+    await bot.initialize()
+
+    print(f"{'admins':>6} {'sequential':>12} {'fan-out':>12} {'delivered':>10}")
+    for admins in (1, 10, 100):
+        chat_ids = list(range(1, admins + 1))
+
+        started = time.perf_counter()
+        await sequential(bot, chat_ids, 'report')
+        sequential_time = time.perf_counter() - started
+
+        bucket = TokenBucket(args.rate)
+        started = time.perf_counter()
+        results = await fan_out(bot, chat_ids, 'report', concurrency=args.concurrency, bucket=bucket)
+        fanout_time = time.perf_counter() - started
+
+        delivered = sum(result.ok for result in results)
+        print(f"{admins:>6} {sequential_time * 1000:>10.1f}ms {fanout_time * 1000:>10.1f}ms {delivered:>10}")
+
+    await bot.shutdown()
+    await api.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--latency', type=float, default=0.05, help='fake API latency in seconds')
+    parser.add_argument('--flood-rate', type=float, default=0.0, help='fraction of calls answered with 429')
+    parser.add_argument('--rate', type=float, default=30, help='messages per second budget')
+    parser.add_argument('--concurrency', type=int, default=8)
+    asyncio.run(run(parser.parse_args()))
+
+if __name__ == '__main__':
+    main()
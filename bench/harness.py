@@ -0,0 +1,156 @@
+"""Drive the real application from app/main.py against the fake Bot API."""
+import asyncio
+import os
+import time
+from collections import Counter
+
+# Benchmarks must not touch the network or trip the production rate limits
+BENCH_ENV = {
+    'BOT_TOKEN': '123456:FAKE-TOKEN',
+    'PORT': '0',
+    'ROAST_BUFFER_SIZE': '0',
+    'ROAST_API_URL': 'http://127.0.0.1:9/',
+    'RATE_LIMIT_GLOBAL': '1000000',
+    'RATE_LIMIT_GROUP_PER_MINUTE': '1000000',
+    'RATE_LIMIT_PRIVATE': '1000000',
+}
+for name, value in BENCH_ENV.items():
+    os.environ.setdefault(name, value)
+
+from telegram import Update
+from telegram.ext import Application, JobQueue, SimpleUpdateProcessor, TypeHandler
+import app.main as bot_main
+from app.utils.processor import ChatShardedUpdateProcessor
+from app.utils.dedupe import UpdateDeduplicator
+from bench.fake_bot_api import FakeBotAPI, FAKE_TOKEN, POLLING_METHODS
+
+def percentile(values: list[float], q: float) -> float:
+    """Nearest-rank percentile of unsorted values"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+class Completion:
+    """Time updates from the first handler group to the last and count them"""
+
+    def __init__(self, expected: int):
+        self.expected = expected
+        self.count = 0
+        self.done = asyncio.Event()
+        self.latencies: list[float] = []
+        self.finished_at: dict[int, float] = {}
+        self._started: dict[int, float] = {}
+
+    async def started(self, update: Update, context) -> None:
+        self._started[update.update_id] = time.perf_counter()
+
+    async def __call__(self, update: Update, context) -> None:
+        now = time.perf_counter()
+        self.latencies.append(now - self._started.pop(update.update_id, now))
+        self.finished_at[update.update_id] = now
+        self.count += 1
+        if self.count >= self.expected:
+            self.done.set()
+
+def build(api: FakeBotAPI, concurrency: int | None, job_queue: JobQueue | None = None) -> Application:
+    """Build the production application against the fake API
+
+    `concurrency=None` processes updates one at a time like the original bot.
+    """
+    if concurrency is None:
+        bot_main.update_processor = SimpleUpdateProcessor(1)
+    else:
+        # A fresh deduplicator, replays reuse update ids between runs
+        bot_main.update_processor = ChatShardedUpdateProcessor(concurrency, dedupe=UpdateDeduplicator())
+    return bot_main.build_application(FAKE_TOKEN, api.base_url, job_queue)
+
+async def start(app: Application) -> None:
+    await app.initialize()
+    if app.post_init:
+        await app.post_init(app)
+    await app.updater.start_polling(poll_interval=0, timeout=1, allowed_updates=Update.ALL_TYPES)
+    await app.start()
+
+async def stop(app: Application) -> None:
+    await app.updater.stop()
+    await app.stop()
+    if app.post_stop:
+        await app.post_stop(app)
+    await app.shutdown()
+    if app.post_shutdown:
+        await app.post_shutdown(app)
+
+async def feed_at(api: FakeBotAPI, updates: list[dict], offsets: list[float]) -> None:
+    """Feed each update at its offset in seconds from now, batching those already due"""
+    started = time.perf_counter()
+    index = 0
+    while index < len(updates):
+        delay = offsets[index] - (time.perf_counter() - started)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        elapsed = time.perf_counter() - started
+        due = index
+        while due < len(updates) and offsets[due] <= elapsed:
+            due += 1
+        if due > index:
+            api.feed(updates[index:due])
+            index = due
+
+async def run_updates(
+    api: FakeBotAPI,
+    updates: list[dict],
+    concurrency: int | None = None,
+    timeout: float = 300,
+    expected: int | None = None,
+    offsets: list[float] | None = None,
+    job_queue: JobQueue | None = None,
+    settle: float = 0.0
+) -> dict:
+    """Feed updates through a fresh application and time until all are handled
+
+    `expected` counts updates fed later on, e.g. by simulated users.
+    With `offsets`, each update is fed that many seconds after the start
+    instead of all at once. `settle` keeps the application running that
+    much longer for background work (e.g. batched messages) to finish.
+    """
+    app = build(api, concurrency, job_queue)
+    completion = Completion(expected or len(updates))
+    # The lowest group runs first and the highest last, around every real handler
+    app.add_handler(TypeHandler(Update, completion.started), group=-1000)
+    app.add_handler(TypeHandler(Update, completion), group=1000)
+    await start(app)
+
+    calls_before = Counter(api.calls)
+    started = time.perf_counter()
+    if offsets is None:
+        api.feed(updates)
+        feeder = None
+    else:
+        feeder = asyncio.create_task(feed_at(api, updates, offsets))
+    await asyncio.wait_for(completion.done.wait(), timeout)
+    if feeder:
+        await feeder
+    elapsed = time.perf_counter() - started
+    # One snapshot for the total and the breakdown, before shutdown adds its own calls
+    calls = {method: count for method, count in (api.calls - calls_before).items() if method not in POLLING_METHODS}
+
+    # From getUpdates handing the update out until its last handler finished
+    end_to_end = [
+        finished - api.delivered_at[update_id]
+        for update_id, finished in completion.finished_at.items() if update_id in api.delivered_at
+    ]
+
+    await asyncio.sleep(settle)
+    await stop(app)
+    return {
+        'updates': completion.count,
+        'seconds': elapsed,
+        'updates_per_sec': completion.count / elapsed,
+        'api_calls_per_update': sum(calls.values()) / completion.count,
+        'handler_p50_ms': percentile(completion.latencies, 0.5) * 1000,
+        'handler_p99_ms': percentile(completion.latencies, 0.99) * 1000,
+        'end_to_end_p50_ms': percentile(end_to_end, 0.5) * 1000,
+        'end_to_end_p99_ms': percentile(end_to_end, 0.99) * 1000,
+        'api_calls': calls
+    }
@@ -0,0 +1,100 @@
+"""Load-test the real application against the fake Bot API with a synthetic update mix.
+
+    python -m bench.load_test --updates 2000 --chats 100 --latency 0.02 --output run.json
+    python -m bench.load_test --mix command=80,report=20 --flood-rate 0.01 --baseline run.json
+
+Prints one JSON document with the settings and results; --baseline adds the
+relative change of each result against an earlier run.
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import resource
+import sys
+
+from bench.harness import run_updates
+from bench.fake_bot_api import FakeBotAPI
+from bench.workload import Workload, DEFAULT_MIX, parse_mix
+
+# Results compared against a baseline, and whether higher is better
+COMPARED = {
+    'updates_per_sec': True,
+    'handler_p50_ms': False,
+    'handler_p99_ms': False,
+    'end_to_end_p99_ms': False,
+    'api_calls_per_update': False,
+    'peak_rss_mb': False
+}
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+def compare(results: dict, baseline: dict) -> dict:
+    """Return the relative change of each compared result, positive meaning better"""
+    changes = {}
+    for name, higher_is_better in COMPARED.items():
+        before, after = baseline['results'].get(name), results.get(name)
+        if not before or after is None:
+            continue
+        change = (after - before) / before
+        changes[name] = round(change if higher_is_better else -change, 4)
+    return changes
+
+async def run(args) -> dict:
+    mix = parse_mix(args.mix) if args.mix else DEFAULT_MIX
+    workload = Workload(args.updates, chats=args.chats, mix=mix, seed=args.seed)
+    api = FakeBotAPI(latency=args.latency, jitter=args.jitter, flood_rate=args.flood_rate)
+    await api.start()
+    workload.attach(api)
+    try:
+        results = await run_updates(api, workload.updates, args.concurrency, args.timeout, expected=workload.expected)
+    finally:
+        await api.stop()
+
+    # Peak of the whole process, which also hosts the fake API
+    results['peak_rss_mb'] = peak_rss_mb()
+    results['floods'] = dict(api.floods)
+    return {
+        'settings': {
+            'updates': args.updates, 'chats': args.chats, 'mix': mix, 'seed': args.seed,
+            'concurrency': args.concurrency, 'latency': args.latency, 'jitter': args.jitter,
+            'flood_rate': args.flood_rate
+        },
+        'scenarios': workload.counts,
+        'results': results
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--updates', type=int, default=2000)
+    parser.add_argument('--chats', type=int, default=100)
+    parser.add_argument('--mix', help=f"scenario weights, default {','.join(f'{k}={v}' for k, v in DEFAULT_MIX.items())}")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--concurrency', type=int, default=32, help='parallel updates (0 for one at a time)')
+    parser.add_argument('--latency', type=float, default=0.02, help='fake API latency in seconds')
+    parser.add_argument('--jitter', type=float, default=0.01, help='extra random latency, up to this many seconds')
+    parser.add_argument('--flood-rate', type=float, default=0.0, help='fraction of API calls answered with 429')
+    parser.add_argument('--timeout', type=float, default=600)
+    parser.add_argument('--output', help='also write the JSON result to this file')
+    parser.add_argument('--baseline', help='JSON result of an earlier run to compare against')
+    args = parser.parse_args()
+    args.concurrency = args.concurrency or None
+
+    # Keep stdout for the JSON result, the bot's own prints go to stderr
+    with contextlib.redirect_stdout(sys.stderr):
+        report = asyncio.run(run(args))
+    if args.baseline:
+        with open(args.baseline) as f:
+            report['change_vs_baseline'] = compare(report['results'], json.load(f))
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+
+if __name__ == '__main__':
+    main()
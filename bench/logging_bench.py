@@ -0,0 +1,76 @@
+"""Measure the logging cost per update on the event loop thread.
+
+    python -m bench.logging_bench --updates 50000 --error-every 100
+
+Each update logs one routine event at INFO, like a handled update or a
+pinned-message reaction, and every --error-every-th update goes through
+the error handler. "before" is the previous setup: a synchronous stream
+handler with eager f-strings and the whole update in error reports.
+"after" routes records through the queue to a writer thread as JSON,
+summarises updates in errors and samples routine events at --rate.
+"""
+import argparse
+import logging
+import os
+import tempfile
+import time
+
+os.environ.setdefault('BOT_TOKEN', '123456:FAKE-TOKEN')
+
+from telegram import Update
+from bench.fake_telegram import command_update
+from app.utils.logs import TEXT_FORMAT, setup_logging, stop_logging, log_event, update_summary, log_queue
+
+logger = logging.getLogger('bench.logging')
+
+def before(updates: list[Update], error_every: int) -> None:
+    for i, update in enumerate(updates):
+        logger.info(f"Reacted to pinned message {update.message.message_id} with fire emoji")
+        if i % error_every == 0:
+            logger.error(f'Update {update} caused error boom')
+
+def after(updates: list[Update], error_every: int, rate: float) -> None:
+    for i, update in enumerate(updates):
+        log_event(logger, "Reacted to pinned message %s with fire emoji", update.message.message_id, rate=rate)
+        if i % error_every == 0:
+            summary = update_summary(update)
+            logger.error("Update %s (%s) caused error %s", summary.get('update_id'), summary['update_type'], 'boom', extra=summary)
+
+def timed(run, *args) -> float:
+    started = time.perf_counter()
+    run(*args)
+    return time.perf_counter() - started
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--updates', type=int, default=50000)
+    parser.add_argument('--error-every', type=int, default=100)
+    parser.add_argument('--rate', type=float, default=0.01, help='sample rate of routine events')
+    args = parser.parse_args()
+
+    updates = [Update.de_json(command_update('/alive', -1000 - i % 100, 100 + i), None) for i in range(args.updates)]
+    root = logging.getLogger()
+    with tempfile.TemporaryDirectory() as directory:
+        # Before: formatted and written on the calling thread
+        with open(os.path.join(directory, 'before.log'), 'w') as stream:
+            handler = logging.StreamHandler(stream)
+            handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+            root.handlers[:] = [handler]
+            root.setLevel(logging.INFO)
+            results = {'before': (timed(before, updates, args.error_every), 0)}
+
+        for name, rate in (('after, unsampled', 1.0), (f'after, rate {args.rate:g}', args.rate)):
+            with open(os.path.join(directory, 'after.log'), 'w') as stream:
+                listener = setup_logging('INFO', 'json', stream)
+                dropped = log_queue.dropped
+                seconds = timed(after, updates, args.error_every, rate)
+                results[name] = (seconds, log_queue.dropped - dropped)
+                # Drain the queue before the file is closed; not part of the loop's cost
+                stop_logging(listener)
+
+    print(f"{'setup':>18} {'us/update':>10} {'dropped':>8}")
+    for name, (seconds, dropped) in results.items():
+        print(f"{name:>18} {seconds * 1e6 / args.updates:>10.2f} {dropped:>8}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+"""Measure the metrics collection overhead added to every update.
+
+    python -m bench.metrics_bench --updates 200000
+"""
+import argparse
+import asyncio
+import os
+import time
+
+os.environ.setdefault('BOT_TOKEN', '123456:FAKE-TOKEN')
+
+from app.utils.metrics import _timed, updates_total, api_calls, registry
+
+async def handler(update, context) -> None:
+    pass
+
+async def run(updates: int) -> None:
+    timed = _timed('bench', handler)
+
+    # Per update: the processor counter, one timed handler and one API call counted
+    started = time.perf_counter()
+    for _ in range(updates):
+        await handler(None, None)
+    baseline = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for _ in range(updates):
+        updates_total.inc()
+        await timed(None, None)
+        api_calls.inc('sendMessage', 'ok')
+    instrumented = time.perf_counter() - started
+
+    started = time.perf_counter()
+    body = registry.render()
+    render_time = time.perf_counter() - started
+
+    print(f"updates:        {updates}")
+    print(f"overhead:       {(instrumented - baseline) * 1e6 / updates:.2f} us/update")
+    print(f"scrape render:  {render_time * 1000:.2f} ms ({len(body)} bytes)")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--updates', type=int, default=200000)
+    asyncio.run(run(parser.parse_args().updates))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+"""Measure the SQLite persistence: per-update write overhead and startup restore time.
+
+    python -m bench.persistence_bench --entries 10000
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+os.environ.setdefault('BOT_TOKEN', '123456:FAKE-TOKEN')
+
+from app.utils.persistence import SQLitePersistence
+
+async def run(entries: int) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'state.db')
+        persistence = SQLitePersistence(path)
+
+        # Each simulated update changes one conversation and one user's data
+        started = time.perf_counter()
+        for i in range(entries):
+            await persistence.update_conversation('report', (-1000 - i % 100, i), 1)
+            await persistence.update_user_data(i, {'reports': i})
+            if i % 100 == 0:
+                # Let the batched writer run, as it would between updates
+                await asyncio.sleep(0)
+        loop_time = time.perf_counter() - started
+        await persistence.flush()
+
+        stats = persistence.stats()
+        print(f"updates:             {entries}")
+        print(f"event-loop cost:     {loop_time * 1e6 / entries:.1f} us/update")
+        print(f"background writes:   {stats['writes']} transactions, {stats['rows_written']} rows")
+        print(f"write cost:          {stats['write_seconds'] * 1e6 / entries:.1f} us/update (off the event loop)")
+
+        restored = SQLitePersistence(path)
+        started = time.perf_counter()
+        conversations = await restored.get_conversations('report')
+        user_data = await restored.get_user_data()
+        restore_time = time.perf_counter() - started
+        print(f"restore:             {len(conversations)} conversations, {len(user_data)} users in {restore_time * 1000:.1f} ms")
+        await restored.flush()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--entries', type=int, default=10000)
+    asyncio.run(run(parser.parse_args().entries))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""Replay recorded updates through the real application against the fake Bot API.
+
+Record production traffic with RECORD_DIR=/var/lib/bot/recordings, copy the
+files over, then:
+
+    python -m bench.replay /path/to/recordings --speed 10
+    python -m bench.replay updates-1718000000000.jsonl.gz --speed 0 --output incident.json
+
+--speed 1 keeps the original timing, 10 plays ten times faster and 0 feeds
+everything at once. JobQueue timeouts (report and conversation timeouts)
+run on a clock sped up by the same factor. Timers that sleep on the event
+loop (auto-delete, welcome and report windows, countdown edits) still run
+in real time, so at other speeds they fire later relative to the updates
+than they did when recorded. Prints the same JSON report as
+bench.load_test.
+"""
+import argparse
+import asyncio
+import contextlib
+import datetime as dtm
+import json
+import sys
+
+from bench.harness import run_updates
+from bench.fake_bot_api import FakeBotAPI
+from bench.load_test import compare, peak_rss_mb
+from telegram.ext import JobQueue
+from app.utils.recorder import read_recording
+
+class AcceleratedJobQueue(JobQueue):
+    """JobQueue whose relative delays shrink by `speed`"""
+
+    def __init__(self, speed: float):
+        super().__init__()
+        self.speed = speed
+
+    def _parse_time_input(self, time, shift_day: bool = False):
+        if isinstance(time, (int, float)) and not isinstance(time, bool):
+            time = time / self.speed
+        elif isinstance(time, dtm.timedelta):
+            time = time / self.speed
+        return super()._parse_time_input(time, shift_day)
+
+def load(paths: list[str], speed: float) -> tuple[list[dict], list[float] | None]:
+    """Read a recording, renumber its updates and scale its timing"""
+    entries = list(read_recording(*paths))
+    if not entries:
+        raise SystemExit(f"No updates found in {', '.join(paths)}")
+    updates = []
+    for update_id, (_, update) in enumerate(entries, 1):
+        # Recordings may span restarts; the fake getUpdates needs increasing ids
+        update['update_id'] = update_id
+        updates.append(update)
+    if not speed:
+        return updates, None
+    first = entries[0][0]
+    return updates, [(received - first) / speed for received, _ in entries]
+
+async def run(args) -> dict:
+    updates, offsets = load(args.recording, args.speed)
+    api = FakeBotAPI(latency=args.latency, jitter=args.jitter, flood_rate=args.flood_rate)
+    await api.start()
+    try:
+        job_queue = AcceleratedJobQueue(args.speed or args.max_speed_clock)
+        results = await run_updates(api, updates, args.concurrency, args.timeout, offsets=offsets, job_queue=job_queue)
+    finally:
+        await api.stop()
+
+    results['recorded_seconds'] = offsets[-1] * args.speed if offsets else None
+    results['peak_rss_mb'] = peak_rss_mb()
+    results['floods'] = dict(api.floods)
+    return {
+        'settings': {
+            'recording': args.recording, 'speed': args.speed, 'concurrency': args.concurrency,
+            'latency': args.latency, 'jitter': args.jitter, 'flood_rate': args.flood_rate
+        },
+        'results': results
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('recording', nargs='+', help='recording files or directories')
+    parser.add_argument('--speed', type=float, default=1, help='playback speed, 0 for as fast as possible')
+    parser.add_argument('--max-speed-clock', type=float, default=100, help='JobQueue speed-up used with --speed 0')
+    parser.add_argument('--concurrency', type=int, default=32, help='parallel updates (0 for one at a time)')
+    parser.add_argument('--latency', type=float, default=0.02, help='fake API latency in seconds')
+    parser.add_argument('--jitter', type=float, default=0.01, help='extra random latency, up to this many seconds')
+    parser.add_argument('--flood-rate', type=float, default=0.0, help='fraction of API calls answered with 429')
+    parser.add_argument('--timeout', type=float, default=3600)
+    parser.add_argument('--output', help='also write the JSON result to this file')
+    parser.add_argument('--baseline', help='JSON result of an earlier run to compare against')
+    args = parser.parse_args()
+    args.concurrency = args.concurrency or None
+
+    # Keep stdout for the JSON result, the bot's own prints go to stderr
+    with contextlib.redirect_stdout(sys.stderr):
+        report = asyncio.run(run(args))
+    if args.baseline:
+        with open(args.baseline) as f:
+            report['change_vs_baseline'] = compare(report['results'], json.load(f))
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+
+if __name__ == '__main__':
+    main()
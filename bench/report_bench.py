@@ -0,0 +1,58 @@
+"""Count the admin DMs sent when many members report the same message.
+
+    python -m bench.report_bench --raids 5 --reporters 10 --admins 5 --window 2
+
+Without aggregation every report was sent to every admin, reporters x
+admins DMs per raid. The bot now sends each admin one DM per reported
+message and edits it as more reports arrive; with --window 0 the first
+report goes out at once and every later one costs an edit per admin.
+"""
+import argparse
+import asyncio
+
+from bench.harness import run_updates
+from bench.fake_bot_api import FakeBotAPI
+from bench.workload import Workload
+from app.utils.report_digest import report_digests
+
+async def measure(api: FakeBotAPI, workload: Workload, concurrency: int, window: float) -> dict:
+    api.calls.clear()
+    report_digests.default_window = window
+    workload.attach(api)
+    # Leave the aggregation window time to send before the application stops
+    await run_updates(api, workload.updates, concurrency, expected=workload.expected, settle=window + 1)
+    return {'sent': report_digests.stats()['sent'], 'edited': report_digests.stats()['edits']}
+
+async def run(args) -> None:
+    api = FakeBotAPI(latency=args.latency, admins=args.admins)
+    await api.start()
+
+    unaggregated = args.raids * args.reporters * args.admins
+    print(f"{'window':>7} {'reports':>8} {'before':>7} {'sent':>6} {'edited':>7}")
+    for run_index, window in enumerate((0.0, args.window)):
+        # Each raid is a /report and a reason from every reporter; new reporters each run, as the first are on cooldown
+        workload = Workload(
+            args.raids * args.reporters * 2, chats=args.raids, mix={'report': 1}, raid_size=args.reporters,
+            seed=args.seed, first_user_id=100000 + run_index * 1000000
+        )
+        before = report_digests.stats()
+        result = await measure(api, workload, args.concurrency, window)
+        sent = result['sent'] - before['sent']
+        edited = result['edited'] - before['edits']
+        print(f"{window:>6.1f}s {workload.reporters:>8} {unaggregated:>7} {sent:>6} {edited:>7}")
+
+    await api.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--raids', type=int, default=5, help='reported messages')
+    parser.add_argument('--reporters', type=int, default=10, help='members reporting each message')
+    parser.add_argument('--admins', type=int, default=5, help='admins per chat')
+    parser.add_argument('--window', type=float, default=2, help='aggregation window to compare with 0')
+    parser.add_argument('--latency', type=float, default=0.02, help='fake API latency in seconds')
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--seed', type=int, default=0)
+    asyncio.run(run(parser.parse_args()))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""Local stand-in for the roast API so /roast can be exercised offline.
+
+Run it and point the bot at it:
+
+    python -m bench.roast_stub --port 8081 --latency 0.2
+    ROAST_API_URL=http://127.0.0.1:8081/ python -m app.main
+"""
+import argparse
+import random
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+ROASTS = [
+    "You bring everyone so much joy when you leave the room.",
+    "You're the reason the gene pool needs a lifeguard.",
+    "I'd agree with you, but then we'd both be wrong.",
+    "You have something on your chin... no, the third one down.",
+]
+
+class RoastStubHandler(BaseHTTPRequestHandler):
+    latency = 0.0
+    failure_rate = 0.0
+
+    def do_GET(self):
+        if self.latency:
+            time.sleep(self.latency)
+        if random.random() < self.failure_rate:
+            self.send_response(503)
+            self.end_headers()
+            return
+        body = random.choice(ROASTS).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        return
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds to wait before answering')
+    parser.add_argument('--failure-rate', type=float, default=0.0, help='fraction of requests answered with 503')
+    args = parser.parse_args()
+
+    RoastStubHandler.latency = args.latency
+    RoastStubHandler.failure_rate = args.failure_rate
+    server = ThreadingHTTPServer(('127.0.0.1', args.port), RoastStubHandler)
+    print(f"Roast stub listening on http://127.0.0.1:{args.port}/")
+    server.serve_forever()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,37 @@
+"""Compare sequential and per-chat sharded update processing at 1, 100 and 1000 active chats.
+
+    python -m bench.throughput_bench --updates 1000 --latency 0.02
+"""
+import argparse
+import asyncio
+
+from bench.harness import run_updates
+from bench.fake_bot_api import FakeBotAPI
+from bench.fake_telegram import command_update
+
+async def run(args) -> None:
+    api = FakeBotAPI(latency=args.latency)
+    await api.start()
+
+    print(f"{'chats':>6} {'sequential':>14} {'sharded':>14} {'speedup':>8}")
+    for chats in (1, 100, 1000):
+        updates = [command_update('/alive', chat_id=-1000 - i % chats, user_id=1 + i) for i in range(args.updates)]
+        sequential = await run_updates(api, updates, concurrency=None)
+
+        updates = [command_update('/alive', chat_id=-1000 - i % chats, user_id=1 + i) for i in range(args.updates)]
+        sharded = await run_updates(api, updates, concurrency=args.concurrency)
+
+        print(f"{chats:>6} {sequential['updates_per_sec']:>10.0f} u/s {sharded['updates_per_sec']:>10.0f} u/s "
+              f"{sharded['updates_per_sec'] / sequential['updates_per_sec']:>7.1f}x")
+
+    await api.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--updates', type=int, default=1000)
+    parser.add_argument('--latency', type=float, default=0.02, help='fake API latency in seconds')
+    parser.add_argument('--concurrency', type=int, default=32)
+    asyncio.run(run(parser.parse_args()))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""Compare per-member welcomes with the coalescing welcome aggregator during join bursts.
+
+    python -m bench.welcome_bench --members 500 --chats 5 --latency 0.02
+"""
+import argparse
+import asyncio
+
+from bench.harness import run_updates
+from bench.fake_bot_api import FakeBotAPI
+from bench.workload import Workload
+import app.main as bot_main
+from app.handlers.events import welcome_new_member
+from app.utils.helpers import schedule_delete
+from app.utils.welcome import welcomes
+
+async def per_member_welcome(update, context) -> None:
+    """The previous handler: one message and one deletion per member"""
+    for member in update.message.new_chat_members:
+        if member.is_bot:
+            continue
+        username = f"@{member.username}" if member.username else member.first_name
+        msg = await context.bot.send_message(
+            chat_id=update.effective_chat.id,
+            text=f"👋 Welcome {username}!\n\nWe're glad to have you here. Use ```/help``` to see available commands."
+        )
+        schedule_delete(update.effective_chat.id, msg.message_id)
+
+async def measure(api: FakeBotAPI, workload: Workload, concurrency: int, settle: float) -> dict:
+    api.calls.clear()
+    # Leave the aggregation window time to send before the application stops
+    results = await run_updates(api, workload.updates, concurrency, settle=settle)
+    return {
+        'updates_per_sec': results['updates_per_sec'],
+        'handler_p99_ms': results['handler_p99_ms'],
+        'messages': api.calls['sendMessage'] + api.calls['editMessageText'],
+        'deletes': api.calls['deleteMessage'] + api.calls['deleteMessages']
+    }
+
+async def run(args) -> None:
+    api = FakeBotAPI(latency=args.latency)
+    await api.start()
+    bursts = max(1, args.members // args.burst)
+    mix = {'member_burst': 1}
+
+    print(f"{'handler':>12} {'updates/s':>10} {'p99 ms':>8} {'messages':>9} {'deletes':>8}")
+    for name, handler in (('per-member', per_member_welcome), ('aggregated', welcome_new_member)):
+        bot_main.welcome_new_member = handler
+        workload = Workload(bursts * args.burst, chats=args.chats, mix=mix, burst_size=args.burst, seed=args.seed)
+        result = await measure(api, workload, args.concurrency, settle=welcomes.window + 1)
+        print(f"{name:>12} {result['updates_per_sec']:>10.0f} {result['handler_p99_ms']:>8.1f} "
+              f"{result['messages']:>9} {result['deletes']:>8}")
+
+    bot_main.welcome_new_member = welcome_new_member
+    await api.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--members', type=int, default=500)
+    parser.add_argument('--burst', type=int, default=50, help='joins per burst in one chat')
+    parser.add_argument('--chats', type=int, default=5)
+    parser.add_argument('--latency', type=float, default=0.02, help='fake API latency in seconds')
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--seed', type=int, default=0)
+    asyncio.run(run(parser.parse_args()))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""Synthetic update mixes for load tests.
+
+A workload is a list of raw updates plus simulated users who answer the
+bot: when the bot prompts for a report reason, the reporter's reply is fed
+to the fake Bot API right away, like a real user typing it.
+"""
+import itertools
+import random
+from bench.fake_bot_api import FakeBotAPI, BOT_USER
+from bench.fake_telegram import (
+    message, command_update, message_update, callback_update, join_request_update, new_members_update
+)
+
+# Relative weights of the scenarios in the default mix
+DEFAULT_MIX = {'command': 50, 'callback': 20, 'report': 10, 'join_wave': 10, 'member_burst': 10}
+
+COMMANDS = ('/alive', '/start', '/help', '/roast')
+BUTTONS = ('help', 'roast', 'report_info')
+
+def parse_mix(text: str) -> dict[str, float]:
+    """Parse 'command=50,report=10' into scenario weights"""
+    mix = {}
+    for part in filter(None, text.split(',')):
+        name, _, weight = part.partition('=')
+        if name not in DEFAULT_MIX:
+            raise ValueError(f"Unknown scenario {name!r}, expected one of {', '.join(DEFAULT_MIX)}")
+        mix[name] = float(weight)
+    return mix
+
+class Workload:
+    """A reproducible stream of updates spread over `chats` groups
+
+    Each scenario adds one or more updates: single commands and button
+    presses, report conversations (the /report command, later answered
+    with a reason) by `raid_size` members reporting the same message,
+    waves of `wave_size` join requests to one chat and bursts of
+    `burst_size` new-member messages.
+    """
+
+    def __init__(
+        self,
+        updates: int,
+        chats: int = 100,
+        mix: dict[str, float] = DEFAULT_MIX,
+        seed: int = 0,
+        wave_size: int = 20,
+        burst_size: int = 5,
+        raid_size: int = 1,
+        first_user_id: int = 100000
+    ):
+        self.updates: list[dict] = []
+        self.counts = dict.fromkeys(mix, 0)
+        self.reporters = 0
+        self._api: FakeBotAPI | None = None
+        # Open reports by the message id of the /report command
+        self._reports: dict[int, tuple[int, int]] = {}
+        # Fresh user ids, above the fake API's admins, so cooldowns never kick in
+        user_ids = itertools.count(first_user_id)
+        rng = random.Random(seed)
+        scenarios, weights = zip(*mix.items())
+
+        while self.expected < updates:
+            scenario = rng.choices(scenarios, weights)[0]
+            chat_id = -1000 - rng.randrange(chats)
+            self.counts[scenario] += 1
+            if scenario == 'command':
+                self.updates.append(command_update(rng.choice(COMMANDS), chat_id, next(user_ids)))
+            elif scenario == 'callback':
+                self.updates.append(callback_update(rng.choice(BUTTONS), chat_id, next(user_ids), sender=BOT_USER))
+            elif scenario == 'report':
+                offending = message('buy cheap followers', chat_id, next(user_ids))
+                for _ in range(raid_size):
+                    update = command_update('/report', chat_id, next(user_ids), reply_to=offending)
+                    self._reports[update['message']['message_id']] = (chat_id, update['message']['from']['id'])
+                    self.updates.append(update)
+                    self.reporters += 1
+            elif scenario == 'join_wave':
+                self.updates.extend(join_request_update(chat_id, next(user_ids)) for _ in range(wave_size))
+            elif scenario == 'member_burst':
+                self.updates.extend(new_members_update(chat_id, (next(user_ids),)) for _ in range(burst_size))
+
+    @property
+    def expected(self) -> int:
+        """Updates the bot will receive, including the reporters' replies"""
+        return len(self.updates) + self.reporters
+
+    def attach(self, api: FakeBotAPI) -> None:
+        """Let the simulated users react to the fake API's messages"""
+        self._api = api
+        api.listeners.append(self._on_call)
+
+    def _on_call(self, method: str, params: dict, result: object) -> None:
+        if method != 'sendMessage':
+            return
+        reply_to = (params.get('reply_parameters') or {}).get('message_id')
+        if reply_to not in self._reports or not params.get('text', '').startswith('📝'):
+            return
+        chat_id, user_id = self._reports.pop(reply_to)
+        self._api.feed([message_update('Spam', chat_id, user_id, reply_to=result)])